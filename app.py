@@ -1,5 +1,7 @@
 import streamlit as st
 import google.generativeai as genai
+from google.api_core import exceptions as google_exceptions
+from google.api_core import retry as google_retry
 from pytrends.request import TrendReq
 from serpapi import GoogleSearch
 import pandas as pd
@@ -153,10 +155,29 @@ def clean_text(text):
     # Final safety net: replace any remaining non-latin characters
     return text.encode('latin-1', 'replace').decode('latin-1')
 
+# Gemini calls give up after this many seconds instead of hanging, and
+# transient failures (rate limits, 5xx) are retried with jittered backoff
+GEMINI_TIMEOUT = 60
+GEMINI_RETRY = google_retry.Retry(
+    predicate=google_retry.if_exception_type(
+        google_exceptions.TooManyRequests, google_exceptions.ServerError
+    ),
+    initial=1.0,
+    maximum=10.0,
+    multiplier=2.0,
+    timeout=GEMINI_TIMEOUT,
+)
+
+def generate_content(model, prompt_text):
+    return model.generate_content(
+        prompt_text,
+        request_options={"timeout": GEMINI_TIMEOUT, "retry": GEMINI_RETRY},
+    )
+
 def generate_list(prompt_text):
     try:
         model = genai.GenerativeModel(selected_model_name)
-        response = model.generate_content(prompt_text)
+        response = generate_content(model, prompt_text)
         text = response.text.strip()
         if text.startswith("```json"):
             text = text[7:-3]
@@ -401,12 +422,12 @@ if st.session_state.get('phase3_complete'):
                     
                     # 1. Pain Points
                     pain_prompt = f"Analyze these snippets about '{st.session_state.selected_niche}':\n{snippets_text}\nExtract 3 distinct, visceral pain points."
-                    pain_response = model.generate_content(pain_prompt)
+                    pain_response = generate_content(model, pain_prompt)
                     pain_points = pain_response.text
                     
                     # 2. Initial Opportunity
                     opp_prompt = f"Based on these pain points:\n{pain_points}\nGenerate 1 singular, high-potential business opportunity (SaaS, Info Product, or Service)."
-                    opp_response = model.generate_content(opp_prompt)
+                    opp_response = generate_content(model, opp_prompt)
                     opportunity = opp_response.text
                     
                     st.session_state.temp_analysis = {
@@ -448,12 +469,12 @@ if st.session_state.get('phase3_complete'):
                 """
                 
                 model = genai.GenerativeModel(selected_model_name)
-                moat_response = model.generate_content(refine_prompt)
+                moat_response = generate_content(model, refine_prompt)
                 moat_analysis = moat_response.text
                 
                 # Lovable Prompt
                 love_prompt = f"Create a 'Before-After-Bridge' copywriting prompt for a landing page for this refined idea:\n{moat_analysis}"
-                love_response = model.generate_content(love_prompt)
+                love_response = generate_content(model, love_prompt)
                 final_prompt = love_response.text
                 
                 st.session_state.final_results = {
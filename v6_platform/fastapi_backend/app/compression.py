@@ -0,0 +1,120 @@
+"""
+Response compression.
+
+``CompressionMiddleware`` compresses complete response bodies of at least
+``COMPRESSION_MINIMUM_SIZE`` bytes with brotli, when the ``brotli`` package is
+installed and the client accepts it, or gzip. Streaming responses (server-sent
+events, the scan pipeline) are passed through untouched so every event still
+reaches the client as soon as it is sent, as are responses that already have a
+Content-Encoding. Large bodies are compressed on a worker thread so the event
+loop keeps serving other requests meanwhile.
+"""
+
+import asyncio
+import gzip
+from typing import Dict, Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli is optional
+    brotli = None
+
+# Bodies at least this large are compressed off the event loop
+THREAD_THRESHOLD = 256 * 1024
+
+
+def accepted_encodings(header: str) -> Dict[str, float]:
+    """Parses an Accept-Encoding header into ``{coding: q}``."""
+    encodings = {}
+    for part in header.split(","):
+        coding, *params = part.strip().split(";")
+        q = 1.0
+        for param in params:
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if coding:
+            encodings[coding.strip().lower()] = q
+    return encodings
+
+
+def choose_encoding(header: str) -> Optional[str]:
+    encodings = accepted_encodings(header)
+    wildcard = encodings.get("*", 0.0)
+    for coding in ("br", "gzip"):
+        if coding == "br" and brotli is None:
+            continue
+        if encodings.get(coding, wildcard) > 0:
+            return coding
+    return None
+
+
+class CompressionMiddleware:
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = 1024,
+        gzip_level: int = 6,
+        brotli_quality: int = 4,
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = choose_encoding(Headers(scope=scope).get("Accept-Encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start: Optional[Message] = None
+        passthrough = False
+
+        async def send_compressed(message: Message) -> None:
+            nonlocal start, passthrough
+            if message["type"] == "http.response.start":
+                start = message
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            assert start is not None
+            headers = MutableHeaders(raw=start["headers"])
+            body = message.get("body", b"")
+            passthrough = (
+                message.get("more_body", False)
+                or "content-encoding" in headers
+                or len(body) < self.minimum_size
+            )
+            if passthrough:
+                await send(start)
+                await send(message)
+                return
+
+            if len(body) >= THREAD_THRESHOLD:
+                body = await asyncio.to_thread(self.compress, body, encoding)
+            else:
+                body = self.compress(body, encoding)
+            headers["Content-Encoding"] = encoding
+            headers["Content-Length"] = str(len(body))
+            headers.add_vary_header("Accept-Encoding")
+            await send(start)
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, send_compressed)
+
+    def compress(self, body: bytes, encoding: str) -> bytes:
+        if encoding == "br":
+            return brotli.compress(body, quality=self.brotli_quality)
+        return gzip.compress(body, compresslevel=self.gzip_level)
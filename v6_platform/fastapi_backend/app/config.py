@@ -1,4 +1,4 @@
-from typing import Set
+from typing import List, Literal, Set
 
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -7,10 +7,31 @@ class Settings(BaseSettings):
     # OpenAPI docs
     OPENAPI_URL: str = "/openapi.json"
 
+    # Prometheus metrics; set to "" to stop serving them
+    METRICS_URL: str = "/metrics"
+
     # Database
     DATABASE_URL: str
     TEST_DATABASE_URL: str | None = None
     EXPIRE_ON_COMMIT: bool = False
+    # "queue" pools connections, "pgbouncer" pools them without prepared
+    # statement caches, "null" opens a connection per checkout
+    DB_POOL_MODE: Literal["queue", "pgbouncer", "null"] = "queue"
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30.0
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    # Replicas that serve read-only work (listings and cached valuations),
+    # as a JSON list of URLs. Replicas lagging more than
+    # DB_REPLICA_MAX_LAG_SECONDS are skipped, and a caller's reads go to the
+    # primary for DB_READ_YOUR_WRITES_SECONDS after it writes, so keep that
+    # at least as long as the lag bound
+    DATABASE_REPLICA_URLS: List[str] = []
+    DB_REPLICA_MAX_LAG_SECONDS: float = 5.0
+    DB_REPLICA_CHECK_INTERVAL: float = 10.0
+    DB_REPLICA_CHECK_TIMEOUT: float = 2.0
+    DB_READ_YOUR_WRITES_SECONDS: float = 10.0
 
     # User
     ACCESS_SECRET_KEY: str
@@ -18,6 +39,20 @@ class Settings(BaseSettings):
     VERIFICATION_SECRET_KEY: str
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_SECONDS: int = 3600
+    # Authenticated users are cached per token for this long; changes made
+    # through another process are picked up within it. 0 disables the cache
+    AUTH_USER_CACHE_TTL_SECONDS: int = 30
+    AUTH_USER_CACHE_SIZE: int = 10000
+    # Threads that hash and verify passwords, capping how many run at once;
+    # 0 hashes on the event loop
+    PASSWORD_HASH_WORKERS: int = 4
+
+    # Items
+    # Most rows one bulk request may write
+    ITEMS_BULK_MAX_SIZE: int = 10000
+    # Bulk inserts of at least this many rows use COPY on PostgreSQL instead
+    # of multi-row INSERTs
+    ITEMS_COPY_THRESHOLD: int = 1000
 
     # Email
     MAIL_USERNAME: str | None = None
@@ -31,13 +66,98 @@ class Settings(BaseSettings):
     USE_CREDENTIALS: bool = True
     VALIDATE_CERTS: bool = True
     TEMPLATE_DIR: str = "email_templates"
+    # Outgoing mail is queued and sent by a background worker over a reused
+    # SMTP session; messages are dropped once MAIL_QUEUE_SIZE are waiting
+    MAIL_QUEUE_SIZE: int = 1000
+    MAIL_SESSION_MESSAGES: int = 100
+    MAIL_IDLE_SECONDS: float = 10.0
+    MAIL_MAX_RETRIES: int = 3
+    MAIL_RETRY_BASE_DELAY: float = 1.0
 
     # Frontend
     FRONTEND_URL: str = "http://localhost:3000"
 
+    # Response compression: bodies smaller than this are sent as is
+    COMPRESSION_MINIMUM_SIZE: int = 1024
+    COMPRESSION_GZIP_LEVEL: int = 6
+    # Brotli's default of 11 is far too slow for responses built per request
+    COMPRESSION_BROTLI_QUALITY: int = 4
+
     # CORS
     CORS_ORIGINS: Set[str]
 
+    # GitHub scanning
+    GITHUB_TOKEN: str | None = None
+    GITHUB_API_URL: str = "https://api.github.com"
+    GITHUB_GRAPHQL_BATCH_SIZE: int = 25
+    GITHUB_STALE_DAYS: int = 365
+    GITHUB_CACHE_DIR: str | None = None
+    GITHUB_RATE_LIMIT_RESERVE: int = 50
+
+    # JavaScript bundle analysis
+    BUNDLE_FETCH_CONCURRENCY: int = 8
+    BUNDLE_CHUNK_SIZE: int = 64 * 1024
+    BUNDLE_MAX_BYTES: int = 20 * 1024 * 1024
+
+    # Gemini
+    GEMINI_API_KEY: str | None = None
+    GEMINI_MODEL: str = "gemini-1.5-flash"
+    GEMINI_MAX_CONCURRENCY: int = 16
+    # Overall time budget for one generation, retries and hedges included
+    GEMINI_DEADLINE_SECONDS: float = 30.0
+    GEMINI_MAX_RETRIES: int = 2
+    GEMINI_RETRY_BASE_DELAY: float = 0.5
+    # Hedge a call once it is slower than this latency quantile; unset to disable
+    GEMINI_HEDGE_QUANTILE: float | None = 0.95
+    GEMINI_HEDGE_MIN_DELAY: float = 1.0
+    # Consecutive transient failures before failing fast, and for how long
+    GEMINI_BREAKER_FAILURES: int = 5
+    GEMINI_BREAKER_RESET_SECONDS: float = 30.0
+    # Serve the mock valuation instead of a 503 while the breaker is open
+    GEMINI_FALLBACK_TO_MOCK: bool = True
+
+    # Batch analysis. A batch also takes a token per asset from the analyze
+    # bucket, so batches are capped at RATE_LIMIT_ANALYZE_BURST as well
+    ANALYZE_BATCH_MAX_ITEMS: int = 500
+    ANALYZE_BATCH_PACK_SIZE: int = 10
+    ANALYZE_BATCH_PROMPT_CHARS: int = 8000
+
+    # Valuation cache
+    VALUATION_CACHE_TTL_SECONDS: int = 7 * 24 * 3600
+
+    # Scan-and-analyze pipeline: discovered assets waiting for valuation, and
+    # how many are valued at once
+    PIPELINE_QUEUE_SIZE: int = 32
+    PIPELINE_WORKERS: int = 8
+
+    # Rate limiting, with a token bucket per signed-in user, or per client
+    # address for anonymous callers. A scan takes a token from the scan
+    # bucket and each asset valued one from the analyze bucket; buckets hold
+    # up to *_BURST tokens and refill at *_PER_MINUTE. "memory" keeps the
+    # buckets per process, "database" shares them between processes through
+    # the primary database. The analyze burst is the largest batch a caller
+    # can send, so it defaults to ANALYZE_BATCH_MAX_ITEMS
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_BACKEND: Literal["memory", "database"] = "memory"
+    RATE_LIMIT_SCAN_PER_MINUTE: float = 6.0
+    RATE_LIMIT_SCAN_BURST: int = 10
+    RATE_LIMIT_ANALYZE_PER_MINUTE: float = 60.0
+    RATE_LIMIT_ANALYZE_BURST: int = 500
+    # Requests go through unlimited when the backend is slower than this
+    RATE_LIMIT_BACKEND_TIMEOUT: float = 0.5
+
+    # Superusers can profile a scan or analysis request by sending it with
+    # ?profile=1 or an X-Profile: 1 header; the newest PROFILING_MAX_PROFILES
+    # call trees are kept in PROFILING_DIR (a temporary directory by default)
+    PROFILING_ENABLED: bool = True
+    PROFILING_INTERVAL: float = 0.001
+    PROFILING_DIR: str | None = None
+    PROFILING_MAX_PROFILES: int = 50
+
+    # Local heuristic valuations below this confidence go to the LLM instead;
+    # set above 1 to send everything to the LLM
+    HEURISTIC_CONFIDENCE_THRESHOLD: float = 0.9
+
     model_config = SettingsConfigDict(
         env_file=".env", env_file_encoding="utf-8", extra="ignore"
     )
@@ -1,31 +1,166 @@
-from typing import AsyncGenerator
-from urllib.parse import urlparse
+import time
+import uuid
+from typing import Any, AsyncGenerator, Dict, Optional
 
-from fastapi import Depends
+from fastapi import Depends, Request
 from fastapi_users.db import SQLAlchemyUserDatabase
-from sqlalchemy import NullPool
+from sqlalchemy import NullPool, event, exc
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
 from .config import settings
 from .models import Base, User
+from .replicas import ReplicaRouter
+
+
+class PoolStats:
+    def __init__(self):
+        self.checkouts = 0
+        self.checkout_seconds_total = 0.0
+        self.checkout_seconds_max = 0.0
+        self.timeouts = 0
+        self.connects = 0
+
+    def record_checkout(self, seconds: float) -> None:
+        self.checkouts += 1
+        self.checkout_seconds_total += seconds
+        self.checkout_seconds_max = max(self.checkout_seconds_max, seconds)
+
+
+pool_stats = PoolStats()
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """
+    Queue pool that records how long each checkout takes (waiting for a free
+    connection, or opening a new one) and how many connections it opens.
+    """
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            pool_stats.timeouts += 1
+            raise
+        pool_stats.record_checkout(time.perf_counter() - started)
+        return connection
+
+    def _create_connection(self):
+        pool_stats.connects += 1
+        return super()._create_connection()
+
+
+def engine_options() -> Dict[str, Any]:
+    """
+    Engine arguments for ``DB_POOL_MODE``:
+
+    - ``queue``: keep up to ``DB_POOL_SIZE`` + ``DB_MAX_OVERFLOW`` connections
+      open and reuse them across requests.
+    - ``pgbouncer``: the same pool, with asyncpg's prepared statement caches
+      disabled, as PgBouncer's transaction pooling requires.
+    - ``null``: open a fresh connection for every checkout.
+    """
+    if settings.DB_POOL_MODE == "null":
+        return {"poolclass": NullPool}
+
+    options: Dict[str, Any] = {
+        "poolclass": InstrumentedQueuePool,
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+    if settings.DB_POOL_MODE == "pgbouncer":
+        options["connect_args"] = {
+            "statement_cache_size": 0,
+            "prepared_statement_cache_size": 0,
+            # Unnamed statements could collide across server connections
+            "prepared_statement_name_func": lambda: f"__asyncpg_{uuid.uuid4()}__",
+        }
+    return options
 
 
 # Generic async engine
-engine = create_async_engine(settings.DATABASE_URL, poolclass=NullPool)
+engine = create_async_engine(settings.DATABASE_URL, **engine_options())
 
 async_session_maker = async_sessionmaker(
     engine, expire_on_commit=settings.EXPIRE_ON_COMMIT
 )
 
+replica_router = ReplicaRouter(
+    [
+        create_async_engine(url, **engine_options())
+        for url in settings.DATABASE_REPLICA_URLS
+    ],
+    max_lag=settings.DB_REPLICA_MAX_LAG_SECONDS,
+    check_interval=settings.DB_REPLICA_CHECK_INTERVAL,
+    check_timeout=settings.DB_REPLICA_CHECK_TIMEOUT,
+    sticky_seconds=settings.DB_READ_YOUR_WRITES_SECONDS,
+)
+
+
+def pool_status() -> Dict[str, Any]:
+    pool = engine.pool
+    status: Dict[str, Any] = {
+        "mode": settings.DB_POOL_MODE,
+        "checkouts": pool_stats.checkouts,
+        "checkout_seconds_total": pool_stats.checkout_seconds_total,
+        "checkout_seconds_max": pool_stats.checkout_seconds_max,
+        "timeouts": pool_stats.timeouts,
+        "connects": pool_stats.connects,
+    }
+    if isinstance(pool, AsyncAdaptedQueuePool):
+        status.update(
+            size=pool.size(),
+            checked_in=pool.checkedin(),
+            checked_out=pool.checkedout(),
+            overflow=pool.overflow(),
+        )
+    return status
+
 
 async def create_db_and_tables():
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
 
 
-async def get_async_session() -> AsyncGenerator[AsyncSession, None]:
+def client_key(request: Request) -> Optional[str]:
+    """Identifies the caller for read-your-writes: its bearer token, or address."""
+    authorization = request.headers.get("Authorization", "")
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() == "bearer" and token:
+        return token
+    return request.client.host if request.client else None
+
+
+async def get_async_session(request: Request) -> AsyncGenerator[AsyncSession, None]:
     async with async_session_maker() as session:
+        key = client_key(request)
+        if key is not None and replica_router.replicas:
+            # Committing means the caller wrote, so its next reads must see it
+            event.listen(
+                session.sync_session,
+                "after_commit",
+                lambda _: replica_router.record_write(key),
+            )
+        yield session
+
+
+async def get_read_session(
+    request: Request, session: AsyncSession = Depends(get_async_session)
+) -> AsyncGenerator[AsyncSession, None]:
+    """
+    Session for read-only work: on a replica when one is healthy and current
+    enough, otherwise the request's primary session. Never write through it.
+    """
+    replica = await replica_router.choose(client_key(request))
+    if replica is None:
         yield session
+        return
+    async with async_session_maker(bind=replica) as read_session:
+        yield read_session
 
 
 async def get_user_db(session: AsyncSession = Depends(get_async_session)):
@@ -1,10 +1,33 @@
-from pathlib import Path
+"""
+Outgoing email.
+
+Messages are rendered when they are queued and delivered by a background
+worker, so handlers such as forgot-password return without waiting on the SMTP
+server. The worker keeps one SMTP session open while there is mail to send,
+sending up to ``MAIL_SESSION_MESSAGES`` messages over it before reconnecting,
+and closes it after ``MAIL_IDLE_SECONDS`` without mail. Failed deliveries are
+retried with jittered exponential backoff; messages the server rejects
+outright are not.
+"""
+
+import asyncio
+import logging
+import random
 import urllib.parse
+from email.message import EmailMessage
+from email.utils import formatdate, make_msgid
+from pathlib import Path
+from typing import Any, Callable, Optional, Tuple
+
+import aiosmtplib
+from fastapi_mail import ConnectionConfig, MessageSchema, MessageType
+from jinja2 import Environment
 
-from fastapi_mail import FastMail, MessageSchema, ConnectionConfig, MessageType
 from .config import settings
 from .models import User
 
+logger = logging.getLogger(__name__)
+
 
 def get_email_config():
     conf = ConnectionConfig(
@@ -23,8 +46,264 @@ def get_email_config():
     return conf
 
 
-async def send_reset_password_email(user: User, token: str):
-    conf = get_email_config()
+def is_permanent(error: BaseException) -> bool:
+    """Whether the server rejected the message itself, so retrying is pointless."""
+    if isinstance(error, aiosmtplib.SMTPRecipientsRefused):
+        return True
+    return (
+        isinstance(error, aiosmtplib.SMTPResponseException)
+        and not isinstance(error, aiosmtplib.SMTPServerDisconnected)
+        and 500 <= error.code < 600
+    )
+
+
+class MailQueue:
+    def __init__(
+        self,
+        *,
+        maxsize: int,
+        session_messages: int,
+        max_retries: int,
+        retry_base_delay: float,
+        idle_timeout: float,
+        config_factory: Callable[[], ConnectionConfig] = get_email_config,
+    ):
+        self.maxsize = maxsize
+        self.session_messages = session_messages
+        self.max_retries = max_retries
+        self.retry_base_delay = retry_base_delay
+        self.idle_timeout = idle_timeout
+        self.queued = 0
+        self.sent = 0
+        self.failed = 0
+        self.retried = 0
+        self.dropped = 0
+        self.sessions = 0
+        self._config_factory = config_factory
+        self._config: Optional[ConnectionConfig] = None
+        self._templates: Optional[Environment] = None
+        self._queue: Optional[asyncio.Queue[EmailMessage]] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._smtp: Optional[aiosmtplib.SMTP] = None
+        self._session_sent = 0
+
+    @property
+    def config(self) -> ConnectionConfig:
+        # Built on first use and reused; validating it on every send is wasted work
+        if self._config is None:
+            self._config = self._config_factory()
+        return self._config
+
+    def build_message(
+        self, message: MessageSchema, template_name: Optional[str] = None
+    ) -> EmailMessage:
+        """
+        Renders ``message`` with its template, as FastMail does, into a MIME
+        message ready for the SMTP session. Attachments are not supported.
+        """
+        if message.attachments:
+            raise ValueError("Mail attachments are not supported")
+        config = self.config
+        if template_name and config.TEMPLATE_FOLDER:
+            if self._templates is None:
+                self._templates = config.template_engine()
+            template = self._templates.get_template(template_name)
+            if isinstance(message.template_body, list):
+                message.template_body = template.render(body=message.template_body)
+            else:
+                message.template_body = template.render(**message.template_body)
+        sender = config.MAIL_FROM
+        if config.MAIL_FROM_NAME is not None:
+            sender = f"{config.MAIL_FROM_NAME} <{config.MAIL_FROM}>"
+
+        built = EmailMessage()
+        built["Date"] = formatdate(localtime=True)
+        built["Message-ID"] = make_msgid()
+        built["To"] = ", ".join(message.recipients)
+        built["From"] = sender
+        if message.subject:
+            built["Subject"] = message.subject
+        for header, addresses in (
+            ("Cc", message.cc),
+            ("Bcc", message.bcc),
+            ("Reply-To", message.reply_to),
+        ):
+            if addresses:
+                built[header] = ", ".join(addresses)
+        for name, value in (message.headers or {}).items():
+            built[name] = value
+
+        body = message.template_body
+        if not isinstance(body, str):
+            body = message.body if isinstance(message.body, str) else ""
+        subtype = message.subtype.value
+        built.set_content(body, subtype=subtype, charset=message.charset)
+        if message.alternative_body is not None:
+            built.add_alternative(
+                message.alternative_body,
+                subtype="plain" if subtype == "html" else "html",
+                charset=message.charset,
+            )
+        return built
+
+    async def send(
+        self, message: MessageSchema, template_name: Optional[str] = None
+    ) -> None:
+        """Queues ``message`` for delivery and returns without waiting for it."""
+        built = self.build_message(message, template_name)
+        queue = self._ensure_worker()
+        try:
+            queue.put_nowait(built)
+        except asyncio.QueueFull:
+            self.dropped += 1
+            logger.error("Mail queue is full; dropping message to %s", built["To"])
+            return
+        self.queued += 1
+
+    async def flush(self) -> None:
+        """Waits until every queued message has been delivered or given up on."""
+        if self._queue is not None and self._worker is not None:
+            await self._queue.join()
+
+    async def close(self, timeout: float = 10.0) -> None:
+        """Delivers what is queued, within ``timeout``, and stops the worker."""
+        worker = self._worker
+        if worker is None or worker.get_loop() is not asyncio.get_running_loop():
+            return
+        try:
+            await asyncio.wait_for(self.flush(), timeout)
+        except TimeoutError:
+            logger.warning(
+                "Shutting down with %d undelivered message(s)", self._queue.qsize()
+            )
+        worker.cancel()
+        await asyncio.gather(worker, return_exceptions=True)
+        self._worker = None
+        await self._disconnect()
+
+    def _ensure_worker(self) -> "asyncio.Queue[EmailMessage]":
+        # Started lazily so importing the app starts nothing. A queue belongs
+        # to one event loop, so a new loop (e.g. in tests) gets a new one.
+        loop = asyncio.get_running_loop()
+        if self._worker is None or self._worker.get_loop() is not loop:
+            self._queue = asyncio.Queue(self.maxsize)
+            self._smtp = None
+            self._worker = None
+        if self._worker is None or self._worker.done():
+            self._worker = loop.create_task(self._run(self._queue))
+        assert self._queue is not None
+        return self._queue
+
+    async def _run(self, queue: "asyncio.Queue[EmailMessage]") -> None:
+        while True:
+            if self._smtp is None:
+                message = await queue.get()
+            else:
+                try:
+                    message = await asyncio.wait_for(queue.get(), self.idle_timeout)
+                except TimeoutError:
+                    await self._disconnect()
+                    continue
+            try:
+                await self._deliver(message)
+            except Exception:
+                self.failed += 1
+                logger.exception(
+                    "Unexpected error delivering mail to %s", message["To"]
+                )
+            finally:
+                queue.task_done()
+
+    async def _deliver(self, message: EmailMessage) -> None:
+        attempt = 0
+        while True:
+            try:
+                smtp = await self._connect()
+                await smtp.send_message(message)
+            except (aiosmtplib.SMTPException, OSError) as e:
+                if is_permanent(e):
+                    self.failed += 1
+                    logger.error("Mail to %s rejected: %s", message["To"], e)
+                    return
+                await self._disconnect()
+                attempt += 1
+                if attempt > self.max_retries:
+                    self.failed += 1
+                    logger.error(
+                        "Giving up on mail to %s after %d attempts: %s",
+                        message["To"],
+                        attempt,
+                        e,
+                    )
+                    return
+                self.retried += 1
+                await asyncio.sleep(
+                    random.uniform(0, self.retry_base_delay * 2 ** (attempt - 1))
+                )
+            else:
+                self.sent += 1
+                self._session_sent += 1
+                return
+
+    async def _connect(self) -> aiosmtplib.SMTP:
+        if self._smtp is not None and (
+            self._session_sent >= self.session_messages or not self._smtp.is_connected
+        ):
+            await self._disconnect()
+        if self._smtp is None:
+            config = self.config
+            smtp = aiosmtplib.SMTP(
+                hostname=config.MAIL_SERVER,
+                port=config.MAIL_PORT,
+                timeout=config.TIMEOUT,
+                use_tls=config.MAIL_SSL_TLS,
+                start_tls=config.MAIL_STARTTLS,
+                validate_certs=config.VALIDATE_CERTS,
+            )
+            try:
+                await smtp.connect()
+                if config.USE_CREDENTIALS:
+                    await smtp.login(config.MAIL_USERNAME, config.MAIL_PASSWORD)
+            except BaseException:
+                smtp.close()
+                raise
+            self._smtp = smtp
+            self._session_sent = 0
+            self.sessions += 1
+        return self._smtp
+
+    async def _disconnect(self) -> None:
+        smtp, self._smtp = self._smtp, None
+        if smtp is None or not smtp.is_connected:
+            return
+        try:
+            await smtp.quit()
+        except (aiosmtplib.SMTPException, OSError):
+            smtp.close()
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "pending": self._queue.qsize() if self._queue is not None else 0,
+            "queued": self.queued,
+            "sent": self.sent,
+            "failed": self.failed,
+            "retried": self.retried,
+            "dropped": self.dropped,
+            "sessions": self.sessions,
+            "connected": self._smtp is not None and self._smtp.is_connected,
+        }
+
+
+mail_queue = MailQueue(
+    maxsize=settings.MAIL_QUEUE_SIZE,
+    session_messages=settings.MAIL_SESSION_MESSAGES,
+    max_retries=settings.MAIL_MAX_RETRIES,
+    retry_base_delay=settings.MAIL_RETRY_BASE_DELAY,
+    idle_timeout=settings.MAIL_IDLE_SECONDS,
+)
+
+
+def reset_password_message(user: User, token: str) -> Tuple[MessageSchema, str]:
     email = user.email
     base_url = f"{settings.FRONTEND_URL}/password-recovery/confirm?"
     params = {"token": token}
@@ -36,6 +315,9 @@ async def send_reset_password_email(user: User, token: str):
         template_body={"username": email, "link": link},
         subtype=MessageType.html,
     )
+    return message, "password_reset.html"
+
 
-    fm = FastMail(conf)
-    await fm.send_message(message, template_name="password_reset.html")
+async def send_reset_password_email(user: User, token: str):
+    message, template_name = reset_password_message(user, token)
+    await mail_queue.send(message, template_name)
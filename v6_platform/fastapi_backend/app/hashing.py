@@ -0,0 +1,109 @@
+"""
+Password hashing off the event loop.
+
+Argon2 hashing and verification take tens of milliseconds of CPU each, so
+running them on the event loop stalls every other request during a burst of
+logins. ``PasswordHasher`` runs them on a dedicated thread pool of
+``PASSWORD_HASH_WORKERS`` threads, which also caps how many run at once (and
+how much memory Argon2 uses). With 0 workers hashing runs inline on the event
+loop, as fastapi-users does by default.
+"""
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional, Tuple, TypeVar
+
+from fastapi_users.password import PasswordHelper
+
+from app.config import settings
+
+T = TypeVar("T")
+
+
+class PasswordHasher:
+    def __init__(self, workers: int, helper: Optional[PasswordHelper] = None):
+        self.workers = workers
+        self.helper = helper or PasswordHelper()
+        self.waiting = 0
+        self.in_flight = 0
+        self.max_waiting = 0
+        self.completed = 0
+        self.total_queue_seconds = 0.0
+        self.max_queue_seconds = 0.0
+        self.total_hash_seconds = 0.0
+        self._executor: Optional[ThreadPoolExecutor] = None
+        # Guards the counters the worker threads update
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        # Created lazily so importing the app starts no threads
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.workers, thread_name_prefix="password-hash"
+            )
+        return self._executor
+
+    async def _run(self, function: Callable[..., T], *args: Any) -> T:
+        if self.workers <= 0:
+            started = time.perf_counter()
+            result = function(*args)
+            self._record(0.0, time.perf_counter() - started)
+            return result
+
+        def timed() -> Tuple[T, float, float]:
+            with self._lock:
+                self.waiting -= 1
+                self.in_flight += 1
+            started = time.perf_counter()
+            try:
+                return function(*args), started, time.perf_counter()
+            finally:
+                with self._lock:
+                    self.in_flight -= 1
+
+        submitted = time.perf_counter()
+        with self._lock:
+            self.waiting += 1
+            self.max_waiting = max(self.max_waiting, self.waiting)
+        result, started, finished = await asyncio.get_running_loop().run_in_executor(
+            self._get_executor(), timed
+        )
+        self._record(started - submitted, finished - started)
+        return result
+
+    def _record(self, queue_seconds: float, hash_seconds: float) -> None:
+        self.completed += 1
+        self.total_queue_seconds += queue_seconds
+        self.max_queue_seconds = max(self.max_queue_seconds, queue_seconds)
+        self.total_hash_seconds += hash_seconds
+
+    async def hash(self, password: str) -> str:
+        return await self._run(self.helper.hash, password)
+
+    async def verify_and_update(
+        self, plain_password: str, hashed_password: str
+    ) -> Tuple[bool, Optional[str]]:
+        return await self._run(
+            self.helper.verify_and_update, plain_password, hashed_password
+        )
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "waiting": self.waiting,
+            "in_flight": self.in_flight,
+            "max_waiting": self.max_waiting,
+            "completed": self.completed,
+            "average_queue_seconds": self.total_queue_seconds / self.completed
+            if self.completed
+            else 0.0,
+            "max_queue_seconds": self.max_queue_seconds,
+            "average_hash_seconds": self.total_hash_seconds / self.completed
+            if self.completed
+            else 0.0,
+        }
+
+
+password_hasher = PasswordHasher(settings.PASSWORD_HASH_WORKERS)
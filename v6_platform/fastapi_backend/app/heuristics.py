@@ -0,0 +1,174 @@
+"""
+Local valuation rules that answer obvious assets without asking Gemini.
+
+Each rule looks at cheap asset features (status, type, name, domain and
+description keywords) and, when it matches, proposes a valuation with a
+confidence. Only proposals at or above ``HEURISTIC_CONFIDENCE_THRESHOLD`` are
+used; anything less certain is left to the LLM. Every decision is logged.
+"""
+
+import logging
+import re
+from dataclasses import dataclass
+from typing import Callable, List, Optional
+from urllib.parse import urlsplit
+
+from app.config import settings
+from app.schemas import AnalysisResult, Asset
+
+logger = logging.getLogger(__name__)
+
+PLACEHOLDER_HOSTS = {"localhost", "127.0.0.1", "0.0.0.0", "example.com", "example.org"}
+
+PLACEHOLDER_PATTERN = re.compile(r"unknown-dependency|lorem ipsum", re.I)
+
+
+@dataclass(frozen=True)
+class Verdict:
+    rule: str
+    confidence: float
+    result: AnalysisResult
+
+
+def _verdict(rule: str, confidence: float, valuation: str, reasoning: str) -> Verdict:
+    return Verdict(
+        rule=rule,
+        confidence=confidence,
+        result=AnalysisResult(
+            valuation=valuation,
+            reasoning=reasoning,
+            details=f"Local heuristic valuation ({rule}).",
+        ),
+    )
+
+
+def _unreachable(asset: Asset) -> Optional[Verdict]:
+    if asset.status == "error" or asset.name.startswith(
+        ("Inaccessible:", "GitHub scan incomplete:")
+    ):
+        return _verdict(
+            "unreachable",
+            0.99,
+            "$0",
+            "The target could not be scanned, so there is nothing to value.",
+        )
+    return None
+
+
+def _placeholder(asset: Asset) -> Optional[Verdict]:
+    host = (urlsplit(asset.url).hostname or "").lower()
+    if (
+        host in PLACEHOLDER_HOSTS
+        or host.endswith((".example.com", ".test", ".invalid", ".localhost"))
+        or PLACEHOLDER_PATTERN.search(f"{asset.name} {asset.description}")
+    ):
+        return _verdict(
+            "placeholder",
+            0.95,
+            "$0",
+            "Placeholder or mock finding that does not point at a real asset.",
+        )
+    return None
+
+
+def _exposed_key(asset: Asset) -> Optional[Verdict]:
+    if asset.name.startswith("Exposed key:"):
+        return _verdict(
+            "exposed_key",
+            0.9,
+            "$0 (liability)",
+            "A leaked credential is a security liability, not a transferable asset.",
+        )
+    return None
+
+
+def _target_site(asset: Asset) -> Optional[Verdict]:
+    if asset.type == "chrome_ghost" and asset.name.startswith("Verified Site:"):
+        return _verdict(
+            "target_site",
+            0.85,
+            "$0",
+            "The scanned site itself is the subject of the scan, not a find.",
+        )
+    return None
+
+
+def _abandoned_branch(asset: Asset) -> Optional[Verdict]:
+    if "abandoned branch" in asset.description.lower():
+        return _verdict(
+            "abandoned_branch",
+            0.75,
+            "$0 - $1k",
+            "Abandoned branches rarely carry value beyond the main repository.",
+        )
+    return None
+
+
+def _deprecated_dependency(asset: Asset) -> Optional[Verdict]:
+    if "deprecated dependency" in asset.description.lower():
+        return _verdict(
+            "deprecated_dependency",
+            0.7,
+            "$0 - $2k",
+            "Migrating off a deprecated dependency is maintenance work, "
+            "not an acquisition.",
+        )
+    return None
+
+
+# In order of precedence; the first matching rule decides
+RULES: List[Callable[[Asset], Optional[Verdict]]] = [
+    _unreachable,
+    _placeholder,
+    _exposed_key,
+    _target_site,
+    _abandoned_branch,
+    _deprecated_dependency,
+]
+
+
+class HeuristicStats:
+    def __init__(self):
+        self.answered = 0
+        self.deferred = 0
+
+
+stats = HeuristicStats()
+
+
+def evaluate(asset: Asset) -> Optional[Verdict]:
+    """Returns the first matching rule's verdict, whatever its confidence."""
+    for rule in RULES:
+        verdict = rule(asset)
+        if verdict is not None:
+            return verdict
+    return None
+
+
+def answer(asset: Asset) -> Optional[AnalysisResult]:
+    """
+    Returns a local valuation when a rule is confident enough, or None when
+    the asset should go to the LLM.
+    """
+    verdict = evaluate(asset)
+    threshold = settings.HEURISTIC_CONFIDENCE_THRESHOLD
+    if verdict is not None and verdict.confidence >= threshold:
+        stats.answered += 1
+        logger.info(
+            "Heuristic valuation for %s: rule=%s confidence=%.2f threshold=%.2f",
+            asset.id,
+            verdict.rule,
+            verdict.confidence,
+            threshold,
+        )
+        return verdict.result
+
+    stats.deferred += 1
+    logger.info(
+        "Deferring %s to the LLM: rule=%s confidence=%.2f threshold=%.2f",
+        asset.id,
+        verdict.rule if verdict else None,
+        verdict.confidence if verdict else 0.0,
+        threshold,
+    )
+    return None
@@ -0,0 +1,178 @@
+"""
+Gemini access for the API.
+
+Calls use the SDK's native async client, so a slow generation never blocks the
+event loop, and go through a process-wide gate that caps concurrent calls at
+``GEMINI_MAX_CONCURRENCY``. Calls beyond the cap wait in line; the gate keeps
+track of how many are waiting so the queue depth can be monitored.
+
+Generations also run under ``upstream``, which adds deadlines, hedging,
+retries and a circuit breaker (see ``app.resilience``).
+
+The Gemini SDK takes the better part of a second to import, so it is only
+imported once a generation is actually made; processes that never value an
+asset (e.g. a serverless instance serving auth) never load it.
+"""
+
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from functools import lru_cache
+from typing import TYPE_CHECKING, Any, AsyncIterator
+
+from app.config import settings
+from app.metrics import observe_upstream
+from app.resilience import CircuitBreaker, CircuitOpenError, ResilientCaller
+
+if TYPE_CHECKING:
+    import google.generativeai as genai
+
+
+class GeminiGate:
+    """Bounds concurrent Gemini calls and records queue depth and wait times."""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.in_flight = 0
+        self.waiting = 0
+        self.max_waiting = 0
+        self.completed = 0
+        self.total_wait_seconds = 0.0
+        self._semaphore: asyncio.Semaphore | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        # Semaphores are bound to the loop they first wait on
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.limit)
+            self._loop = loop
+        return self._semaphore
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        semaphore = self._get_semaphore()
+        start = time.perf_counter()
+        self.waiting += 1
+        self.max_waiting = max(self.max_waiting, self.waiting)
+        try:
+            await semaphore.acquire()
+        finally:
+            self.waiting -= 1
+        self.total_wait_seconds += time.perf_counter() - start
+        self.in_flight += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            self.completed += 1
+            semaphore.release()
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "limit": self.limit,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "max_waiting": self.max_waiting,
+            "completed": self.completed,
+            "average_wait_seconds": self.total_wait_seconds / self.completed
+            if self.completed
+            else 0.0,
+        }
+
+
+gate = GeminiGate(settings.GEMINI_MAX_CONCURRENCY)
+
+
+def is_transient(error: BaseException) -> bool:
+    """Failures worth retrying, and that count against Gemini's health."""
+    from google.api_core import exceptions as google_exceptions
+
+    return isinstance(
+        error,
+        (
+            google_exceptions.TooManyRequests,
+            google_exceptions.ServerError,
+            TimeoutError,
+            ConnectionError,
+        ),
+    )
+
+
+upstream = ResilientCaller(
+    deadline=settings.GEMINI_DEADLINE_SECONDS,
+    retries=settings.GEMINI_MAX_RETRIES,
+    base_delay=settings.GEMINI_RETRY_BASE_DELAY,
+    breaker=CircuitBreaker(
+        settings.GEMINI_BREAKER_FAILURES, settings.GEMINI_BREAKER_RESET_SECONDS
+    ),
+    hedge_quantile=settings.GEMINI_HEDGE_QUANTILE,
+    min_hedge_delay=settings.GEMINI_HEDGE_MIN_DELAY,
+    is_transient=is_transient,
+    # A hedge that has to queue behind the gate only adds load
+    can_hedge=lambda: gate.waiting == 0,
+)
+
+
+def is_configured() -> bool:
+    return bool(settings.GEMINI_API_KEY)
+
+
+@lru_cache(maxsize=1)
+def get_model() -> "genai.GenerativeModel":
+    import google.generativeai as genai
+
+    genai.configure(api_key=settings.GEMINI_API_KEY)
+    return genai.GenerativeModel(settings.GEMINI_MODEL)
+
+
+async def _generate_once(prompt: str, **kwargs: Any) -> str:
+    async with gate.slot():
+        with observe_upstream("gemini", "generate"):
+            response = await get_model().generate_content_async(prompt, **kwargs)
+    return response.text
+
+
+async def generate_text(prompt: str, **kwargs: Any) -> str:
+    """
+    Runs one Gemini generation without blocking the event loop. Raises
+    CircuitOpenError without calling Gemini while it is considered down.
+    """
+    return await upstream.call(lambda: _generate_once(prompt, **kwargs))
+
+
+async def stream_text(prompt: str, **kwargs: Any) -> AsyncIterator[str]:
+    """
+    Yields a Gemini generation piece by piece as it arrives. The gate slot is
+    held until the stream is exhausted or the consumer stops iterating.
+
+    Streams are neither hedged nor retried, since pieces may already have
+    been forwarded, but they respect the circuit breaker and the deadline
+    applies to the start of the response.
+    """
+    breaker = upstream.breaker
+    if not breaker.allow():
+        upstream.rejected += 1
+        raise CircuitOpenError("Upstream is unavailable; not calling it.")
+    try:
+        async with gate.slot():
+            with observe_upstream("gemini", "stream"):
+                response = await asyncio.wait_for(
+                    get_model().generate_content_async(prompt, stream=True, **kwargs),
+                    settings.GEMINI_DEADLINE_SECONDS,
+                )
+                async for chunk in response:
+                    try:
+                        text = chunk.text
+                    except ValueError:
+                        # Chunks without text parts, e.g. a trailing finish reason
+                        continue
+                    if text:
+                        yield text
+    except Exception as e:
+        if is_transient(e):
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+        raise
+    breaker.record_success()
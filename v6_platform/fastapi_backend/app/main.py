@@ -1,4 +1,7 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 from fastapi_pagination import add_pagination
 from .schemas import UserCreate, UserRead, UserUpdate
 from .users import auth_backend, fastapi_users, AUTH_URL_PATH
@@ -7,11 +10,46 @@ from .utils import simple_generate_unique_route_id
 
 from app.routes.scan import router as scan_router
 from app.routes.analyze import router as analyze_router
+from app.routes.health import router as health_router
+from app.routes.items import router as items_router
+from app.routes.profiles import router as profiles_router
+from app.compression import CompressionMiddleware
 from app.config import settings
+from app import heuristics, llm, valuation_cache
+from app.database import pool_status, replica_router
+from app.email import mail_queue
+from app.hashing import password_hasher
+from app.metrics import MetricsMiddleware, metrics_endpoint, registry
+from app.profiling import ProfilingMiddleware, is_available as profiling_available
+from app.rate_limit import rate_limiter
+from app.user_cache import user_cache
+from app.openapi_schema import serve_prebuilt_openapi
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    # Deliver mail that is still queued before the worker goes away
+    await mail_queue.close()
+    await replica_router.close()
+
 
 app = FastAPI(
+    lifespan=lifespan,
     generate_unique_id_function=simple_generate_unique_route_id,
     openapi_url=settings.OPENAPI_URL,
+    default_response_class=ORJSONResponse,
+)
+
+# Innermost, so a profile covers the route and the response it streams
+if profiling_available():
+    app.add_middleware(ProfilingMiddleware)
+
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=settings.COMPRESSION_MINIMUM_SIZE,
+    gzip_level=settings.COMPRESSION_GZIP_LEVEL,
+    brotli_quality=settings.COMPRESSION_BROTLI_QUALITY,
 )
 
 # Middleware for CORS configuration
@@ -23,6 +61,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Outermost, so the latencies include compression
+app.add_middleware(MetricsMiddleware)
+
 # Include authentication and user management routes
 app.include_router(
     fastapi_users.get_auth_router(auth_backend),
@@ -50,8 +91,27 @@ app.include_router(
     tags=["users"],
 )
 
+app.include_router(items_router, prefix="/items")
 
 app.include_router(scan_router, prefix="/api/scan", tags=["scan"])
 app.include_router(analyze_router, prefix="/api/analyze", tags=["analyze"])
+app.include_router(health_router, prefix="/api/health", tags=["health"])
+app.include_router(profiles_router, prefix="/api/profiles", tags=["profiles"])
 
 add_pagination(app)
+
+if settings.METRICS_URL:
+    app.add_route(settings.METRICS_URL, metrics_endpoint, include_in_schema=False)
+    registry.register_stats("gemini_queue", llm.gate.stats)
+    registry.register_stats("gemini_upstream", llm.upstream.stats)
+    registry.register_stats("valuation_cache", valuation_cache.stats.snapshot)
+    registry.register_stats("heuristics", lambda: vars(heuristics.stats))
+    registry.register_stats("user_cache", lambda: {"entries": len(user_cache)})
+    registry.register_stats("db_pool", pool_status)
+    registry.register_stats("db", replica_router.stats)
+    registry.register_stats("password_hashing", password_hasher.stats)
+    registry.register_stats("mail_queue", mail_queue.stats)
+    registry.register_stats("rate_limit", rate_limiter.stats)
+
+# /openapi.json serves the schema prebuilt by commands.generate_openapi_schema
+serve_prebuilt_openapi(app)
@@ -0,0 +1,337 @@
+"""
+Prometheus metrics.
+
+``MetricsMiddleware`` records the latency of every request in a histogram per
+route template (``/items/{item_id}`` rather than each item's URL), counts
+responses by status and unhandled exceptions, and tracks requests in flight.
+``observe_upstream`` does the same for calls the app makes to Gemini, GitHub
+and scanned sites, from async code and from scanner threads alike.
+
+``METRICS_URL`` serves all of it in the Prometheus text format, followed by
+the stats the app already keeps (Gemini gate and circuit breaker, caches,
+connection pool, password hasher, mail queue and replicas) as gauges.
+Metrics are kept per process.
+"""
+
+import abc
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Sequence, Tuple, TypeVar
+
+from fastapi import Request, Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Seconds; spans a cached lookup up to a slow Gemini generation or scan
+DEFAULT_BUCKETS = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+Labels = Tuple[str, ...]
+
+
+def format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = (
+        '{}="{}"'.format(
+            name,
+            str(value).replace("\\", r"\\").replace('"', r"\"").replace("\n", r"\n"),
+        )
+        for name, value in zip(names, values)
+    )
+    return "{" + ",".join(pairs) + "}"
+
+
+class Metric(abc.ABC):
+    type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+
+    def render(self) -> List[str]:
+        return [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type}",
+            *self.samples(),
+        ]
+
+    @abc.abstractmethod
+    def samples(self) -> List[str]:
+        """The metric's sample lines in the text format."""
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        super().__init__(name, documentation, labels)
+        self.values: Dict[Labels, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        with self._lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = sorted(self.values.items())
+        return [
+            f"{self.name}{format_labels(self.label_names, labels)} {format_value(value)}"
+            for labels, value in values
+        ]
+
+
+class Gauge(Counter):
+    type = "gauge"
+
+    def dec(self, *labels: str, amount: float = 1) -> None:
+        self.inc(*labels, amount=-amount)
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(float(bound) for bound in buckets))
+        # Per label set: observations per bucket (the last one is +Inf), sum
+        self.values: Dict[Labels, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self.values.get(labels)
+            if entry is None:
+                entry = self.values[labels] = ([0] * (len(self.buckets) + 1), [0.0])
+            entry[0][index] += 1
+            entry[1][0] += value
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = sorted(
+                (labels, (list(counts), total[0]))
+                for labels, (counts, total) in self.values.items()
+            )
+        names = self.label_names + ("le",)
+        lines = []
+        for labels, (counts, total) in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = format_labels(names, labels + (format_value(bound),))
+                lines.append(f"{self.name}_bucket{le} {cumulative}")
+            own = format_labels(self.label_names, labels)
+            lines.append(f"{self.name}_sum{own} {format_value(total)}")
+            lines.append(f"{self.name}_count{own} {cumulative}")
+        return lines
+
+
+M = TypeVar("M", bound=Metric)
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: List[Metric] = []
+        self.collectors: List[Tuple[str, Callable[[], Dict[str, Any]]]] = []
+
+    def register(self, metric: M) -> M:
+        self.metrics.append(metric)
+        return metric
+
+    def register_stats(self, prefix: str, stats: Callable[[], Dict[str, Any]]) -> None:
+        """Exports a ``stats()`` dict's numbers as ``<prefix>_<key>`` gauges."""
+        self.collectors.append((prefix, stats))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        for prefix, stats in self.collectors:
+            lines.extend(render_stats(prefix, stats()))
+        return "\n".join(lines) + "\n"
+
+
+def render_stats(prefix: str, stats: Dict[str, Any]) -> List[str]:
+    """
+    Numbers and flags become gauges and strings (e.g. a circuit breaker's
+    state) info-style gauges labelled with the value. Lists of dicts (e.g.
+    the replicas) become one gauge per numeric field, labelled with each
+    entry's strings. Anything else, and None, is left out.
+    """
+    samples: Dict[str, List[str]] = {}
+
+    def number(value: Any) -> Any:
+        return int(value) if isinstance(value, bool) else value
+
+    for key, value in stats.items():
+        name = f"{prefix}_{key}"
+        value = number(value)
+        if isinstance(value, (int, float)):
+            samples.setdefault(name, []).append(f"{name} {format_value(value)}")
+        elif isinstance(value, str):
+            samples.setdefault(name, []).append(
+                f"{name}{format_labels([key], [value])} 1"
+            )
+        elif isinstance(value, list):
+            for entry in value:
+                labels = {k: v for k, v in entry.items() if isinstance(v, str)}
+                for field, field_value in entry.items():
+                    field_value = number(field_value)
+                    if not isinstance(field_value, (int, float)):
+                        continue
+                    field_name = f"{name}_{field}"
+                    own = format_labels(list(labels), list(labels.values()))
+                    samples.setdefault(field_name, []).append(
+                        f"{field_name}{own} {format_value(field_value)}"
+                    )
+    lines = []
+    for name, values in samples.items():
+        lines += [f"# TYPE {name} gauge", *values]
+    return lines
+
+
+registry = Registry()
+
+http_requests = registry.register(
+    Counter(
+        "http_requests_total",
+        "HTTP responses by route template and status code.",
+        ["method", "route", "status"],
+    )
+)
+http_request_duration = registry.register(
+    Histogram(
+        "http_request_duration_seconds",
+        "Time from receiving a request to sending the last of its response.",
+        ["method", "route"],
+    )
+)
+http_requests_in_flight = registry.register(
+    Gauge(
+        "http_requests_in_flight",
+        "HTTP requests being handled.",
+        ["method"],
+    )
+)
+http_exceptions = registry.register(
+    Counter(
+        "http_exceptions_total",
+        "Requests that raised an unhandled exception.",
+        ["method", "route", "exception"],
+    )
+)
+upstream_duration = registry.register(
+    Histogram(
+        "upstream_request_duration_seconds",
+        "Latency of calls to upstream services.",
+        ["upstream", "operation"],
+    )
+)
+upstream_in_flight = registry.register(
+    Gauge(
+        "upstream_requests_in_flight",
+        "Calls to upstream services in progress.",
+        ["upstream"],
+    )
+)
+upstream_errors = registry.register(
+    Counter(
+        "upstream_errors_total",
+        "Calls to upstream services that raised, by exception type.",
+        ["upstream", "operation", "exception"],
+    )
+)
+
+
+@contextmanager
+def observe_upstream(upstream: str, operation: str) -> Iterator[None]:
+    """Times the calls to ``upstream`` made within the block."""
+    upstream_in_flight.inc(upstream)
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception as e:
+        upstream_errors.inc(upstream, operation, type(e).__name__)
+        raise
+    finally:
+        upstream_duration.observe(time.perf_counter() - start, upstream, operation)
+        upstream_in_flight.dec(upstream)
+
+
+def route_template(scope: Scope) -> str:
+    """The matched route's path template, or a fixed label for 404s."""
+    route = scope.get("route")
+    if route is not None:
+        return route.path
+    # Plain Starlette routes (docs, the OpenAPI schema) do not record the
+    # route; the path is safe as a label as long as it has no parameters
+    if "endpoint" in scope and not scope.get("path_params"):
+        return scope["path"]
+    return "unmatched"
+
+
+class MetricsMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        http_requests_in_flight.inc(method)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        except BaseException as e:
+            http_exceptions.inc(method, route_template(scope), type(e).__name__)
+            raise
+        finally:
+            # The router recorded the matched route in the shared scope
+            route = route_template(scope)
+            http_request_duration.observe(time.perf_counter() - start, method, route)
+            http_requests.inc(method, route, str(status))
+            http_requests_in_flight.dec(method)
+
+
+async def metrics_endpoint(request: Request) -> Response:
+    return Response(registry.render(), media_type=CONTENT_TYPE)
@@ -1,6 +1,16 @@
 from fastapi_users.db import SQLAlchemyBaseUserTableUUID
 from sqlalchemy.orm import DeclarativeBase
-from sqlalchemy import Column, String, Integer, ForeignKey
+from sqlalchemy import (
+    Boolean,
+    Column,
+    String,
+    Integer,
+    Float,
+    ForeignKey,
+    DateTime,
+    Text,
+    Index,
+)
 from sqlalchemy.orm import relationship
 from sqlalchemy.dialects.postgresql import UUID
 from uuid import uuid4
@@ -11,8 +21,44 @@ class Base(DeclarativeBase):
 
 
 class User(SQLAlchemyBaseUserTableUUID, Base):
-    pass
+    items = relationship("Item", back_populates="user", passive_deletes=True)
+
+
+class Item(Base):
+    __tablename__ = "items"
+    # Serves both per-user lookups and keyset pagination by id
+    __table_args__ = (Index("ix_items_user_id_id", "user_id", "id"),)
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid4)
+    name = Column(String, nullable=False)
+    description = Column(String, nullable=True)
+    quantity = Column(Integer, nullable=True)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("user.id"), nullable=False)
+
+    user = relationship("User", back_populates="items")
+
+
+class Valuation(Base):
+    """Cached Gemini valuation, keyed by a fingerprint of the asset and model."""
+
+    __tablename__ = "valuations"
+
+    fingerprint = Column(String(64), primary_key=True)
+    model = Column(String, nullable=False)
+    valuation = Column(Text, nullable=False)
+    reasoning = Column(Text, nullable=False)
+    details = Column(Text, nullable=False)
+    created_at = Column(DateTime(timezone=True), nullable=False)
 
 
+class RateLimitBucket(Base):
+    """Token bucket shared by the workers of a deployment, keyed per caller."""
 
+    __tablename__ = "rate_limit_buckets"
 
+    key = Column(String, primary_key=True)
+    tokens = Column(Float, nullable=False)
+    # Unix time of the last take, from which the bucket refills
+    updated_at = Column(Float, nullable=False)
+    # Whether the last take got its tokens
+    allowed = Column(Boolean, nullable=False)
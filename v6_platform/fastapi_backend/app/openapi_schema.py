@@ -0,0 +1,121 @@
+"""
+Prebuilt OpenAPI schema.
+
+``python -m commands.generate_openapi_schema`` writes the app's schema to
+``openapi_schema.json`` at build time, next to a fingerprint of everything
+that shapes it: the app's sources and the versions of the libraries that
+generate it. ``serve_prebuilt_openapi`` serves those bytes as they are, with
+an ETag, instead of building and serializing the schema on the first request
+of every instance. Should the fingerprint not match the running code (a
+route changed since the last build), the schema is generated once at runtime
+as before.
+"""
+
+import hashlib
+import logging
+from importlib.metadata import version
+from pathlib import Path
+from typing import Any, Optional
+
+import orjson
+from fastapi import FastAPI, Request, Response
+from starlette.routing import Route
+
+logger = logging.getLogger(__name__)
+
+APP_DIR = Path(__file__).resolve().parent
+ARTIFACT_PATH = APP_DIR / "openapi_schema.json"
+FINGERPRINT_PATH = APP_DIR / "openapi_schema.fingerprint"
+
+# Libraries whose upgrades can change the generated schema
+SCHEMA_LIBRARIES = ["fastapi", "pydantic", "fastapi-users", "fastapi-pagination"]
+
+
+def fingerprint() -> str:
+    """Hashes the app's sources and the schema libraries' versions."""
+    digest = hashlib.sha256()
+    for library in SCHEMA_LIBRARIES:
+        digest.update(f"{library}=={version(library)}\n".encode())
+    for path in sorted(APP_DIR.rglob("*.py")):
+        digest.update(f"{path.relative_to(APP_DIR).as_posix()}\n".encode())
+        digest.update(path.read_bytes())
+    return digest.hexdigest()
+
+
+def serialize(schema: dict[str, Any]) -> bytes:
+    return orjson.dumps(schema)
+
+
+def is_current(current: str) -> bool:
+    try:
+        return FINGERPRINT_PATH.read_text().strip() == current
+    except FileNotFoundError:
+        return False
+
+
+def write_if_changed(path: Path, data: bytes) -> bool:
+    """Writes ``data`` unless ``path`` already holds it, keeping its mtime."""
+    try:
+        if path.read_bytes() == data:
+            return False
+    except FileNotFoundError:
+        pass
+    path.write_bytes(data)
+    return True
+
+
+def write_artifact(schema: dict[str, Any], current: str) -> bool:
+    """Stores the schema and its fingerprint; False when neither changed."""
+    written = write_if_changed(ARTIFACT_PATH, serialize(schema))
+    return write_if_changed(FINGERPRINT_PATH, f"{current}\n".encode()) or written
+
+
+def load_artifact() -> Optional[bytes]:
+    """The prebuilt schema, or None when it is missing or out of date."""
+    try:
+        body = ARTIFACT_PATH.read_bytes()
+    except FileNotFoundError:
+        logger.info("No prebuilt OpenAPI schema, generating it at runtime")
+        return None
+    if not is_current(fingerprint()):
+        logger.warning("The prebuilt OpenAPI schema is stale, generating it")
+        return None
+    return body
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in tags or etag in tags
+
+
+class OpenAPIEndpoint:
+    def __init__(self, app: FastAPI):
+        self.app = app
+        self.body: Optional[bytes] = None
+        self.etag = ""
+
+    def load(self) -> bytes:
+        if self.body is None:
+            self.body = load_artifact() or serialize(self.app.openapi())
+            self.etag = f'"{hashlib.sha256(self.body).hexdigest()[:32]}"'
+        return self.body
+
+    async def serve(self, request: Request) -> Response:
+        body = self.load()
+        headers = {"ETag": self.etag, "Cache-Control": "no-cache"}
+        if etag_matches(request.headers.get("If-None-Match", ""), self.etag):
+            return Response(status_code=304, headers=headers)
+        return Response(body, media_type="application/json", headers=headers)
+
+
+def serve_prebuilt_openapi(app: FastAPI) -> None:
+    """Swaps FastAPI's own schema route for one serving the prebuilt bytes."""
+    if not app.openapi_url:
+        return
+    endpoint = OpenAPIEndpoint(app)
+    app.router.routes = [
+        Route(app.openapi_url, endpoint.serve, include_in_schema=False)
+        if isinstance(route, Route) and route.path == app.openapi_url
+        else route
+        for route in app.router.routes
+    ]
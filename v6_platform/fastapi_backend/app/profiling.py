@@ -0,0 +1,202 @@
+"""
+Opt-in profiling of single requests.
+
+A superuser sends a scan or analysis request with ``?profile=1`` or an
+``X-Profile: 1`` header, and ``ProfilingMiddleware`` runs pyinstrument's
+sampling profiler for that request alone, streamed response included. Its
+async mode attributes the time a coroutine spends awaiting (Gemini, the
+database, the scanner threads) to the ``await`` it is waiting at. The
+response carries an ``X-Profile-Id`` header, and the call tree is stored in
+``PROFILING_DIR`` and downloadable from ``/api/profiles/{id}`` as HTML,
+speedscope JSON or text.
+
+Requests without the flag only pay for a path prefix check. The flag is
+honoured for superusers only (``authorize_profiling`` answers everyone else
+with a 403), and not at all when pyinstrument is not installed or
+``PROFILING_ENABLED`` is off.
+"""
+
+import asyncio
+import os
+import re
+import tempfile
+import uuid
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from fastapi import Depends, HTTPException, Request, status
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.config import settings
+from app.models import User
+from app.users import current_optional_user
+
+try:
+    from pyinstrument import Profiler
+    from pyinstrument.renderers import (
+        ConsoleRenderer,
+        HTMLRenderer,
+        SpeedscopeRenderer,
+    )
+    from pyinstrument.session import Session
+except ImportError:  # pragma: no cover - pyinstrument is optional
+    Profiler = None
+
+# Routes whose requests may be profiled
+PROFILED_PATHS = ("/api/scan", "/api/analyze")
+
+SESSION_SUFFIX = ".pyisession"
+PROFILE_ID_PATTERN = re.compile(r"^[0-9a-f]{32}$")
+PROFILE_QUERY_PATTERN = re.compile(rb"(^|&)profile=(1|true)(&|$)")
+
+# format -> media type, file extension, renderer factory
+FORMATS: Dict[str, Tuple[str, str, Callable]] = {
+    "html": ("text/html; charset=utf-8", "html", lambda: HTMLRenderer()),
+    "speedscope": (
+        "application/json",
+        "speedscope.json",
+        lambda: SpeedscopeRenderer(),
+    ),
+    "text": ("text/plain; charset=utf-8", "txt", lambda: ConsoleRenderer()),
+}
+
+
+def is_available() -> bool:
+    return Profiler is not None and settings.PROFILING_ENABLED
+
+
+def profiling_requested(scope: Scope) -> bool:
+    for name, value in scope["headers"]:
+        if name == b"x-profile":
+            return value.lower() in (b"1", b"true")
+    query = scope.get("query_string", b"")
+    return b"profile=" in query and bool(PROFILE_QUERY_PATTERN.search(query))
+
+
+@dataclass
+class Capture:
+    id: str
+    # Set by ``authorize_profiling`` once the caller proved to be a superuser
+    authorized: bool = False
+
+
+class ProfileStore:
+    """Session files in ``directory``, keeping the ``max_profiles`` newest."""
+
+    def __init__(self, directory: str, max_profiles: int):
+        self.directory = directory
+        self.max_profiles = max_profiles
+
+    def path(self, profile_id: str) -> str:
+        return os.path.join(self.directory, profile_id + SESSION_SUFFIX)
+
+    def save(self, profile_id: str, session: "Session") -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        session.save(self.path(profile_id))
+        for stale in self.paths()[self.max_profiles :]:
+            try:
+                os.remove(stale)
+            except FileNotFoundError:
+                pass
+
+    def paths(self) -> List[str]:
+        """Session files, newest first."""
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return []
+        paths = [
+            os.path.join(self.directory, name)
+            for name in names
+            if name.endswith(SESSION_SUFFIX)
+        ]
+        return sorted(
+            paths, key=lambda path: (os.path.getmtime(path), path), reverse=True
+        )
+
+    def load(self, profile_id: str) -> Optional["Session"]:
+        if not PROFILE_ID_PATTERN.match(profile_id):
+            return None
+        try:
+            return Session.load(self.path(profile_id))
+        except FileNotFoundError:
+            return None
+
+    def summaries(self) -> List[Dict[str, Any]]:
+        summaries = []
+        for path in self.paths():
+            try:
+                session = Session.load(path)
+            except FileNotFoundError:
+                continue
+            summaries.append(
+                {
+                    "id": os.path.basename(path)[: -len(SESSION_SUFFIX)],
+                    "request": session.target_description,
+                    "started_at": session.start_time,
+                    "duration_seconds": session.duration,
+                    "samples": session.sample_count,
+                }
+            )
+        return summaries
+
+    def render(self, profile_id: str, format: str) -> Optional[str]:
+        session = self.load(profile_id)
+        if session is None:
+            return None
+        return FORMATS[format][2]().render(session)
+
+
+profile_store = ProfileStore(
+    settings.PROFILING_DIR or os.path.join(tempfile.gettempdir(), "profiles"),
+    settings.PROFILING_MAX_PROFILES,
+)
+
+
+class ProfilingMiddleware:
+    def __init__(self, app: ASGIApp, store: ProfileStore = profile_store):
+        self.app = app
+        self.store = store
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if (
+            scope["type"] != "http"
+            or not scope["path"].startswith(PROFILED_PATHS)
+            or not profiling_requested(scope)
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        capture = Capture(id=uuid.uuid4().hex)
+        scope.setdefault("state", {})["profile"] = capture
+
+        async def send_with_id(message: Message) -> None:
+            if message["type"] == "http.response.start" and capture.authorized:
+                MutableHeaders(scope=message)["X-Profile-Id"] = capture.id
+            await send(message)
+
+        profiler = Profiler(interval=settings.PROFILING_INTERVAL, async_mode="enabled")
+        profiler.start()
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            session = profiler.stop()
+            if capture.authorized:
+                session.target_description = f"{scope['method']} {scope['path']}"
+                await asyncio.to_thread(self.store.save, capture.id, session)
+
+
+async def authorize_profiling(
+    request: Request, user: Optional[User] = Depends(current_optional_user)
+) -> None:
+    """Lets a request flagged for profiling be profiled, if a superuser sent it."""
+    capture: Optional[Capture] = getattr(request.state, "profile", None)
+    if capture is None:
+        return
+    if user is None or not user.is_superuser:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only superusers may profile requests.",
+        )
+    capture.authorized = True
@@ -0,0 +1,276 @@
+"""
+Token-bucket rate limiting of scans and valuations.
+
+Each caller has a bucket per scope ("scan", "analyze") holding up to
+``burst`` tokens and refilling at ``rate`` tokens per second; a request
+takes its cost from the bucket or, when it holds too few, is turned away with
+a 429 and a ``Retry-After`` of the seconds until it will hold enough.
+Callers are signed-in users by id, and anonymous callers by client address.
+
+Rejections are decided before any scanning, database or Gemini work, so
+abusive clients are answered in constant time and do not queue up in front
+of everyone else. ``MemoryBackend`` keeps the buckets per process: with N
+workers a caller gets up to N times the allowance. ``DatabaseBackend`` shares
+them between the workers through one row per bucket on the primary; a
+backend that fails, or takes longer than ``RATE_LIMIT_BACKEND_TIMEOUT``, lets
+the request through rather than failing or holding it up.
+"""
+
+import abc
+import asyncio
+import logging
+import math
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from fastapi import Depends, HTTPException, Request, status
+from sqlalchemy import case, delete, literal
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.config import settings
+from app.database import engine
+from app.models import RateLimitBucket, User
+from app.users import current_optional_user
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Limit:
+    # Tokens per second
+    rate: float
+    burst: int
+
+
+class Backend(abc.ABC):
+    """Stores the buckets. Subclass to share them through another store."""
+
+    name = "backend"
+
+    @abc.abstractmethod
+    async def take(self, key: str, limit: Limit, cost: float) -> float:
+        """
+        Takes ``cost`` tokens from ``key``'s bucket. Returns 0 when they were
+        taken, or else the seconds until the bucket will hold them.
+        """
+
+    def stats(self) -> Dict[str, Any]:
+        return {}
+
+
+class MemoryBackend(Backend):
+    name = "memory"
+
+    def __init__(
+        self, max_keys: int = 100_000, clock: Callable[[], float] = time.monotonic
+    ):
+        self.max_keys = max_keys
+        self._clock = clock
+        # key -> tokens, last update, time the bucket is full again
+        self._buckets: Dict[str, Tuple[float, float, float]] = {}
+
+    async def take(self, key: str, limit: Limit, cost: float) -> float:
+        now = self._clock()
+        tokens, updated, _ = self._buckets.get(key, (limit.burst, now, now))
+        tokens = min(limit.burst, tokens + (now - updated) * limit.rate)
+        wait = 0.0
+        if tokens >= cost:
+            tokens -= cost
+        else:
+            wait = (cost - tokens) / limit.rate
+        self._buckets[key] = (tokens, now, now + (limit.burst - tokens) / limit.rate)
+        # Full buckets are the same as missing ones, so forget them now and
+        # then to keep the map small
+        if len(self._buckets) > self.max_keys:
+            self._buckets = {
+                k: bucket for k, bucket in self._buckets.items() if bucket[2] > now
+            }
+        return wait
+
+    def stats(self) -> Dict[str, Any]:
+        return {"buckets": len(self._buckets)}
+
+
+class DatabaseBackend(Backend):
+    """
+    Buckets in the ``rate_limit_buckets`` table, refilled and taken from in a
+    single upsert, so concurrent takes from several workers serialize on the
+    bucket's row. Every ``cleanup_every`` takes, rows untouched for
+    ``max_idle`` seconds (by then their buckets are full again) are deleted.
+    """
+
+    name = "database"
+
+    def __init__(
+        self,
+        engine: AsyncEngine,
+        max_idle: float,
+        cleanup_every: int = 1000,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.engine = engine
+        self.max_idle = max_idle
+        self.cleanup_every = cleanup_every
+        self.takes = 0
+        self._clock = clock
+
+    def statement(self, key: str, limit: Limit, cost: float, now: float) -> Any:
+        insert = (
+            postgresql.insert
+            if self.engine.dialect.name == "postgresql"
+            else sqlite.insert
+        )
+        table = RateLimitBucket.__table__
+        refilled = table.c.tokens + (now - table.c.updated_at) * limit.rate
+        available = case((refilled < limit.burst, refilled), else_=limit.burst)
+        allowed = available >= cost
+        statement = insert(table).values(
+            key=key,
+            tokens=max(limit.burst - cost, 0.0),
+            updated_at=now,
+            allowed=limit.burst >= cost,
+        )
+        return statement.on_conflict_do_update(
+            index_elements=[table.c.key],
+            set_={
+                "tokens": case((allowed, available - cost), else_=available),
+                "updated_at": literal(now),
+                "allowed": allowed,
+            },
+        ).returning(table.c.tokens, table.c.allowed)
+
+    async def take(self, key: str, limit: Limit, cost: float) -> float:
+        now = self._clock()
+        async with self.engine.begin() as connection:
+            tokens, allowed = (
+                await connection.execute(self.statement(key, limit, cost, now))
+            ).one()
+            self.takes += 1
+            if self.takes % self.cleanup_every == 0:
+                await connection.execute(
+                    delete(RateLimitBucket).where(
+                        RateLimitBucket.updated_at < now - self.max_idle
+                    )
+                )
+        return 0.0 if allowed else (cost - tokens) / limit.rate
+
+    def stats(self) -> Dict[str, Any]:
+        return {"takes": self.takes}
+
+
+class RateLimiter:
+    def __init__(
+        self, backend: Backend, limits: Dict[str, Limit], timeout: float = 0.5
+    ):
+        self.backend = backend
+        self.limits = limits
+        self.timeout = timeout
+        self.allowed = 0
+        self.limited = 0
+        self.backend_errors = 0
+
+    async def take(self, scope: str, caller: str, cost: float = 1) -> float:
+        """
+        Takes ``cost`` tokens from ``caller``'s bucket for ``scope``; returns 0
+        or the seconds to wait. A cost above ``max_cost`` is never admitted,
+        so callers should refuse such requests up front.
+        """
+        if not settings.RATE_LIMIT_ENABLED:
+            return 0.0
+        limit = self.limits[scope]
+        try:
+            wait = await asyncio.wait_for(
+                self.backend.take(f"{scope}:{caller}", limit, cost), self.timeout
+            )
+        except Exception as e:
+            self.backend_errors += 1
+            logger.warning("Rate limit backend failed, allowing request: %r", e)
+            return 0.0
+        if wait:
+            self.limited += 1
+        else:
+            self.allowed += 1
+        return wait
+
+    def max_cost(self, scope: str) -> Optional[int]:
+        """The most one request may take from a ``scope`` bucket, if limited."""
+        if not settings.RATE_LIMIT_ENABLED:
+            return None
+        return self.limits[scope].burst
+
+    async def enforce(self, scope: str, caller: str, cost: float = 1) -> None:
+        """Like ``take``, but raises a 429 with ``Retry-After`` when limited."""
+        wait = await self.take(scope, caller, cost)
+        if wait:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail=rate_limited_detail(wait),
+                headers={"Retry-After": str(retry_after(wait))},
+            )
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": self.backend.name,
+            "allowed": self.allowed,
+            "limited": self.limited,
+            "backend_errors": self.backend_errors,
+            **self.backend.stats(),
+        }
+
+
+def retry_after(wait: float) -> int:
+    return max(1, math.ceil(wait))
+
+
+def rate_limited_detail(wait: float) -> str:
+    return f"Rate limit exceeded; retry in {retry_after(wait)} seconds."
+
+
+def configured_limits() -> Dict[str, Limit]:
+    return {
+        "scan": Limit(
+            rate=settings.RATE_LIMIT_SCAN_PER_MINUTE / 60,
+            burst=settings.RATE_LIMIT_SCAN_BURST,
+        ),
+        "analyze": Limit(
+            rate=settings.RATE_LIMIT_ANALYZE_PER_MINUTE / 60,
+            burst=settings.RATE_LIMIT_ANALYZE_BURST,
+        ),
+    }
+
+
+def create_backend(limits: Dict[str, Limit]) -> Backend:
+    if settings.RATE_LIMIT_BACKEND == "database":
+        # Idle for as long as the slowest bucket takes to refill from empty
+        max_idle = max(limit.burst / limit.rate for limit in limits.values())
+        return DatabaseBackend(engine, max_idle)
+    return MemoryBackend()
+
+
+limits = configured_limits()
+rate_limiter = RateLimiter(
+    create_backend(limits), limits, timeout=settings.RATE_LIMIT_BACKEND_TIMEOUT
+)
+
+
+async def caller_key(
+    request: Request, user: Optional[User] = Depends(current_optional_user)
+) -> str:
+    """The signed-in user, or else the client address the requests come from."""
+    if user is not None:
+        return f"user:{user.id}"
+    # Behind a proxy, run uvicorn with --forwarded-allow-ips so this is the
+    # client's address rather than the proxy's
+    return f"ip:{request.client.host if request.client else 'unknown'}"
+
+
+def rate_limit(scope: str, cost: float = 1) -> Callable:
+    """Dependency taking ``cost`` tokens from the caller's ``scope`` bucket."""
+
+    async def dependency(caller: str = Depends(caller_key)) -> str:
+        await rate_limiter.enforce(scope, caller, cost)
+        return caller
+
+    return dependency
@@ -0,0 +1,184 @@
+"""
+Routing of read-only database work to read replicas.
+
+``ReplicaRouter.choose`` picks a replica engine for a read, round robin over
+the replicas that passed their last health check and lag no more than
+``DB_REPLICA_MAX_LAG_SECONDS`` behind the primary. It returns None, meaning
+"use the primary", when there is no such replica or when the caller wrote
+within the last ``DB_READ_YOUR_WRITES_SECONDS`` and so must see its own
+writes. Health checks run in the background every
+``DB_REPLICA_CHECK_INTERVAL`` seconds, triggered by reads.
+
+Stickiness is tracked per process, keyed by the caller's bearer token (or
+address); another worker process may still serve that caller a lagging
+replica within the lag bound.
+"""
+
+import asyncio
+import itertools
+import logging
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+logger = logging.getLogger(__name__)
+
+# Seconds the replica is behind the primary; 0 when it has replayed all the
+# WAL it received, so an idle primary does not look like lag
+POSTGRES_LAG_QUERY = text(
+    "SELECT CASE"
+    " WHEN NOT pg_is_in_recovery()"
+    " OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0"
+    " ELSE COALESCE("
+    "EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+)
+
+
+class Replica:
+    def __init__(self, engine: AsyncEngine):
+        self.engine = engine
+        self.healthy = False
+        self.lag_seconds: Optional[float] = None
+        self.checked_at: Optional[float] = None
+        self.reads = 0
+
+    @property
+    def url(self) -> str:
+        return self.engine.url.render_as_string(hide_password=True)
+
+
+class ReplicaRouter:
+    def __init__(
+        self,
+        engines: List[AsyncEngine],
+        *,
+        max_lag: float,
+        check_interval: float,
+        check_timeout: float,
+        sticky_seconds: float,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.replicas = [Replica(engine) for engine in engines]
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.check_timeout = check_timeout
+        self.sticky_seconds = sticky_seconds
+        self.replica_reads = 0
+        self.primary_reads = 0
+        self.sticky_reads = 0
+        self.fallbacks = 0
+        self._clock = clock
+        self._next: Iterator[int] = itertools.cycle(range(len(self.replicas)))
+        self._checked_at: Optional[float] = None
+        self._check: Optional[asyncio.Task] = None
+        self._sticky_until: Dict[str, float] = {}
+
+    async def measure_lag(self, engine: AsyncEngine) -> float:
+        async with engine.connect() as connection:
+            if connection.dialect.name != "postgresql":
+                await connection.execute(text("SELECT 1"))
+                return 0.0
+            return float(await connection.scalar(POSTGRES_LAG_QUERY))
+
+    async def check(self) -> None:
+        """Health- and lag-checks every replica at once."""
+
+        async def check_one(replica: Replica) -> None:
+            try:
+                lag = await asyncio.wait_for(
+                    self.measure_lag(replica.engine), self.check_timeout
+                )
+            except Exception as e:
+                if replica.healthy or replica.checked_at is None:
+                    logger.warning("Replica %s failed its check: %r", replica.url, e)
+                replica.healthy = False
+                replica.lag_seconds = None
+            else:
+                replica.healthy = True
+                replica.lag_seconds = lag
+            replica.checked_at = self._clock()
+
+        self._checked_at = self._clock()
+        await asyncio.gather(*(check_one(replica) for replica in self.replicas))
+
+    async def _refresh(self) -> None:
+        if self._check is not None and not self._check.done():
+            return
+        if self._checked_at is None:
+            # Nothing is known yet, so wait for the first check
+            await self.check()
+        elif self._clock() - self._checked_at >= self.check_interval:
+            self._check = asyncio.ensure_future(self.check())
+
+    def record_write(self, key: Optional[str]) -> None:
+        """Sends ``key``'s reads to the primary for the stickiness window."""
+        if key is None or self.sticky_seconds <= 0 or not self.replicas:
+            return
+        now = self._clock()
+        self._sticky_until[key] = now + self.sticky_seconds
+        # Forget expired entries now and then so the map stays small
+        if len(self._sticky_until) > 10000:
+            self._sticky_until = {
+                k: until for k, until in self._sticky_until.items() if until > now
+            }
+
+    def is_sticky(self, key: Optional[str]) -> bool:
+        if key is None:
+            return False
+        until = self._sticky_until.get(key)
+        if until is None:
+            return False
+        if until <= self._clock():
+            del self._sticky_until[key]
+            return False
+        return True
+
+    async def choose(self, key: Optional[str] = None) -> Optional[AsyncEngine]:
+        """Returns a replica engine to read from, or None for the primary."""
+        if not self.replicas:
+            self.primary_reads += 1
+            return None
+        if self.is_sticky(key):
+            self.sticky_reads += 1
+            self.primary_reads += 1
+            return None
+        await self._refresh()
+        for _ in range(len(self.replicas)):
+            replica = self.replicas[next(self._next)]
+            if (
+                replica.healthy
+                and replica.lag_seconds is not None
+                and replica.lag_seconds <= self.max_lag
+            ):
+                replica.reads += 1
+                self.replica_reads += 1
+                return replica.engine
+        self.fallbacks += 1
+        self.primary_reads += 1
+        return None
+
+    async def close(self) -> None:
+        if self._check is not None:
+            self._check.cancel()
+        for replica in self.replicas:
+            await replica.engine.dispose()
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "replica_reads": self.replica_reads,
+            "primary_reads": self.primary_reads,
+            "sticky_reads": self.sticky_reads,
+            "fallbacks": self.fallbacks,
+            # In DATABASE_REPLICA_URLS order. The URLs themselves stay out: the
+            # stats are served without authentication
+            "replicas": [
+                {
+                    "healthy": replica.healthy,
+                    "lag_seconds": replica.lag_seconds,
+                    "reads": replica.reads,
+                }
+                for replica in self.replicas
+            ],
+        }
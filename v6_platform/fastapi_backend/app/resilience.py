@@ -0,0 +1,224 @@
+"""
+Deadlines, hedged requests, jittered retries and circuit breaking for calls to
+an upstream that is sometimes slow or down.
+
+``ResilientCaller.call`` runs one logical call under an overall deadline. If an
+attempt is slower than the recent p95 latency a duplicate (hedge) is started
+and whichever finishes first wins. Transient failures are retried with full
+jitter while the deadline allows, and a circuit breaker makes callers fail
+fast with ``CircuitOpenError`` while the upstream keeps failing.
+"""
+
+import asyncio
+import random
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an upstream the breaker considers unhealthy."""
+
+
+class LatencyTracker:
+    """Rolling window of successful call latencies."""
+
+    def __init__(self, window: int = 200, min_samples: int = 20):
+        self.min_samples = min_samples
+        self._samples: Deque[float] = deque(maxlen=window)
+
+    def record(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def quantile(self, q: float) -> Optional[float]:
+        if len(self._samples) < self.min_samples:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class CircuitBreaker:
+    """
+    Opens after ``failure_threshold`` consecutive failures. Once
+    ``reset_timeout`` has passed a single probe call is let through: success
+    closes the breaker again, failure re-opens it.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        failure_threshold: int,
+        reset_timeout: float,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.consecutive_failures = 0
+        self._clock = clock
+        self._opened_at: Optional[float] = None
+        self._probe_started: Optional[float] = None
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return self.CLOSED
+        if self._clock() - self._opened_at >= self.reset_timeout:
+            return self.HALF_OPEN
+        return self.OPEN
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == self.CLOSED:
+            return True
+        if state == self.OPEN:
+            return False
+        now = self._clock()
+        # A probe that never reported back (e.g. it was cancelled) expires
+        if (
+            self._probe_started is None
+            or now - self._probe_started >= self.reset_timeout
+        ):
+            self._probe_started = now
+            return True
+        return False
+
+    def record_success(self) -> None:
+        self.consecutive_failures = 0
+        self._opened_at = None
+        self._probe_started = None
+
+    def record_failure(self) -> None:
+        self.consecutive_failures += 1
+        if (
+            self._opened_at is not None
+            or self.consecutive_failures >= self.failure_threshold
+        ):
+            self._opened_at = self._clock()
+            self._probe_started = None
+
+
+class ResilientCaller:
+    def __init__(
+        self,
+        *,
+        deadline: float,
+        retries: int,
+        base_delay: float,
+        breaker: CircuitBreaker,
+        hedge_quantile: Optional[float] = 0.95,
+        min_hedge_delay: float = 0.0,
+        is_transient: Callable[[BaseException], bool] = lambda error: True,
+        can_hedge: Callable[[], bool] = lambda: True,
+        latencies: Optional[LatencyTracker] = None,
+    ):
+        self.deadline = deadline
+        self.retries = retries
+        self.base_delay = base_delay
+        self.breaker = breaker
+        self.hedge_quantile = hedge_quantile
+        self.min_hedge_delay = min_hedge_delay
+        self.is_transient = is_transient
+        self.can_hedge = can_hedge
+        self.latencies = latencies or LatencyTracker()
+        self.calls = 0
+        self.retried = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.timeouts = 0
+        self.rejected = 0
+
+    def hedge_delay(self) -> Optional[float]:
+        """How long to wait before hedging, or None to not hedge."""
+        if self.hedge_quantile is None:
+            return None
+        quantile = self.latencies.quantile(self.hedge_quantile)
+        if quantile is None:
+            return None
+        return max(quantile, self.min_hedge_delay)
+
+    async def call(self, make_call: Callable[[], Awaitable[T]]) -> T:
+        """
+        Runs ``make_call`` until it succeeds, a non-transient error is raised,
+        the retries are used up or the deadline passes.
+        """
+        if not self.breaker.allow():
+            self.rejected += 1
+            raise CircuitOpenError("Upstream is unavailable; not calling it.")
+        self.calls += 1
+        deadline_at = time.monotonic() + self.deadline
+        attempt = 0
+        while True:
+            try:
+                result = await asyncio.wait_for(
+                    self._hedged(make_call), deadline_at - time.monotonic()
+                )
+            except Exception as e:
+                if isinstance(e, TimeoutError):
+                    self.timeouts += 1
+                if not (isinstance(e, TimeoutError) or self.is_transient(e)):
+                    # The upstream answered, it just did not like the request
+                    self.breaker.record_success()
+                    raise
+                self.breaker.record_failure()
+                attempt += 1
+                delay = random.uniform(0, self.base_delay * 2 ** (attempt - 1))
+                if (
+                    attempt > self.retries
+                    or time.monotonic() + delay >= deadline_at
+                    or not self.breaker.allow()
+                ):
+                    raise
+                self.retried += 1
+                await asyncio.sleep(delay)
+            else:
+                self.breaker.record_success()
+                return result
+
+    async def _hedged(self, make_call: Callable[[], Awaitable[T]]) -> T:
+        started = time.monotonic()
+        primary = asyncio.ensure_future(make_call())
+        pending = {primary}
+        try:
+            delay = self.hedge_delay()
+            if delay is not None:
+                done, _ = await asyncio.wait(pending, timeout=delay)
+                if not done and self.can_hedge():
+                    self.hedged += 1
+                    pending.add(asyncio.ensure_future(make_call()))
+
+            first_error: Optional[BaseException] = None
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    error = task.exception()
+                    if error is None:
+                        if task is not primary:
+                            self.hedge_wins += 1
+                        self.latencies.record(time.monotonic() - started)
+                        return task.result()
+                    first_error = first_error or error
+            assert first_error is not None
+            raise first_error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "state": self.breaker.state,
+            "consecutive_failures": self.breaker.consecutive_failures,
+            "calls": self.calls,
+            "retries": self.retried,
+            "hedged": self.hedged,
+            "hedge_wins": self.hedge_wins,
+            "timeouts": self.timeouts,
+            "rejected": self.rejected,
+            "p95_seconds": self.latencies.quantile(0.95),
+        }
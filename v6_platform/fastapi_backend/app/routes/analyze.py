@@ -1,60 +1,284 @@
-import os
-from fastapi import APIRouter, HTTPException
-import google.generativeai as genai
-from app.schemas import AnalysisRequest, AnalysisResult
+import asyncio
+import contextlib
+import json
+from typing import AsyncIterator, Dict, List, Optional, Union
+
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import heuristics, llm, valuation, valuation_cache
+from app.config import settings
+from app.database import get_async_session, get_read_session
+from app.profiling import authorize_profiling
+from app.rate_limit import caller_key, rate_limit, rate_limiter
+from app.resilience import CircuitOpenError
+from app.schemas import (
+    AnalysisQueueStats,
+    AnalysisRequest,
+    AnalysisResult,
+    Asset,
+    BatchAnalysisItem,
+    BatchAnalysisResult,
+    UpstreamStats,
+    ValuationCacheStats,
+)
+from app.utils import sse_event
 
 router = APIRouter()
 
-# Configure Gemini
-# In a real deployment, ensure GEMINI_API_KEY is set in environment or .env
-GENAI_API_KEY = os.environ.get("GEMINI_API_KEY")
-if GENAI_API_KEY:
-    genai.configure(api_key=GENAI_API_KEY)
-
-@router.post("/", response_model=AnalysisResult)
-async def analyze_asset(request: AnalysisRequest):
-    if not GENAI_API_KEY:
-         # Fallback mock if no key
-        return AnalysisResult(
-            valuation="$12,000 - $15,000",
-            reasoning="Legacy code quality inferred high. (API Key missing for real analysis)",
-            details="Simulated analysis."
-        )
+UNAVAILABLE_DETAIL = "Valuation service is temporarily unavailable."
+
+
+async def value_asset(
+    asset: Asset,
+    session: AsyncSession,
+    refresh: bool = False,
+    db_lock: Optional[asyncio.Lock] = None,
+    read_session: Optional[AsyncSession] = None,
+) -> AnalysisResult:
+    """
+    Values one asset: local heuristics first, then the valuation cache, then
+    Gemini. Pass ``db_lock`` when several valuations share ``session``
+    concurrently, and ``read_session`` to look the cache up on a replica.
+    Raises CircuitOpenError while Gemini is down and the mock fallback is
+    disabled.
+    """
+    local = heuristics.answer(asset)
+    if local:
+        return local
+    if not llm.is_configured():
+        # Fallback mock if no key
+        return valuation.simulated_result()
+
+    lock = db_lock or contextlib.nullcontext()
+    fingerprint = valuation_cache.fingerprint(asset)
+    if refresh:
+        valuation_cache.stats.refreshes += 1
+    else:
+        reader = read_session or session
+        async with lock:
+            cached = await valuation_cache.get(reader, fingerprint)
+            # Release the connection while Gemini runs
+            await reader.rollback()
+        if cached:
+            return cached
 
     try:
-        model = genai.GenerativeModel('gemini-1.5-flash') # Using 1.5-flash as 3-flash preview might not be standard in lib yet or requires specific name
-        
-        prompt = f"""
-        You are a Fintech Asset Valuator. Analyze this digital asset:
-        Name: {request.asset_data.name}
-        Type: {request.asset_data.type}
-        Description: {request.asset_data.description}
-        URL: {request.asset_data.url}
-        
-        Provide:
-        1. A realistic valuation range (e.g. $5k - $10k).
-        2. Concise reasoning why.
-        3. Technical details on leverage points.
-        
-        Format as JSON: {{ "valuation": "...", "reasoning": "...", "details": "..." }}
-        """
-        
-        response = model.generate_content(prompt)
-        # Simple parsing (robust parsing would use Pydantic output parser or json extraction)
-        # For now, let's assume the model follows instructions or we wrap in try/except and just return text
-        
-        text_response = response.text
-        
-        # Cleanup mock - Since we can't easily json parse natural language responses without risk,
-        # I will simpler return the raw text mapped to fields for this demo, 
-        # or simulate a structured response if the model is good.
-        
-        # Start clean:
-        return AnalysisResult(
-            valuation="AI Generated Estimate",
-            reasoning=text_response[:200] + "...",
-            details=text_response
-        )
+        # Awaited on the async client, so other requests keep being served
+        # while Gemini generates
+        result = await valuation.analyze(asset)
+    except CircuitOpenError:
+        if settings.GEMINI_FALLBACK_TO_MOCK:
+            return valuation.degraded_result()
+        raise
+
+    async with lock:
+        await valuation_cache.store_many(session, {fingerprint: result})
+    return result
 
+
+@router.post(
+    "/",
+    response_model=AnalysisResult,
+    dependencies=[Depends(authorize_profiling), Depends(rate_limit("analyze"))],
+)
+async def analyze_asset(
+    request: AnalysisRequest,
+    refresh: bool = False,
+    session: AsyncSession = Depends(get_async_session),
+    read_session: AsyncSession = Depends(get_read_session),
+):
+    try:
+        return await value_asset(
+            request.asset_data, session, refresh=refresh, read_session=read_session
+        )
+    except CircuitOpenError:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=UNAVAILABLE_DETAIL,
+            headers={"Retry-After": str(int(settings.GEMINI_BREAKER_RESET_SECONDS))},
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Analysis failed: {str(e)}")
+
+
+@router.post(
+    "/stream",
+    response_class=StreamingResponse,
+    dependencies=[Depends(authorize_profiling), Depends(rate_limit("analyze"))],
+)
+async def analyze_asset_stream(
+    request: AnalysisRequest,
+    refresh: bool = False,
+    session: AsyncSession = Depends(get_async_session),
+    read_session: AsyncSession = Depends(get_read_session),
+):
+    """
+    Streams the valuation as server-sent events: ``token`` events carry the
+    text as Gemini generates it, a ``field`` event is sent as soon as each
+    AnalysisResult field is complete, then a single ``result`` event carries
+    the AnalysisResult (or an ``error`` event carries the failure).
+    """
+    cached = heuristics.answer(request.asset_data)
+    fingerprint = None
+    if not cached and llm.is_configured():
+        fingerprint = valuation_cache.fingerprint(request.asset_data)
+        if refresh:
+            valuation_cache.stats.refreshes += 1
+        else:
+            cached = await valuation_cache.get(read_session, fingerprint)
+        await read_session.rollback()
+
+    async def events() -> AsyncIterator[str]:
+        if cached:
+            yield sse_event("result", cached.model_dump_json())
+            return
+        if not llm.is_configured():
+            yield sse_event("result", valuation.simulated_result().model_dump_json())
+            return
+
+        pieces = []
+        parser = valuation.FieldStreamParser()
+        try:
+            async for piece in llm.stream_text(
+                valuation.build_prompt(request.asset_data),
+                generation_config=valuation.GENERATION_CONFIG,
+            ):
+                pieces.append(piece)
+                yield sse_event("token", json.dumps({"text": piece}))
+                for name, value in parser.feed(piece).items():
+                    if name in valuation.RESULT_FIELDS:
+                        yield sse_event(
+                            "field", json.dumps({"name": name, "value": value})
+                        )
+        except CircuitOpenError:
+            if settings.GEMINI_FALLBACK_TO_MOCK:
+                yield sse_event("result", valuation.degraded_result().model_dump_json())
+            else:
+                yield sse_event("error", json.dumps({"detail": UNAVAILABLE_DETAIL}))
+            return
+        except Exception as e:
+            yield sse_event("error", json.dumps({"detail": f"Analysis failed: {e}"}))
+            return
+
+        result = valuation.parse_result("".join(pieces))
+        yield sse_event("result", result.model_dump_json())
+        # The dependency has closed the session by now; a closed session is
+        # reusable and checks out a fresh connection for the write
+        try:
+            await valuation_cache.store_many(session, {fingerprint: result})
+        finally:
+            await session.close()
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        # Keep proxies from buffering the stream
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.post(
+    "/batch",
+    response_model=BatchAnalysisResult,
+    dependencies=[Depends(authorize_profiling)],
+)
+async def analyze_assets(
+    requests: List[AnalysisRequest],
+    refresh: bool = False,
+    session: AsyncSession = Depends(get_async_session),
+    read_session: AsyncSession = Depends(get_read_session),
+    caller: str = Depends(caller_key),
+):
+    max_items = settings.ANALYZE_BATCH_MAX_ITEMS
+    # A batch the caller's bucket could never pay for is refused outright
+    max_cost = rate_limiter.max_cost("analyze")
+    if max_cost is not None:
+        max_items = min(max_items, max_cost)
+    if len(requests) > max_items:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {max_items} assets per batch.",
+        )
+    # A token per asset, as if each had been sent to /api/analyze/
+    await rate_limiter.enforce("analyze", caller, cost=len(requests))
+    results: Dict[int, Union[AnalysisResult, Exception]] = {}
+    remaining = []
+    for index, request in enumerate(requests):
+        local = heuristics.answer(request.asset_data)
+        if local:
+            results[index] = local
+        else:
+            remaining.append(index)
+
+    if not llm.is_configured():
+        for index in remaining:
+            results[index] = valuation.simulated_result()
+    else:
+        fingerprints = {
+            index: valuation_cache.fingerprint(requests[index].asset_data)
+            for index in remaining
+        }
+        if refresh:
+            valuation_cache.stats.refreshes += len(fingerprints)
+            cached = {}
+        else:
+            cached = await valuation_cache.get_many(
+                read_session, list(fingerprints.values())
+            )
+        await read_session.rollback()
+
+        # Each distinct uncached asset is valued once, even if requested twice
+        pending = {
+            fingerprint: requests[index].asset_data
+            for index, fingerprint in fingerprints.items()
+            if fingerprint not in cached
+        }
+        answers = dict(
+            zip(pending, await valuation.analyze_many(list(pending.values())))
+        )
+        await valuation_cache.store_many(
+            session,
+            {
+                fingerprint: answer
+                for fingerprint, answer in answers.items()
+                if isinstance(answer, AnalysisResult)
+            },
+        )
+        for index, fingerprint in fingerprints.items():
+            result = cached.get(fingerprint) or answers[fingerprint]
+            if (
+                isinstance(result, CircuitOpenError)
+                and settings.GEMINI_FALLBACK_TO_MOCK
+            ):
+                result = valuation.degraded_result()
+            results[index] = result
+
+    items = []
+    for index, request in enumerate(requests):
+        result = results[index]
+        if isinstance(result, Exception):
+            items.append(
+                BatchAnalysisItem(
+                    asset_id=request.asset_id, error=f"Analysis failed: {str(result)}"
+                )
+            )
+        else:
+            items.append(BatchAnalysisItem(asset_id=request.asset_id, result=result))
+    return BatchAnalysisResult(results=items)
+
+
+@router.get("/queue", response_model=AnalysisQueueStats)
+async def analysis_queue_stats():
+    return AnalysisQueueStats(**llm.gate.stats())
+
+
+@router.get("/cache", response_model=ValuationCacheStats)
+async def valuation_cache_stats():
+    return ValuationCacheStats(**valuation_cache.stats.snapshot())
+
+
+@router.get("/upstream", response_model=UpstreamStats)
+async def upstream_stats():
+    return UpstreamStats(**llm.upstream.stats())
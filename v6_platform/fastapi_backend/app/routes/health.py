@@ -0,0 +1,33 @@
+from fastapi import APIRouter
+
+from app.database import pool_status, replica_router
+from app.email import mail_queue
+from app.hashing import password_hasher
+from app.schemas import (
+    DatabasePoolStats,
+    DatabaseReplicaStats,
+    MailQueueStats,
+    PasswordHashingStats,
+)
+
+router = APIRouter()
+
+
+@router.get("/db", response_model=DatabasePoolStats)
+async def database_pool_stats():
+    return DatabasePoolStats(**pool_status())
+
+
+@router.get("/replicas", response_model=DatabaseReplicaStats)
+async def database_replica_stats():
+    return DatabaseReplicaStats(**replica_router.stats())
+
+
+@router.get("/password-hashing", response_model=PasswordHashingStats)
+async def password_hashing_stats():
+    return PasswordHashingStats(**password_hasher.stats())
+
+
+@router.get("/mail", response_model=MailQueueStats)
+async def mail_queue_stats():
+    return MailQueueStats(**mail_queue.stats())
@@ -0,0 +1,207 @@
+import uuid
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi_pagination import Page, Params
+from fastapi_pagination.ext.sqlalchemy import apaginate
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.database import get_async_session, get_read_session
+from app.models import Item, User
+from app.schemas import (
+    ItemBulkResult,
+    ItemCreate,
+    ItemDelete,
+    ItemKeysetPage,
+    ItemRead,
+    ItemUpdate,
+)
+from app.users import current_active_user
+
+router = APIRouter(tags=["item"])
+
+COPY_COLUMNS = ["id", "name", "description", "quantity", "user_id"]
+
+
+def check_bulk_size(count: int) -> None:
+    if count > settings.ITEMS_BULK_MAX_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {settings.ITEMS_BULK_MAX_SIZE} items per request.",
+        )
+
+
+async def copy_items(session: AsyncSession, rows: List[Dict[str, Any]]) -> None:
+    """Inserts ``rows`` with a single COPY on the session's asyncpg connection."""
+    connection = await session.connection()
+    raw = await connection.get_raw_connection()
+    await raw.driver_connection.copy_records_to_table(
+        Item.__tablename__,
+        records=[tuple(row[column] for column in COPY_COLUMNS) for row in rows],
+        columns=COPY_COLUMNS,
+    )
+
+
+async def insert_items(session: AsyncSession, rows: List[Dict[str, Any]]) -> None:
+    """
+    Inserts ``rows`` without building ORM objects: COPY for large batches on
+    PostgreSQL, otherwise multi-row INSERTs (SQLAlchemy batches an executemany
+    into INSERT ... VALUES pages).
+    """
+    connection = await session.connection()
+    if (
+        connection.dialect.name == "postgresql"
+        and connection.dialect.driver == "asyncpg"
+        and len(rows) >= settings.ITEMS_COPY_THRESHOLD
+    ):
+        await copy_items(session, rows)
+    else:
+        await session.execute(insert(Item), rows)
+
+
+@router.get("/", response_model=Page[ItemRead])
+async def read_item(
+    db: AsyncSession = Depends(get_read_session),
+    user: User = Depends(current_active_user),
+    page: int = Query(1, ge=1, description="Page number"),
+    size: int = Query(10, ge=1, le=100, description="Page size"),
+):
+    params = Params(page=page, size=size)
+    query = select(Item).filter(Item.user_id == user.id).order_by(Item.id)
+    return await apaginate(db, query, params)
+
+
+@router.get("/keyset", response_model=ItemKeysetPage)
+async def read_items_after(
+    db: AsyncSession = Depends(get_read_session),
+    user: User = Depends(current_active_user),
+    after: Optional[UUID] = Query(None, description="Last item id already read"),
+    limit: int = Query(100, ge=1, le=1000, description="Page size"),
+):
+    """
+    Pages through the user's items by id. Unlike page numbers, the cost of a
+    page does not grow with how far in it is, so this suits exports and sync.
+    """
+    query = select(Item).where(Item.user_id == user.id)
+    if after is not None:
+        query = query.where(Item.id > after)
+    result = await db.execute(query.order_by(Item.id).limit(limit))
+    items = result.scalars().all()
+    return ItemKeysetPage(
+        items=items,
+        next_after=items[-1].id if len(items) == limit else None,
+    )
+
+
+@router.post("/", response_model=ItemRead)
+async def create_item(
+    item: ItemCreate,
+    db: AsyncSession = Depends(get_async_session),
+    user: User = Depends(current_active_user),
+):
+    db_item = Item(**item.model_dump(), user_id=user.id)
+    db.add(db_item)
+    await db.commit()
+    await db.refresh(db_item)
+    return db_item
+
+
+@router.post("/bulk", response_model=ItemBulkResult)
+async def create_items(
+    items: List[ItemCreate],
+    db: AsyncSession = Depends(get_async_session),
+    user: User = Depends(current_active_user),
+):
+    check_bulk_size(len(items))
+    rows = [
+        {**item.model_dump(), "id": uuid.uuid4(), "user_id": user.id} for item in items
+    ]
+    if rows:
+        await insert_items(db, rows)
+        await db.commit()
+    return ItemBulkResult(count=len(rows))
+
+
+@router.patch("/bulk", response_model=ItemBulkResult)
+async def update_items(
+    items: List[ItemUpdate],
+    db: AsyncSession = Depends(get_async_session),
+    user: User = Depends(current_active_user),
+):
+    """
+    Updates the given fields of each item. Ids that do not exist or belong to
+    someone else are left alone and returned in ``missing``.
+    """
+    check_bulk_size(len(items))
+    changes = {item.id: item.model_dump(exclude_unset=True) for item in items}
+    if len(changes) < len(items):
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Each item may only be updated once per request.",
+        )
+    if any(change.get("name", "") is None for change in changes.values()):
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Item name cannot be null.",
+        )
+    if not changes:
+        return ItemBulkResult(count=0)
+
+    result = await db.execute(
+        select(Item.id).where(Item.user_id == user.id, Item.id.in_(changes))
+    )
+    owned = set(result.scalars())
+    rows = [change for item_id, change in changes.items() if item_id in owned]
+    if rows:
+        # ORM bulk UPDATE by primary key: one executemany per set of columns
+        await db.execute(update(Item), rows)
+        await db.commit()
+    return ItemBulkResult(
+        count=len(rows),
+        missing=[item_id for item_id in changes if item_id not in owned],
+    )
+
+
+@router.post("/bulk-delete", response_model=ItemBulkResult)
+async def delete_items(
+    request: ItemDelete,
+    db: AsyncSession = Depends(get_async_session),
+    user: User = Depends(current_active_user),
+):
+    check_bulk_size(len(request.ids))
+    # Keeps the request's order for ``missing``
+    ids = list(dict.fromkeys(request.ids))
+    if not ids:
+        return ItemBulkResult(count=0)
+    result = await db.execute(
+        delete(Item).where(Item.user_id == user.id, Item.id.in_(ids)).returning(Item.id)
+    )
+    deleted = set(result.scalars())
+    await db.commit()
+    return ItemBulkResult(
+        count=len(deleted),
+        missing=[item_id for item_id in ids if item_id not in deleted],
+    )
+
+
+@router.delete("/{item_id}")
+async def delete_item(
+    item_id: UUID,
+    db: AsyncSession = Depends(get_async_session),
+    user: User = Depends(current_active_user),
+):
+    result = await db.execute(
+        select(Item).filter(Item.id == item_id, Item.user_id == user.id)
+    )
+    item = result.scalars().first()
+
+    if not item:
+        raise HTTPException(status_code=404, detail="Item not found or not authorized")
+
+    await db.delete(item)
+    await db.commit()
+
+    return {"message": "Item successfully deleted"}
@@ -0,0 +1,39 @@
+import asyncio
+from typing import List, Literal
+
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+
+from app.profiling import FORMATS, profile_store
+from app.schemas import ProfileSummary
+from app.users import current_superuser
+
+router = APIRouter(dependencies=[Depends(current_superuser)])
+
+
+@router.get("/", response_model=List[ProfileSummary])
+async def list_profiles():
+    """Stored request profiles, newest first."""
+    return await asyncio.to_thread(profile_store.summaries)
+
+
+@router.get("/{profile_id}", response_class=Response)
+async def download_profile(
+    profile_id: str, format: Literal["html", "speedscope", "text"] = "html"
+):
+    """
+    The call tree of a profiled request: an interactive HTML page, JSON for
+    https://www.speedscope.app, or plain text.
+    """
+    rendered = await asyncio.to_thread(profile_store.render, profile_id, format)
+    if rendered is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Profile not found."
+        )
+    media_type, extension, _ = FORMATS[format]
+    return Response(
+        rendered,
+        media_type=media_type,
+        headers={
+            "Content-Disposition": f'attachment; filename="{profile_id}.{extension}"'
+        },
+    )
@@ -1,11 +1,25 @@
-from fastapi import APIRouter, HTTPException
-from typing import List
-from uuid import uuid4
+import asyncio
 import datetime
+import json
+import logging
 import random
-import requests
-from bs4 import BeautifulSoup
-from app.schemas import ScanRequest, ScanResult, Asset
+import threading
+from typing import AsyncIterator, Callable, Dict, Iterator, List, Optional
+
+from fastapi import APIRouter, Depends
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.database import get_async_session
+from app.metrics import observe_upstream
+from app.profiling import authorize_profiling
+from app.rate_limit import rate_limit, rate_limited_detail, rate_limiter
+from app.routes.analyze import value_asset
+from app.schemas import Asset, BatchAnalysisItem, ScanRequest, ScanResult
+from app.utils import generate_asset_id, sse_event
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
@@ -15,92 +29,254 @@ USER_AGENTS = [
     "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36"
 ]
 
-def scan_github_zombies(target_url: str) -> List[Asset]:
+
+def build_asset(
+    asset_type: str, name: str, url: str, description: str, status: str = "active"
+) -> Asset:
+    return Asset(
+        id=generate_asset_id(asset_type, url, name),
+        name=name,
+        type=asset_type,
+        url=url,
+        description=description,
+        detected_at=datetime.datetime.now().isoformat(),
+        status=status,
+    )
+
+
+def iter_github_zombies(target_url: str) -> Iterator[Asset]:
     """
-    Simulates finding abandoned "Zombie" repos related to the target.
-    In a real app, this would use GitHub API to find stale forks or dependencies.
+    Finds abandoned "Zombie" assets related to the target on GitHub: stale
+    forks, abandoned branches and deprecated dependencies.
     """
-    assets = []
-    # Mock finding
-    if "github" in target_url:
-        assets.append(Asset(
-            id=str(uuid4()),
-            name=f"{target_url.split('/')[-1]}-legacy",
-            type="github_zombie",
-            url=f"{target_url}/tree/legacy",
-            description="Abandoned branch with high value legacy code.",
-            detected_at=datetime.datetime.now().isoformat(),
-            status="investigate"
-        ))
-    
-    # Always return a random chance zombie
-    if random.choice([True, False]):
-         assets.append(Asset(
-            id=str(uuid4()),
-            name="unknown-dependency-v1",
-            type="github_zombie",
-            url="https://github.com/example/dep-v1",
-            description="Deprecated dependency still in use.",
-            detected_at=datetime.datetime.now().isoformat()
-        ))
-    return assets
+    # The scanners and their HTTP stack are imported on the first scan, not
+    # at startup
+    import requests
 
-def scan_chrome_ghosts(target_url: str) -> List[Asset]:
+    from app.scanners.github import GitHubError, iter_zombies
+
+    try:
+        for finding in iter_zombies(target_url):
+            yield build_asset(
+                "github_zombie",
+                finding.name,
+                finding.url,
+                finding.description,
+                finding.status,
+            )
+    except (requests.RequestException, GitHubError) as e:
+        # Keep whatever was found before the failure
+        yield build_asset(
+            "github_zombie",
+            f"GitHub scan incomplete: {target_url}",
+            target_url,
+            f"Could not finish GitHub scan. Error: {str(e)}",
+            "error",
+        )
+
+
+def scan_github_zombies(target_url: str) -> List[Asset]:
+    return list(iter_github_zombies(target_url))
+
+
+def iter_chrome_ghosts(target_url: str) -> Iterator[Asset]:
     """
-    Simulates finding "Ghost" assets via Chrome simulation (e.g. hidden API endpoints).
-    In a real app, this would use Selenium/Playwright or detailed requests analysis.
+    Finds "Ghost" assets on the target site: the site itself and the hidden API
+    endpoints, GraphQL endpoints and keys referenced by its JavaScript bundles.
     """
-    assets = []
+    import requests
+    from bs4 import BeautifulSoup
+
+    from app.scanners.bundles import analyze_pages
+
     try:
-        # Simple health check to see if site is up (Real Logic)
-        response = requests.get(target_url, headers={"User-Agent": random.choice(USER_AGENTS)}, timeout=5)
+        session = requests.Session()
+        session.headers["User-Agent"] = random.choice(USER_AGENTS)
+        with observe_upstream("target_site", "page"):
+            response = session.get(target_url, timeout=5)
         if response.status_code == 200:
             soup = BeautifulSoup(response.text, 'html.parser')
             title = soup.title.string if soup.title else "No Title"
-            
-            assets.append(Asset(
-                id=str(uuid4()),
-                name=f"Verified Site: {title}",
-                type="chrome_ghost",
-                url=target_url,
-                description=f"Active endpoint detected. Status: {response.status_code}",
-                detected_at=datetime.datetime.now().isoformat()
-            ))
-
-            # Mock hidden endpoint
-            assets.append(Asset(
-                id=str(uuid4()),
-                name="Hidden API: /v1/internal",
-                type="chrome_ghost",
-                url=f"{target_url}/api/v1/internal",
-                description="Undocumented internal API endpoint discovered via JS analysis.",
-                detected_at=datetime.datetime.now().isoformat(),
-                status="high_value"
-            ))
+            yield build_asset(
+                "chrome_ghost",
+                f"Verified Site: {title}",
+                target_url,
+                f"Active endpoint detected. Status: {response.status_code}",
+            )
+            for finding in analyze_pages({target_url: soup}, session):
+                yield build_asset(
+                    "chrome_ghost",
+                    finding.name,
+                    finding.url,
+                    finding.description,
+                    finding.status,
+                )
     except Exception as e:
         # Fallback mock if request fails
-        assets.append(Asset(
-            id=str(uuid4()),
-            name=f"Inaccessible: {target_url}",
-            type="chrome_ghost",
-            url=target_url,
-            description=f"Could not reach target. Error: {str(e)}",
-            detected_at=datetime.datetime.now().isoformat(),
-            status="error"
-        ))
-    return assets
-
-@router.post("/", response_model=ScanResult)
+        yield build_asset(
+            "chrome_ghost",
+            f"Inaccessible: {target_url}",
+            target_url,
+            f"Could not reach target. Error: {str(e)}",
+            "error",
+        )
+
+
+def scan_chrome_ghosts(target_url: str) -> List[Asset]:
+    return list(iter_chrome_ghosts(target_url))
+
+
+@router.post(
+    "/",
+    response_model=ScanResult,
+    dependencies=[Depends(authorize_profiling), Depends(rate_limit("scan"))],
+)
 async def trigger_scan(request: ScanRequest):
-    found_assets = []
-    
+    scanners = []
     if request.scan_type in ["all", "github"]:
-        found_assets.extend(scan_github_zombies(request.target_url))
-    
+        scanners.append(scan_github_zombies)
     if request.scan_type in ["all", "chrome"]:
-        found_assets.extend(scan_chrome_ghosts(request.target_url))
+        scanners.append(scan_chrome_ghosts)
+
+    # The scanners block on HTTP calls, so they run in threads (side by side)
+    # and the event loop keeps serving other requests meanwhile
+    results = await asyncio.gather(
+        *(asyncio.to_thread(scan, request.target_url) for scan in scanners)
+    )
+
+    # Keyed by the deterministic asset id, so a finding reported twice is kept once
+    found_assets: Dict[str, Asset] = {}
+    for assets in results:
+        for asset in assets:
+            found_assets.setdefault(asset.id, asset)
+
+    return ScanResult(assets=list(found_assets.values()), total_found=len(found_assets))
+
+
+def selected_scanners(scan_type: str) -> List[Callable[[str], Iterator[Asset]]]:
+    scanners = []
+    if scan_type in ["all", "github"]:
+        scanners.append(iter_github_zombies)
+    if scan_type in ["all", "chrome"]:
+        scanners.append(iter_chrome_ghosts)
+    return scanners
+
+
+@router.post(
+    "/pipeline",
+    response_class=StreamingResponse,
+    dependencies=[Depends(authorize_profiling)],
+)
+async def scan_and_analyze(
+    request: ScanRequest,
+    refresh: bool = False,
+    session: AsyncSession = Depends(get_async_session),
+    caller: str = Depends(rate_limit("scan")),
+):
+    """
+    Scans the target and values each asset as soon as it is discovered,
+    streaming server-sent events: an ``asset`` event per discovered asset, a
+    ``valuation`` event (a BatchAnalysisItem) as each valuation completes and
+    a final ``done`` event. Scanners run in threads and feed a bounded queue
+    that ``PIPELINE_WORKERS`` valuation workers drain, so a slow LLM slows
+    the scanners down instead of buffering without limit. Each valuation
+    takes a token from the caller's analyze bucket; assets discovered once
+    it is empty get an error item instead.
+    """
+    loop = asyncio.get_running_loop()
+    discovered: asyncio.Queue[Optional[Asset]] = asyncio.Queue(
+        maxsize=settings.PIPELINE_QUEUE_SIZE
+    )
+    events: asyncio.Queue[Optional[str]] = asyncio.Queue()
+    seen: set[str] = set()
+    stop = threading.Event()
+    # The workers share the request's session
+    db_lock = asyncio.Lock()
+
+    async def discover(asset: Asset) -> None:
+        if asset.id in seen:
+            return
+        seen.add(asset.id)
+        events.put_nowait(sse_event("asset", asset.model_dump_json()))
+        await discovered.put(asset)
+
+    def produce(scan: Callable[[str], Iterator[Asset]]) -> None:
+        for asset in scan(request.target_url):
+            future = asyncio.run_coroutine_threadsafe(discover(asset), loop)
+            while True:
+                try:
+                    future.result(timeout=0.1)
+                    break
+                except TimeoutError:
+                    # Waiting for room in the queue; give up if the client left
+                    if stop.is_set():
+                        future.cancel()
+                        return
+
+    async def value() -> None:
+        while (asset := await discovered.get()) is not None:
+            wait = await rate_limiter.take("analyze", caller)
+            if wait:
+                item = BatchAnalysisItem(
+                    asset_id=asset.id, error=rate_limited_detail(wait)
+                )
+                events.put_nowait(sse_event("valuation", item.model_dump_json()))
+                continue
+            try:
+                result = await value_asset(
+                    asset, session, refresh=refresh, db_lock=db_lock
+                )
+                item = BatchAnalysisItem(asset_id=asset.id, result=result)
+            except Exception as e:
+                item = BatchAnalysisItem(
+                    asset_id=asset.id, error=f"Analysis failed: {str(e)}"
+                )
+            events.put_nowait(sse_event("valuation", item.model_dump_json()))
+
+    async def run() -> None:
+        workers = [
+            asyncio.create_task(value()) for _ in range(settings.PIPELINE_WORKERS)
+        ]
+        try:
+            scans = await asyncio.gather(
+                *(
+                    asyncio.to_thread(produce, scan)
+                    for scan in selected_scanners(request.scan_type)
+                ),
+                return_exceptions=True,
+            )
+            for error in scans:
+                if isinstance(error, Exception):
+                    logger.error("Pipeline scan failed", exc_info=error)
+                    events.put_nowait(
+                        sse_event(
+                            "error", json.dumps({"detail": f"Scan failed: {error}"})
+                        )
+                    )
+            for _ in workers:
+                await discovered.put(None)
+            await asyncio.gather(*workers)
+            events.put_nowait(sse_event("done", json.dumps({"total_found": len(seen)})))
+        finally:
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+            events.put_nowait(None)
+
+    async def stream() -> AsyncIterator[str]:
+        pipeline = asyncio.create_task(run())
+        try:
+            while (event := await events.get()) is not None:
+                yield event
+        finally:
+            stop.set()
+            pipeline.cancel()
+            await asyncio.gather(pipeline, return_exceptions=True)
+            # The workers reused the session after the dependency closed it
+            await session.close()
 
-    return ScanResult(
-        assets=found_assets,
-        total_found=len(found_assets)
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
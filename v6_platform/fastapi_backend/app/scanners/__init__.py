@@ -0,0 +1,11 @@
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class Finding:
+    """A single discovery made by a scanner, turned into an ``Asset`` by the scan routes."""
+
+    name: str
+    url: str
+    description: str
+    status: str = "active"
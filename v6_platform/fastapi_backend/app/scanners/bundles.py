@@ -0,0 +1,189 @@
+"""
+Hidden endpoint discovery in the JavaScript bundles loaded by a page.
+
+``<script src>`` bundles are fetched concurrently and streamed through a single
+precompiled pattern in fixed-size chunks, so memory stays bounded however
+large a bundle is. Bundles are fetched once per URL and their findings are
+merged by content hash, so the same bundle served from several URLs (or
+several pages) is only reported once.
+"""
+
+import hashlib
+import logging
+import re
+from collections.abc import Iterable, Iterator, Mapping
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from urllib.parse import urljoin
+
+import requests
+from bs4 import BeautifulSoup
+
+from app.config import settings
+from app.metrics import observe_upstream
+
+from . import Finding
+
+logger = logging.getLogger(__name__)
+
+# Longest value any alternative below can match. Chunks are scanned with
+# twice this much carried over, so a match split across two chunks is always
+# seen whole in one of them.
+MAX_MATCH_LENGTH = 512
+
+ENDPOINT_PATTERN = re.compile(
+    rb"""
+    ["'`](?P<graphql>(?:https?://[\w.-]{1,64}(?::\d{1,5})?)?/[\w./-]{0,120}graphql[\w./-]{0,60})["'`]
+    | ["'`](?P<api>(?:https?://[\w.-]{1,64}(?::\d{1,5})?)?/(?:api|internal|private|rest|v\d{1,2})(?:/[\w.{}:-]{1,60}){0,6}/?)["'`]
+    | (?P<key>AIza[0-9A-Za-z_-]{35}|AKIA[0-9A-Z]{16}|(?:sk|pk|rk)_live_[0-9A-Za-z]{24,99}|gh[pousr]_[0-9A-Za-z]{36})
+    """,
+    re.VERBOSE,
+)
+
+FINDING_NAMES = {
+    "api": "Hidden API",
+    "graphql": "GraphQL endpoint",
+    "key": "Exposed key",
+}
+
+
+@dataclass(frozen=True)
+class BundleScan:
+    url: str
+    content_hash: str
+    matches: frozenset[tuple[str, str]]
+
+
+def scan_chunks(chunks: Iterable[bytes]) -> tuple[str, set[tuple[str, str]]]:
+    """
+    Scans a stream of bytes and returns its SHA-256 and the ``(kind, value)``
+    pairs found in it. Only ``2 * MAX_MATCH_LENGTH`` bytes are carried over
+    between chunks.
+    """
+    digest = hashlib.sha256()
+    matches: set[tuple[str, str]] = set()
+    carry = b""
+    buffer = b""
+    for chunk in chunks:
+        if not chunk:
+            continue
+        digest.update(chunk)
+        buffer = carry + chunk
+        # Matches ending in the last MAX_MATCH_LENGTH bytes may continue in
+        # the next chunk; they are picked up from the carried-over bytes.
+        limit = len(buffer) - MAX_MATCH_LENGTH
+        for match in ENDPOINT_PATTERN.finditer(buffer):
+            if match.end() <= limit:
+                kind = match.lastgroup
+                assert kind is not None
+                matches.add((kind, match.group(kind).decode()))
+        carry = buffer[-2 * MAX_MATCH_LENGTH :]
+    for match in ENDPOINT_PATTERN.finditer(carry):
+        kind = match.lastgroup
+        assert kind is not None
+        matches.add((kind, match.group(kind).decode()))
+    return digest.hexdigest(), matches
+
+
+def _read_limited(response: requests.Response, max_bytes: int) -> Iterator[bytes]:
+    read = 0
+    for chunk in response.iter_content(settings.BUNDLE_CHUNK_SIZE):
+        read += len(chunk)
+        if read > max_bytes:
+            logger.warning("Bundle %s truncated at %d bytes", response.url, max_bytes)
+            return
+        yield chunk
+
+
+def fetch_bundle(session: requests.Session, url: str) -> BundleScan | None:
+    try:
+        with (
+            observe_upstream("target_site", "bundle"),
+            session.get(url, stream=True, timeout=10) as response,
+        ):
+            response.raise_for_status()
+            content_hash, matches = scan_chunks(
+                _read_limited(response, settings.BUNDLE_MAX_BYTES)
+            )
+    except requests.RequestException as e:
+        logger.info("Skipping bundle %s: %s", url, e)
+        return None
+    return BundleScan(url, content_hash, frozenset(matches))
+
+
+def script_sources(page_url: str, soup: BeautifulSoup) -> list[str]:
+    sources = []
+    for script in soup.find_all("script", src=True):
+        source = urljoin(page_url, script["src"])
+        if source.startswith(("http://", "https://")) and source not in sources:
+            sources.append(source)
+    return sources
+
+
+def _mask(key: str) -> str:
+    return f"{key[:4]}...{key[-4:]}"
+
+
+def analyze_pages(
+    pages: Mapping[str, BeautifulSoup],
+    session: requests.Session | None = None,
+) -> list[Finding]:
+    """
+    Returns one finding per distinct endpoint or key referenced by the pages'
+    inline scripts and ``<script src>`` bundles.
+    """
+    session = session or requests.Session()
+    bundle_pages: dict[str, str] = {}
+    scans: list[BundleScan] = []
+    for page_url, soup in pages.items():
+        for source in script_sources(page_url, soup):
+            bundle_pages.setdefault(source, page_url)
+        inline = "\n".join(
+            script.get_text() for script in soup.find_all("script", src=False)
+        )
+        if inline:
+            content_hash, matches = scan_chunks([inline.encode()])
+            scans.append(BundleScan(page_url, content_hash, frozenset(matches)))
+            bundle_pages.setdefault(page_url, page_url)
+
+    if bundle_pages:
+        with ThreadPoolExecutor(max_workers=settings.BUNDLE_FETCH_CONCURRENCY) as pool:
+            fetched = pool.map(
+                lambda url: fetch_bundle(session, url),
+                [url for url in bundle_pages if url not in pages],
+            )
+            scans.extend(scan for scan in fetched if scan is not None)
+
+    findings = []
+    seen_hashes = set()
+    seen_endpoints = set()
+    for scan in scans:
+        if scan.content_hash in seen_hashes:
+            continue
+        seen_hashes.add(scan.content_hash)
+        page_url = bundle_pages[scan.url]
+        for kind, value in sorted(scan.matches):
+            # Keys are reported by value, endpoints by the URL they resolve to
+            endpoint = value if kind == "key" else urljoin(page_url, value)
+            if (kind, endpoint) in seen_endpoints:
+                continue
+            seen_endpoints.add((kind, endpoint))
+            if kind == "key":
+                findings.append(
+                    Finding(
+                        name=f"{FINDING_NAMES[kind]}: {_mask(value)}",
+                        url=scan.url,
+                        description=f"Credential-like key embedded in {scan.url}.",
+                        status="investigate",
+                    )
+                )
+            else:
+                findings.append(
+                    Finding(
+                        name=f"{FINDING_NAMES[kind]}: {value}",
+                        url=endpoint,
+                        description=f"Undocumented endpoint referenced in {scan.url}.",
+                        status="high_value",
+                    )
+                )
+    return findings
@@ -0,0 +1,448 @@
+"""
+"Zombie" detection against the GitHub API: stale forks, abandoned branches and
+deprecated dependencies.
+
+Repository details are fetched through GraphQL, ``GITHUB_GRAPHQL_BATCH_SIZE``
+repositories per query, so an organization with hundreds of repositories
+costs a handful of GraphQL points. Repository listings go through
+ETag-conditional REST requests; GitHub does not count ``304 Not Modified``
+answers against the rate limit, so rescans of an unchanged organization are
+close to free.
+
+GitHub only answers GraphQL queries with a token (``GITHUB_TOKEN``). Without
+one, each repository is fetched with a REST request instead, which only
+finds archived repositories and stale forks: the branch, fork and manifest
+checks need the token. Unauthenticated REST requests are limited to 60 an
+hour, so large organizations need a token either way.
+"""
+
+import datetime
+import hashlib
+import json
+import re
+import threading
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Iterator, List, Optional, Tuple
+from urllib.parse import urlparse
+
+import requests
+
+from app.config import settings
+from app.metrics import observe_upstream
+
+from . import Finding
+
+GITHUB_HOSTS = {"github.com", "www.github.com"}
+
+# Well-known packages that have been deprecated upstream, keyed by ecosystem.
+DEPRECATED_PACKAGES = {
+    ("npm", "request"): "deprecated upstream since 2020",
+    ("npm", "request-promise"): "deprecated along with request",
+    ("npm", "node-sass"): "deprecated in favour of sass",
+    ("npm", "tslint"): "deprecated in favour of ESLint",
+    ("npm", "babel-eslint"): "deprecated in favour of @babel/eslint-parser",
+    ("npm", "gulp-util"): "deprecated, split into standalone modules",
+    ("npm", "istanbul"): "deprecated in favour of nyc",
+    ("npm", "protractor"): "end of life since 2023",
+    ("npm", "querystring"): "deprecated in favour of URLSearchParams",
+    ("npm", "har-validator"): "no longer supported",
+    ("pypi", "pycrypto"): "unmaintained, replaced by pycryptodome",
+    ("pypi", "nose"): "unmaintained, replaced by pytest",
+    ("pypi", "distribute"): "merged back into setuptools",
+    ("pypi", "sklearn"): "deprecated alias of scikit-learn",
+    ("pypi", "google-generativeai"): "support ended, replaced by google-genai",
+}
+
+REPOSITORY_FIELDS = """
+fragment RepositoryFields on Repository {
+  name
+  nameWithOwner
+  url
+  isFork
+  isArchived
+  pushedAt
+  defaultBranchRef { name }
+  parent { nameWithOwner pushedAt }
+  refs(refPrefix: "refs/heads/", first: 50) {
+    nodes { name target { ... on Commit { committedDate } } }
+  }
+  forks(first: 20, orderBy: {field: PUSHED_AT, direction: ASC}) {
+    nodes { nameWithOwner url pushedAt }
+  }
+  packageJson: object(expression: "HEAD:package.json") { ... on Blob { text } }
+  requirementsTxt: object(expression: "HEAD:requirements.txt") { ... on Blob { text } }
+}
+"""
+
+REQUIREMENT_NAME_PATTERN = re.compile(r"^\s*([A-Za-z0-9][A-Za-z0-9._-]*)")
+
+
+class GitHubError(Exception):
+    pass
+
+
+class GitHubRateLimitError(GitHubError):
+    pass
+
+
+class MetadataCache:
+    """
+    ETag-keyed cache of GitHub responses.
+
+    Entries live in memory and, when ``cache_dir`` is set, are also written to
+    disk so the ETags survive restarts.
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None):
+        self._entries: dict[str, dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._dir = Path(cache_dir) if cache_dir else None
+        if self._dir:
+            self._dir.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, key: str) -> Path:
+        assert self._dir is not None
+        return self._dir / f"{hashlib.sha256(key.encode()).hexdigest()}.json"
+
+    def get(self, key: str) -> Optional[dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None and self._dir:
+            try:
+                entry = json.loads(self._path(key).read_text())
+            except (OSError, ValueError):
+                return None
+            with self._lock:
+                self._entries[key] = entry
+        return entry
+
+    def set(self, key: str, etag: str, body: Any) -> None:
+        entry = {"etag": etag, "body": body}
+        with self._lock:
+            self._entries[key] = entry
+        if self._dir:
+            self._path(key).write_text(json.dumps(entry))
+
+
+@lru_cache(maxsize=16)
+def build_batch_query(count: int) -> str:
+    """GraphQL query fetching ``count`` repositories of one owner through aliases."""
+    params = ", ".join(f"$n{i}: String!" for i in range(count))
+    aliases = "\n".join(
+        f"  r{i}: repository(owner: $owner, name: $n{i}) {{ ...RepositoryFields }}"
+        for i in range(count)
+    )
+    return (
+        f"query($owner: String!, {params}) {{\n"
+        f"  rateLimit {{ cost remaining }}\n"
+        f"{aliases}\n"
+        f"}}\n{REPOSITORY_FIELDS}"
+    )
+
+
+class GitHubClient:
+    def __init__(
+        self,
+        api_url: Optional[str] = None,
+        token: Optional[str] = None,
+        cache: Optional[MetadataCache] = None,
+        batch_size: Optional[int] = None,
+        rate_limit_reserve: Optional[int] = None,
+    ):
+        self.api_url = (api_url or settings.GITHUB_API_URL).rstrip("/")
+        self.batch_size = batch_size or settings.GITHUB_GRAPHQL_BATCH_SIZE
+        self.rate_limit_reserve = (
+            settings.GITHUB_RATE_LIMIT_RESERVE
+            if rate_limit_reserve is None
+            else rate_limit_reserve
+        )
+        self.cache = cache or MetadataCache(settings.GITHUB_CACHE_DIR)
+        self.session = requests.Session()
+        self.session.headers.update(
+            {
+                "Accept": "application/vnd.github+json",
+                "User-Agent": "ValidationStation",
+            }
+        )
+        token = token or settings.GITHUB_TOKEN
+        if token:
+            self.session.headers["Authorization"] = f"Bearer {token}"
+        # GraphQL is only served to authenticated clients
+        self.authenticated = bool(token)
+        # Remaining quota per rate limit resource ("core", "graphql"), as last
+        # reported by GitHub.
+        self.rate_remaining: dict[str, int] = {}
+        self.requests_made = 0
+        self.not_modified = 0
+
+    def _update_rate_limit(self, headers: Any) -> None:
+        remaining = headers.get("X-RateLimit-Remaining")
+        if remaining is not None:
+            resource = headers.get("X-RateLimit-Resource", "core")
+            self.rate_remaining[resource] = int(remaining)
+
+    def _check_budget(self, resource: str) -> None:
+        remaining = self.rate_remaining.get(resource)
+        if remaining is not None and remaining <= self.rate_limit_reserve:
+            raise GitHubRateLimitError(
+                f"GitHub {resource} rate limit nearly exhausted "
+                f"({remaining} requests left)"
+            )
+
+    def rest_get(self, path: str, params: Optional[dict[str, Any]] = None) -> Any:
+        url = f"{self.api_url}{path}"
+        key = requests.Request("GET", url, params=params).prepare().url or url
+        cached = self.cache.get(key)
+        headers = {}
+        if cached:
+            # Conditional requests answered with 304 are free, so only
+            # unconditional ones are checked against the budget.
+            headers["If-None-Match"] = cached["etag"]
+        else:
+            self._check_budget("core")
+
+        with observe_upstream("github", "rest"):
+            response = self.session.get(url, params=params, headers=headers, timeout=10)
+        self.requests_made += 1
+        self._update_rate_limit(response.headers)
+        if cached and response.status_code == 304:
+            self.not_modified += 1
+            return cached["body"]
+        response.raise_for_status()
+
+        body = response.json()
+        etag = response.headers.get("ETag")
+        if etag:
+            self.cache.set(key, etag, body)
+        return body
+
+    def graphql(self, query: str, variables: dict[str, Any]) -> dict[str, Any]:
+        self._check_budget("graphql")
+        with observe_upstream("github", "graphql"):
+            response = self.session.post(
+                f"{self.api_url}/graphql",
+                json={"query": query, "variables": variables},
+                timeout=30,
+            )
+        self.requests_made += 1
+        self._update_rate_limit(response.headers)
+        response.raise_for_status()
+
+        payload = response.json()
+        data = payload.get("data")
+        if not data:
+            errors = payload.get("errors") or [{"message": "empty response"}]
+            raise GitHubError(errors[0]["message"])
+        rate_limit = data.get("rateLimit")
+        if rate_limit:
+            self.rate_remaining["graphql"] = rate_limit["remaining"]
+        return data
+
+    def list_repositories(self, owner: str) -> List[str]:
+        names = []
+        page = 1
+        while True:
+            repos = self.rest_get(
+                f"/users/{owner}/repos",
+                {"per_page": 100, "page": page, "type": "owner"},
+            )
+            names.extend(repo["name"] for repo in repos)
+            if len(repos) < 100:
+                return names
+            page += 1
+
+    def rest_repository(self, owner: str, name: str) -> dict[str, Any]:
+        """A repository's REST details, in the shape of ``RepositoryFields``."""
+        repository = self.rest_get(f"/repos/{owner}/{name}")
+        parent = repository.get("parent")
+        return {
+            "name": repository["name"],
+            "nameWithOwner": repository["full_name"],
+            "url": repository["html_url"],
+            "isFork": repository["fork"],
+            "isArchived": repository["archived"],
+            "pushedAt": repository["pushed_at"],
+            "defaultBranchRef": {"name": repository.get("default_branch")},
+            "parent": {
+                "nameWithOwner": parent["full_name"],
+                "pushedAt": parent["pushed_at"],
+            }
+            if parent
+            else None,
+        }
+
+    def iter_repositories(
+        self, owner: str, names: List[str]
+    ) -> Iterator[dict[str, Any]]:
+        """
+        Yields repository details, one GraphQL query per batch of names, or
+        one REST request per name without a token.
+        """
+        if not self.authenticated:
+            for name in names:
+                yield self.rest_repository(owner, name)
+            return
+        for start in range(0, len(names), self.batch_size):
+            batch = names[start : start + self.batch_size]
+            variables: dict[str, Any] = {"owner": owner}
+            variables.update({f"n{i}": name for i, name in enumerate(batch)})
+            data = self.graphql(build_batch_query(len(batch)), variables)
+            for i in range(len(batch)):
+                repository = data.get(f"r{i}")
+                if repository:
+                    yield repository
+
+
+@lru_cache(maxsize=1)
+def get_github_client() -> GitHubClient:
+    # Shared so the HTTP connection pool and in-memory ETags survive across scans
+    return GitHubClient()
+
+
+def parse_github_target(target_url: str) -> Optional[Tuple[str, Optional[str]]]:
+    """Returns ``(owner, repository)`` for a GitHub URL, or None for other hosts."""
+    parsed = urlparse(target_url if "://" in target_url else f"https://{target_url}")
+    if (parsed.hostname or "").lower() not in GITHUB_HOSTS:
+        return None
+    parts = [part for part in parsed.path.split("/") if part]
+    if parts and parts[0] in ("orgs", "users"):
+        parts = parts[1:]
+    if not parts:
+        return None
+    repository = parts[1].removesuffix(".git") if len(parts) > 1 else None
+    return parts[0], repository
+
+
+def _parse_datetime(value: Optional[str]) -> Optional[datetime.datetime]:
+    if not value:
+        return None
+    return datetime.datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+
+def _manifest_dependencies(
+    repository: dict[str, Any],
+) -> Iterator[Tuple[str, str, str]]:
+    """Yields ``(ecosystem, package, manifest)`` for the manifests at HEAD."""
+    package_json = (repository.get("packageJson") or {}).get("text")
+    if package_json:
+        try:
+            manifest = json.loads(package_json)
+        except ValueError:
+            manifest = {}
+        for section in ("dependencies", "devDependencies"):
+            for package in manifest.get(section) or {}:
+                yield "npm", package, "package.json"
+
+    requirements = (repository.get("requirementsTxt") or {}).get("text")
+    if requirements:
+        for line in requirements.splitlines():
+            match = REQUIREMENT_NAME_PATTERN.match(line.split("#", 1)[0])
+            if match:
+                package = match.group(1).lower().replace("_", "-")
+                yield "pypi", package, "requirements.txt"
+
+
+def detect_zombies(
+    repository: dict[str, Any],
+    now: datetime.datetime,
+    stale_after: datetime.timedelta,
+) -> List[Finding]:
+    findings = []
+    cutoff = now - stale_after
+    full_name = repository["nameWithOwner"]
+    url = repository["url"]
+    pushed_at = _parse_datetime(repository.get("pushedAt"))
+    parent = repository.get("parent") or {}
+
+    if repository.get("isArchived"):
+        findings.append(
+            Finding(
+                name=f"{full_name} (archived)",
+                url=url,
+                description=f"Archived repository, last pushed {pushed_at:%Y-%m-%d}."
+                if pushed_at
+                else "Archived repository.",
+                status="investigate",
+            )
+        )
+    elif repository.get("isFork") and pushed_at:
+        parent_pushed_at = _parse_datetime(parent.get("pushedAt"))
+        if pushed_at < cutoff:
+            findings.append(
+                Finding(
+                    name=f"{full_name} (stale fork)",
+                    url=url,
+                    description=f"Stale fork of {parent.get('nameWithOwner', 'an unknown parent')}, "
+                    f"last pushed {pushed_at:%Y-%m-%d}.",
+                    status="investigate",
+                )
+            )
+        elif parent_pushed_at and parent_pushed_at - pushed_at > stale_after:
+            findings.append(
+                Finding(
+                    name=f"{full_name} (stale fork)",
+                    url=url,
+                    description=f"Fork has fallen {(parent_pushed_at - pushed_at).days} days "
+                    f"behind {parent['nameWithOwner']}.",
+                    status="investigate",
+                )
+            )
+
+    default_branch = (repository.get("defaultBranchRef") or {}).get("name")
+    for ref in (repository.get("refs") or {}).get("nodes") or []:
+        committed_at = _parse_datetime((ref.get("target") or {}).get("committedDate"))
+        if ref["name"] != default_branch and committed_at and committed_at < cutoff:
+            findings.append(
+                Finding(
+                    name=f"{full_name}@{ref['name']}",
+                    url=f"{url}/tree/{ref['name']}",
+                    description=f"Abandoned branch, last commit {committed_at:%Y-%m-%d}.",
+                    status="investigate",
+                )
+            )
+
+    for fork in (repository.get("forks") or {}).get("nodes") or []:
+        fork_pushed_at = _parse_datetime(fork.get("pushedAt"))
+        if fork_pushed_at and fork_pushed_at < cutoff:
+            findings.append(
+                Finding(
+                    name=f"{fork['nameWithOwner']} (stale fork)",
+                    url=fork["url"],
+                    description=f"Stale fork of {full_name}, last pushed {fork_pushed_at:%Y-%m-%d}.",
+                    status="investigate",
+                )
+            )
+
+    seen = set()
+    for ecosystem, package, manifest in _manifest_dependencies(repository):
+        reason = DEPRECATED_PACKAGES.get((ecosystem, package))
+        if reason and package not in seen:
+            seen.add(package)
+            findings.append(
+                Finding(
+                    name=f"{package} in {full_name}",
+                    url=f"{url}/blob/HEAD/{manifest}",
+                    description=f"Deprecated dependency still in use: {package} ({reason}).",
+                )
+            )
+    return findings
+
+
+def iter_zombies(
+    target_url: str, client: Optional[GitHubClient] = None
+) -> Iterator[Finding]:
+    """
+    Yields zombie findings for a GitHub owner (``github.com/<owner>``) or a single
+    repository (``github.com/<owner>/<repo>``). Non-GitHub targets yield nothing.
+    """
+    target = parse_github_target(target_url)
+    if target is None:
+        return
+    owner, repository = target
+    client = client or get_github_client()
+    names = [repository] if repository else client.list_repositories(owner)
+    now = datetime.datetime.now(datetime.timezone.utc)
+    stale_after = datetime.timedelta(days=settings.GITHUB_STALE_DAYS)
+    for details in client.iter_repositories(owner, names):
+        yield from detect_zombies(details, now=now, stale_after=stale_after)
@@ -1,7 +1,7 @@
 import uuid
 from typing import List, Optional
 from fastapi_users import schemas
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 from uuid import UUID
 
 
@@ -17,6 +17,44 @@ class UserUpdate(schemas.BaseUserUpdate):
     pass
 
 
+class ItemBase(BaseModel):
+    name: str
+    description: Optional[str] = None
+    quantity: Optional[int] = None
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class ItemCreate(ItemBase):
+    pass
+
+
+class ItemRead(ItemBase):
+    id: UUID
+    user_id: UUID
+
+
+class ItemUpdate(BaseModel):
+    id: UUID
+    name: Optional[str] = None
+    description: Optional[str] = None
+    quantity: Optional[int] = None
+
+
+class ItemDelete(BaseModel):
+    ids: List[UUID]
+
+
+class ItemBulkResult(BaseModel):
+    count: int
+    missing: List[UUID] = []
+
+
+class ItemKeysetPage(BaseModel):
+    items: List[ItemRead]
+    next_after: Optional[UUID] = None
+
+
 # Asset Hunter Schemas
 
 class ScanRequest(BaseModel):
@@ -44,3 +82,88 @@ class AnalysisResult(BaseModel):
     valuation: str
     reasoning: str
     details: str
+
+class BatchAnalysisItem(BaseModel):
+    asset_id: str
+    result: Optional[AnalysisResult] = None
+    error: Optional[str] = None
+
+class BatchAnalysisResult(BaseModel):
+    results: List[BatchAnalysisItem]
+
+class AnalysisQueueStats(BaseModel):
+    limit: int
+    in_flight: int
+    waiting: int
+    max_waiting: int
+    completed: int
+    average_wait_seconds: float
+
+class ValuationCacheStats(BaseModel):
+    hits: int
+    misses: int
+    refreshes: int
+    write_errors: int
+    hit_ratio: float
+
+class UpstreamStats(BaseModel):
+    state: str
+    consecutive_failures: int
+    calls: int
+    retries: int
+    hedged: int
+    hedge_wins: int
+    timeouts: int
+    rejected: int
+    p95_seconds: Optional[float] = None
+
+class DatabasePoolStats(BaseModel):
+    mode: str
+    checkouts: int
+    checkout_seconds_total: float
+    checkout_seconds_max: float
+    timeouts: int
+    connects: int
+    size: Optional[int] = None
+    checked_in: Optional[int] = None
+    checked_out: Optional[int] = None
+    overflow: Optional[int] = None
+
+class ReplicaStatus(BaseModel):
+    healthy: bool
+    lag_seconds: Optional[float] = None
+    reads: int
+
+class DatabaseReplicaStats(BaseModel):
+    replica_reads: int
+    primary_reads: int
+    sticky_reads: int
+    fallbacks: int
+    replicas: List[ReplicaStatus]
+
+class PasswordHashingStats(BaseModel):
+    workers: int
+    waiting: int
+    in_flight: int
+    max_waiting: int
+    completed: int
+    average_queue_seconds: float
+    max_queue_seconds: float
+    average_hash_seconds: float
+
+class MailQueueStats(BaseModel):
+    pending: int
+    queued: int
+    sent: int
+    failed: int
+    retried: int
+    dropped: int
+    sessions: int
+    connected: bool
+
+class ProfileSummary(BaseModel):
+    id: str
+    request: str
+    started_at: float
+    duration_seconds: float
+    samples: int
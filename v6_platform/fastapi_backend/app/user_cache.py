@@ -0,0 +1,91 @@
+"""
+Short-lived in-process cache of authenticated users.
+
+Entries are keyed by user id and access token and hold the user's column
+values rather than the ORM instance, so every request gets its own detached
+``User`` that can be attached to that request's session. Writes to a user go
+through ``UserManager``, whose hooks invalidate all of the user's entries;
+``AUTH_USER_CACHE_TTL_SECONDS`` bounds how long a change made by another
+process can go unnoticed.
+"""
+
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Set, Tuple
+
+from sqlalchemy import inspect
+from sqlalchemy.orm import make_transient_to_detached
+
+from app.config import settings
+from app.models import User
+
+Key = Tuple[uuid.UUID, str]
+
+
+class UserCache:
+    def __init__(
+        self,
+        maxsize: int,
+        ttl: float,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._clock = clock
+        self._entries: OrderedDict[Key, Tuple[float, Dict[str, Any]]] = OrderedDict()
+        self._keys_by_user: Dict[uuid.UUID, Set[Key]] = {}
+
+    def get(self, user_id: uuid.UUID, token: str) -> Optional[User]:
+        key = (user_id, token)
+        entry = self._entries.get(key)
+        if entry is None or entry[0] <= self._clock():
+            if entry is not None:
+                self._discard(key)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        user = User(**entry[1])
+        make_transient_to_detached(user)
+        return user
+
+    def put(self, user_id: uuid.UUID, token: str, user: User) -> None:
+        if self.ttl <= 0 or self.maxsize <= 0:
+            return
+        key = (user_id, token)
+        columns = {
+            attribute.key: getattr(user, attribute.key)
+            for attribute in inspect(User).column_attrs
+        }
+        self._entries[key] = (self._clock() + self.ttl, columns)
+        self._entries.move_to_end(key)
+        self._keys_by_user.setdefault(user_id, set()).add(key)
+        while len(self._entries) > self.maxsize:
+            self._discard(next(iter(self._entries)))
+
+    def invalidate(self, user_id: uuid.UUID) -> None:
+        for key in self._keys_by_user.pop(user_id, set()):
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._keys_by_user.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _discard(self, key: Key) -> None:
+        self._entries.pop(key, None)
+        keys = self._keys_by_user.get(key[0])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_user[key[0]]
+
+
+user_cache = UserCache(
+    settings.AUTH_USER_CACHE_SIZE, settings.AUTH_USER_CACHE_TTL_SECONDS
+)
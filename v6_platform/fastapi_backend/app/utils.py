@@ -1,5 +1,56 @@
+import uuid
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
 from fastapi.routing import APIRoute
 
+# Namespace for asset ids; changing it changes every asset id
+ASSET_ID_NAMESPACE = uuid.UUID("72bd349e-9e79-4057-a097-43e0b356622d")
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
 
 def simple_generate_unique_route_id(route: APIRoute):
     return f"{route.tags[0]}-{route.name}"
+
+
+def normalize_url(url: str) -> str:
+    """
+    Normalizes a URL so equivalent spellings compare equal: lowercase scheme
+    and host, no default port, no fragment, no trailing slash and sorted
+    query parameters.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    netloc = (parts.hostname or "").lower()
+    # urlsplit strips the brackets off IPv6 literals
+    if ":" in netloc:
+        netloc = f"[{netloc}]"
+    try:
+        port = parts.port
+    except ValueError:
+        # Out of range or not a number: keep it as given, since scanners
+        # report such URLs back in their error assets
+        netloc = f"{netloc}:{parts.netloc.rpartition(':')[2]}"
+    else:
+        if port and port != DEFAULT_PORTS.get(scheme):
+            netloc = f"{netloc}:{port}"
+    if parts.username:
+        netloc = f"{parts.username}@{netloc}"
+    path = parts.path.rstrip("/")
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((scheme, netloc, path, query, ""))
+
+
+def generate_asset_id(asset_type: str, url: str, name: str) -> str:
+    """
+    Deterministic asset id derived from the asset's type, normalized URL and
+    name, so the same finding keeps its id across scans.
+    """
+    return str(
+        uuid.uuid5(ASSET_ID_NAMESPACE, f"{asset_type}\n{normalize_url(url)}\n{name}")
+    )
+
+
+def sse_event(event: str, data: str) -> str:
+    """Formats one server-sent event; ``data`` must be a single line."""
+    return f"event: {event}\ndata: {data}\n\n"
@@ -0,0 +1,300 @@
+"""
+Asset valuation with Gemini: prompt building and response mapping for single
+assets and for batches of assets packed into one prompt.
+
+Generation is constrained to a JSON response schema that mirrors
+``AnalysisResult``, so answers map straight onto it. Output that still fails
+to parse falls back to the free-text mapping rather than asking again.
+"""
+
+import asyncio
+import json
+import re
+from typing import Any, Dict, List, Optional, Sequence, Union
+
+from app import llm
+from app.config import settings
+from app.schemas import AnalysisResult, Asset
+
+INSTRUCTIONS = """
+        Provide:
+        1. A realistic valuation range (e.g. $5k - $10k).
+        2. Concise reasoning why.
+        3. Technical details on leverage points.
+"""
+
+JSON_FENCE_PATTERN = re.compile(r"^```(?:json)?\s*|\s*```$")
+
+RESULT_FIELDS = ("valuation", "reasoning", "details")
+
+RESULT_SCHEMA: Dict[str, Any] = {
+    "type": "object",
+    "properties": {field: {"type": "string"} for field in RESULT_FIELDS},
+    "required": list(RESULT_FIELDS),
+}
+
+BATCH_RESULT_SCHEMA: Dict[str, Any] = {
+    "type": "array",
+    "items": {
+        "type": "object",
+        "properties": {"asset": {"type": "integer"}, **RESULT_SCHEMA["properties"]},
+        "required": ["asset", *RESULT_FIELDS],
+    },
+}
+
+GENERATION_CONFIG = {
+    "response_mime_type": "application/json",
+    "response_schema": RESULT_SCHEMA,
+}
+
+BATCH_GENERATION_CONFIG = {
+    "response_mime_type": "application/json",
+    "response_schema": BATCH_RESULT_SCHEMA,
+}
+
+
+def describe_asset(asset: Asset) -> str:
+    return f"""
+        Name: {asset.name}
+        Type: {asset.type}
+        Description: {asset.description}
+        URL: {asset.url}
+"""
+
+
+def build_prompt(asset: Asset) -> str:
+    return f"""
+        You are a Fintech Asset Valuator. Analyze this digital asset:{describe_asset(asset)}{INSTRUCTIONS}
+        Format as JSON: {{ "valuation": "...", "reasoning": "...", "details": "..." }}
+        """
+
+
+def build_batch_prompt(assets: Sequence[Asset]) -> str:
+    described = "".join(
+        f"\n        Asset {index}:{describe_asset(asset)}"
+        for index, asset in enumerate(assets, start=1)
+    )
+    return f"""
+        You are a Fintech Asset Valuator. Analyze each of these {len(assets)} digital assets:{described}
+        For each asset:{INSTRUCTIONS}
+        Format as a JSON array with one object per asset, in the same order:
+        [{{ "asset": 1, "valuation": "...", "reasoning": "...", "details": "..." }}, ...]
+        """
+
+
+def simulated_result() -> AnalysisResult:
+    return AnalysisResult(
+        valuation="$12,000 - $15,000",
+        reasoning="Legacy code quality inferred high. (API Key missing for real analysis)",
+        details="Simulated analysis.",
+    )
+
+
+def degraded_result() -> AnalysisResult:
+    """The mock valuation, served while Gemini is failing."""
+    return simulated_result().model_copy(
+        update={
+            "reasoning": "Gemini is temporarily unavailable; this is a default "
+            "estimate, not an analysis of the asset."
+        }
+    )
+
+
+def result_from_text(text: str) -> AnalysisResult:
+    return AnalysisResult(
+        valuation="AI Generated Estimate",
+        reasoning=text[:200] + "...",
+        details=text,
+    )
+
+
+def _result_from_entry(entry: Any) -> Optional[AnalysisResult]:
+    if not isinstance(entry, dict):
+        return None
+    try:
+        return AnalysisResult(
+            valuation=str(entry["valuation"]),
+            reasoning=str(entry["reasoning"]),
+            details=str(entry.get("details", "")),
+        )
+    except KeyError:
+        return None
+
+
+def _load_json(text: str) -> Any:
+    return json.loads(JSON_FENCE_PATTERN.sub("", text.strip()))
+
+
+def parse_result(text: str) -> AnalysisResult:
+    """
+    Maps a single-asset answer onto AnalysisResult, falling back to the
+    free-text mapping when the answer is not the JSON object asked for.
+    """
+    try:
+        result = _result_from_entry(_load_json(text))
+    except ValueError:
+        result = None
+    return result or result_from_text(text)
+
+
+class FieldStreamParser:
+    """
+    Picks completed top-level string fields out of a JSON object while it is
+    still streaming in, so a field can be forwarded as soon as its closing
+    quote arrives instead of after the whole object.
+    """
+
+    def __init__(self):
+        self.fields: Dict[str, str] = {}
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._raw: List[str] = []
+        self._key: Optional[str] = None
+        self._expecting_value = False
+
+    def feed(self, text: str) -> Dict[str, str]:
+        """Consumes the next piece of output; returns the fields it completed."""
+        completed = {}
+        for char in text:
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+                    self._end_string(completed)
+                    continue
+                self._raw.append(char)
+            elif char == '"':
+                self._in_string = True
+                self._raw = []
+            elif char in "{[":
+                self._depth += 1
+            elif char in "}]":
+                self._depth -= 1
+            elif self._depth == 1 and char == ":":
+                self._expecting_value = True
+            elif self._depth == 1 and char == ",":
+                self._key, self._expecting_value = None, False
+        return completed
+
+    def _end_string(self, completed: Dict[str, str]) -> None:
+        if self._depth != 1:
+            return
+        try:
+            value = json.loads('"' + "".join(self._raw) + '"', strict=False)
+        except ValueError:
+            return
+        if not self._expecting_value:
+            self._key = value
+        elif self._key is not None:
+            self.fields[self._key] = completed[self._key] = value
+            self._key, self._expecting_value = None, False
+
+
+async def analyze(asset: Asset) -> AnalysisResult:
+    text = await llm.generate_text(
+        build_prompt(asset), generation_config=GENERATION_CONFIG
+    )
+    return parse_result(text)
+
+
+def pack_batches(assets: Sequence[Asset]) -> List[List[int]]:
+    """
+    Groups asset indexes into prompts of at most ``ANALYZE_BATCH_PACK_SIZE``
+    assets and ``ANALYZE_BATCH_PROMPT_CHARS`` characters of asset descriptions.
+    """
+    batches: List[List[int]] = []
+    current: List[int] = []
+    size = 0
+    for index, asset in enumerate(assets):
+        length = len(describe_asset(asset))
+        if current and (
+            len(current) >= settings.ANALYZE_BATCH_PACK_SIZE
+            or size + length > settings.ANALYZE_BATCH_PROMPT_CHARS
+        ):
+            batches.append(current)
+            current, size = [], 0
+        current.append(index)
+        size += length
+    if current:
+        batches.append(current)
+    return batches
+
+
+def parse_batch_response(text: str, count: int) -> List[Optional[AnalysisResult]]:
+    """
+    Maps a batch answer onto its assets. Entries that are missing or malformed
+    come back as None so they can be retried one by one; an answer that is not
+    a JSON list at all raises ValueError.
+    """
+    try:
+        entries = _load_json(text)
+    except ValueError:
+        entries = None
+    if not isinstance(entries, list):
+        raise ValueError("Gemini did not answer the batch with a JSON list")
+
+    results: List[Optional[AnalysisResult]] = [None] * count
+
+    for position, entry in enumerate(entries):
+        if not isinstance(entry, dict):
+            continue
+        index = entry.get("asset", position + 1)
+        if not isinstance(index, int) or not 1 <= index <= count:
+            continue
+        result = _result_from_entry(entry)
+        if result is not None:
+            results[index - 1] = result
+    return results
+
+
+async def _analyze_packed(
+    assets: Sequence[Asset],
+) -> List[Union[AnalysisResult, Exception]]:
+    if len(assets) == 1:
+        return list(await asyncio.gather(analyze(assets[0]), return_exceptions=True))
+
+    try:
+        text = await llm.generate_text(
+            build_batch_prompt(assets), generation_config=BATCH_GENERATION_CONFIG
+        )
+        parsed = parse_batch_response(text, len(assets))
+    except Exception as e:
+        # Retrying each asset on its own would multiply the calls against a
+        # Gemini that is failing or ignoring the format, so the pack fails
+        return [e] * len(assets)
+
+    # Only the assets the answer left out or got wrong are asked about alone
+    missing = [index for index, result in enumerate(parsed) if result is None]
+    retried = await asyncio.gather(
+        *(analyze(assets[index]) for index in missing), return_exceptions=True
+    )
+    retried_by_index = dict(zip(missing, retried))
+    return [
+        result if result is not None else retried_by_index[index]
+        for index, result in enumerate(parsed)
+    ]
+
+
+async def analyze_many(
+    assets: Sequence[Asset],
+) -> List[Union[AnalysisResult, Exception]]:
+    """
+    Values many assets, packing several into each Gemini prompt and running
+    the prompts concurrently. Results come back in input order; failures are
+    returned as the exception raised for that asset.
+    """
+    if not llm.is_configured():
+        return [simulated_result() for _ in assets]
+
+    batches = pack_batches(assets)
+    answers = await asyncio.gather(
+        *(_analyze_packed([assets[index] for index in batch]) for batch in batches)
+    )
+    by_index = {}
+    for batch, answer in zip(batches, answers):
+        by_index.update(zip(batch, answer))
+    return [by_index[index] for index in range(len(assets))]
@@ -0,0 +1,125 @@
+"""
+Database-backed cache of Gemini valuations.
+
+A valuation is fully determined by the asset fields that go into the prompt
+and by the model answering it, so a hash of those is the cache key. Entries
+older than ``VALUATION_CACHE_TTL_SECONDS`` are treated as misses.
+"""
+
+import datetime
+import hashlib
+import json
+import logging
+from typing import Dict, Optional, Sequence
+
+from sqlalchemy import delete, select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.models import Valuation
+from app.schemas import AnalysisResult, Asset
+
+logger = logging.getLogger(__name__)
+
+
+class CacheStats:
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.write_errors = 0
+
+    def snapshot(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "refreshes": self.refreshes,
+            "write_errors": self.write_errors,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
+
+
+stats = CacheStats()
+
+
+def fingerprint(asset: Asset, model: Optional[str] = None) -> str:
+    payload = json.dumps(
+        [
+            asset.name,
+            asset.type,
+            asset.description,
+            asset.url,
+            model or settings.GEMINI_MODEL,
+        ]
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _is_fresh(entry: Valuation, now: datetime.datetime) -> bool:
+    created_at = entry.created_at
+    if created_at.tzinfo is None:
+        # SQLite hands back naive datetimes
+        created_at = created_at.replace(tzinfo=datetime.timezone.utc)
+    age = now - created_at
+    return age.total_seconds() < settings.VALUATION_CACHE_TTL_SECONDS
+
+
+async def get_many(
+    session: AsyncSession, fingerprints: Sequence[str]
+) -> Dict[str, AnalysisResult]:
+    """Returns the fresh cached valuations among ``fingerprints``."""
+    if not fingerprints:
+        return {}
+    rows = await session.execute(
+        select(Valuation).where(Valuation.fingerprint.in_(set(fingerprints)))
+    )
+    now = datetime.datetime.now(datetime.timezone.utc)
+    found = {
+        entry.fingerprint: AnalysisResult(
+            valuation=entry.valuation,
+            reasoning=entry.reasoning,
+            details=entry.details,
+        )
+        for entry in rows.scalars()
+        if _is_fresh(entry, now)
+    }
+    hits = sum(1 for fp in fingerprints if fp in found)
+    stats.hits += hits
+    stats.misses += len(fingerprints) - hits
+    return found
+
+
+async def get(session: AsyncSession, fp: str) -> Optional[AnalysisResult]:
+    return (await get_many(session, [fp])).get(fp)
+
+
+async def store_many(session: AsyncSession, results: Dict[str, AnalysisResult]) -> None:
+    """
+    Replaces the cached valuations for the given fingerprints. Failures are
+    logged and swallowed: a cache write must never fail the valuation itself.
+    """
+    if not results:
+        return
+    now = datetime.datetime.now(datetime.timezone.utc)
+    try:
+        await session.execute(
+            delete(Valuation).where(Valuation.fingerprint.in_(list(results)))
+        )
+        session.add_all(
+            Valuation(
+                fingerprint=fp,
+                model=settings.GEMINI_MODEL,
+                valuation=result.valuation,
+                reasoning=result.reasoning,
+                details=result.details,
+                created_at=now,
+            )
+            for fp, result in results.items()
+        )
+        await session.commit()
+    except SQLAlchemyError:
+        stats.write_errors += 1
+        logger.exception("Could not store %d cached valuations", len(results))
+        await session.rollback()
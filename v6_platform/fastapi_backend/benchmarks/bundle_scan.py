@@ -0,0 +1,57 @@
+"""
+Streams a large synthetic JavaScript bundle from the local site stand-in
+through the bundle analyzer and reports throughput and peak Python memory.
+
+    python -m benchmarks.bundle_scan --megabytes 16
+"""
+
+import argparse
+import json
+import time
+import tracemalloc
+
+import requests
+from bs4 import BeautifulSoup
+
+from app.scanners.bundles import analyze_pages
+from benchmarks.stubs.site import FakeSite
+
+
+def make_bundle(megabytes: int) -> bytes:
+    block = b"function f(a){return a+1};" * 2000
+    parts = []
+    size = 0
+    i = 0
+    while size < megabytes * 1024 * 1024:
+        parts.append(block)
+        parts.append(b'fetch("/api/v1/resource%d");' % i)
+        size += len(block)
+        i += 1
+    return b"".join(parts)
+
+
+def run(megabytes: int) -> dict:
+    bundle = make_bundle(megabytes)
+    page = '<script src="/bundle.js"></script>'
+    with FakeSite({"/": page, "/bundle.js": bundle}) as site:
+        soup = BeautifulSoup(requests.get(site.url).text, "html.parser")
+        tracemalloc.start()
+        start = time.perf_counter()
+        findings = analyze_pages({f"{site.url}/": soup})
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return {
+        "bundle_bytes": len(bundle),
+        "findings": len(findings),
+        "seconds": round(elapsed, 4),
+        "megabytes_per_second": round(len(bundle) / 1024 / 1024 / elapsed, 1),
+        "peak_python_memory_bytes": peak,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--megabytes", type=int, default=16)
+    args = parser.parse_args()
+    print(json.dumps(run(args.megabytes), indent=2))
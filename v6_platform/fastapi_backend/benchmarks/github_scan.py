@@ -0,0 +1,52 @@
+"""
+Scans a synthetic organization served by the local GitHub stand-in and reports
+wall time and rate-limit consumption for a cold and a warm (cached) scan.
+
+    python -m benchmarks.github_scan --repositories 500
+"""
+
+import argparse
+import json
+import time
+
+from app.scanners.github import GitHubClient, MetadataCache, iter_zombies
+from benchmarks.stubs.github import FakeGitHub, make_organization
+
+RATE_LIMIT = 5000
+
+
+def run(repositories: int, batch_size: int) -> dict:
+    results = {}
+    cache = MetadataCache()
+    with FakeGitHub({"acme": make_organization("acme", repositories)}) as github:
+        for label in ("cold", "warm"):
+            client = GitHubClient(
+                api_url=github.url,
+                token="benchmark",
+                cache=cache,
+                batch_size=batch_size,
+            )
+            core_before = github.remaining["core"]
+            graphql_before = github.remaining["graphql"]
+            start = time.perf_counter()
+            findings = list(iter_zombies("https://github.com/acme", client))
+            results[label] = {
+                "seconds": round(time.perf_counter() - start, 4),
+                "findings": len(findings),
+                "http_requests": client.requests_made,
+                "not_modified": client.not_modified,
+                "core_points": core_before - github.remaining["core"],
+                "graphql_points": graphql_before - github.remaining["graphql"],
+            }
+    results["scans_per_hour_within_limit"] = RATE_LIMIT // max(
+        1, results["warm"]["graphql_points"]
+    )
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repositories", type=int, default=500)
+    parser.add_argument("--batch-size", type=int, default=25)
+    args = parser.parse_args()
+    print(json.dumps(run(args.repositories, args.batch_size), indent=2))
@@ -0,0 +1,138 @@
+"""
+Ingests items for one user through the items API in-process, once row at a
+time through ``POST /items/`` and once in batches through ``POST /items/bulk``,
+and reports rows per second for each. The row-at-a-time run is shorter by
+default since it is the slow one. Pass a PostgreSQL URL to measure COPY.
+
+    python -m benchmarks.items_ingest --items 100000 --single 2000
+    python -m benchmarks.items_ingest --database-url postgresql+asyncpg://...
+"""
+
+import argparse
+import asyncio
+import json
+import tempfile
+import time
+import uuid
+from typing import AsyncGenerator, Optional
+
+from fastapi_users.password import PasswordHelper
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import delete, func, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.database import get_async_session
+from app.main import app
+from app.models import Base, Item, User
+from app.users import get_jwt_strategy
+
+
+def payload(start: int, count: int) -> list:
+    return [
+        {"name": f"item {i}", "description": f"Imported item {i}", "quantity": i}
+        for i in range(start, start + count)
+    ]
+
+
+async def ingest_single(client: AsyncClient, headers: dict, count: int) -> float:
+    start = time.perf_counter()
+    for item in payload(0, count):
+        response = await client.post("/items/", json=item, headers=headers)
+        response.raise_for_status()
+    return time.perf_counter() - start
+
+
+async def ingest_bulk(
+    client: AsyncClient, headers: dict, count: int, batch_size: int
+) -> float:
+    start = time.perf_counter()
+    for offset in range(0, count, batch_size):
+        response = await client.post(
+            "/items/bulk",
+            json=payload(offset, min(batch_size, count - offset)),
+            headers=headers,
+        )
+        response.raise_for_status()
+    return time.perf_counter() - start
+
+
+def report(count: int, seconds: float) -> dict:
+    return {
+        "items": count,
+        "seconds": round(seconds, 3),
+        "items_per_second": round(count / seconds, 1),
+    }
+
+
+async def run(
+    items: int, single: int, batch_size: int, database_url: Optional[str]
+) -> dict:
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_async_engine(
+            database_url or f"sqlite+aiosqlite:///{directory}/bench.db"
+        )
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        maker = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+        async def override_get_async_session() -> AsyncGenerator[AsyncSession, None]:
+            async with maker() as session:
+                yield session
+
+        app.dependency_overrides[get_async_session] = override_get_async_session
+        user = User(
+            id=uuid.uuid4(),
+            email=f"bench-{uuid.uuid4().hex[:8]}@example.com",
+            hashed_password=PasswordHelper().hash("Benchmark#Password1"),
+            is_active=True,
+        )
+        try:
+            async with maker() as session:
+                session.add(user)
+                await session.commit()
+            headers = {
+                "Authorization": f"Bearer {await get_jwt_strategy().write_token(user)}"
+            }
+            async with AsyncClient(
+                transport=ASGITransport(app=app), base_url="http://benchmark"
+            ) as client:
+                single_seconds = await ingest_single(client, headers, single)
+                bulk_seconds = await ingest_bulk(client, headers, items, batch_size)
+            async with maker() as session:
+                stored = await session.scalar(
+                    select(func.count())
+                    .select_from(Item)
+                    .where(Item.user_id == user.id)
+                )
+                await session.execute(delete(Item).where(Item.user_id == user.id))
+                await session.execute(delete(User).where(User.id == user.id))
+                await session.commit()
+            return {
+                "dialect": engine.dialect.name,
+                "single": report(single, single_seconds),
+                "bulk": {
+                    **report(items, bulk_seconds),
+                    "batch_size": batch_size,
+                },
+                "stored": stored,
+            }
+        finally:
+            app.dependency_overrides.clear()
+            await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--items", type=int, default=100_000)
+    parser.add_argument("--single", type=int, default=2000)
+    parser.add_argument("--batch-size", type=int, default=10_000)
+    parser.add_argument("--database-url", default=None)
+    args = parser.parse_args()
+    print(
+        json.dumps(
+            asyncio.run(
+                run(args.items, args.single, args.batch_size, args.database_url)
+            ),
+            indent=2,
+        )
+    )
@@ -0,0 +1,348 @@
+"""
+Load-tests one backend worker with concurrent clients and reports throughput
+and latency percentiles per scenario:
+
+- ``auth``: log in (password hashing included) and fetch ``/users/me``
+- ``scans``: ``POST /api/scan/`` against local stand-ins for a target site
+  and for GitHub, alternating between the two scanners
+- ``analysis``: uncached single valuations through ``POST /api/analyze/``
+- ``batch``: uncached batch valuations through ``POST /api/analyze/batch``
+
+Gemini is replaced by a local stand-in answering after ``--gemini-latency``
+seconds, so only the app's own overhead and concurrency limits are measured.
+Each scenario runs against the app in-process through ASGITransport and
+through a real socket served by uvicorn in a background thread (HTTP parsing
+and connection handling included). Pass a PostgreSQL URL to measure against
+PostgreSQL instead of a temporary SQLite file.
+
+    python -m benchmarks.loadtest --requests 200 --concurrency 20
+    python -m benchmarks.loadtest --scenarios analysis --transports socket
+"""
+
+import argparse
+import asyncio
+import json
+import socket
+import statistics
+import tempfile
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import AsyncGenerator, Awaitable, Callable, Dict, Iterator, List, Optional
+
+import httpx
+import uvicorn
+from fastapi_users.password import PasswordHelper
+from sqlalchemy import NullPool
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app import llm
+from app.config import settings
+from app.database import get_async_session
+from app.main import app
+from app.models import Base, User
+from app.scanners.github import get_github_client
+from benchmarks.stubs.gemini import FakeGemini
+from benchmarks.stubs.github import FakeGitHub, make_organization
+from benchmarks.stubs.site import FakeSite
+
+PASSWORD = "Benchmark#Password1"
+
+USERS = 50
+
+SITE_PAGE = """<html><head><title>Load test</title>
+<script src="/static/app.js"></script></head><body></body></html>"""
+
+SITE_BUNDLE = 'fetch("/api/v1/orders");fetch("/graphql");' * 200
+
+Scenario = Callable[[httpx.AsyncClient, int], Awaitable[int]]
+
+
+def make_asset(i: int) -> dict:
+    return {
+        "id": f"asset-{i}",
+        "name": f"acme/service-{i}",
+        "type": "github_zombie",
+        "url": f"https://github.com/acme/service-{i}",
+        "description": f"Repository acme/service-{i} has had no release in "
+        f"{200 + i % 300} days but still has open issues.",
+        "detected_at": "2026-10-19T12:00:00Z",
+    }
+
+
+def analysis_request(i: int) -> dict:
+    asset = make_asset(i)
+    return {"asset_id": asset["id"], "asset_data": asset}
+
+
+def scenarios(site_url: str, batch_size: int) -> Dict[str, Scenario]:
+    async def auth(client: httpx.AsyncClient, i: int) -> int:
+        response = await client.post(
+            "/auth/jwt/login",
+            data={"username": f"user{i % USERS}@example.com", "password": PASSWORD},
+        )
+        if response.status_code != 200:
+            return response.status_code
+        token = response.json()["access_token"]
+        response = await client.get(
+            "/users/me", headers={"Authorization": f"Bearer {token}"}
+        )
+        return response.status_code
+
+    async def scans(client: httpx.AsyncClient, i: int) -> int:
+        request = (
+            {"target_url": site_url, "scan_type": "chrome"}
+            if i % 2
+            else {"target_url": "https://github.com/acme", "scan_type": "github"}
+        )
+        response = await client.post("/api/scan/", json=request)
+        return response.status_code
+
+    async def analysis(client: httpx.AsyncClient, i: int) -> int:
+        response = await client.post(
+            "/api/analyze/", params={"refresh": "true"}, json=analysis_request(i)
+        )
+        return response.status_code
+
+    async def batch(client: httpx.AsyncClient, i: int) -> int:
+        response = await client.post(
+            "/api/analyze/batch",
+            params={"refresh": "true"},
+            json=[analysis_request(i * batch_size + j) for j in range(batch_size)],
+        )
+        return response.status_code
+
+    return {"auth": auth, "scans": scans, "analysis": analysis, "batch": batch}
+
+
+def percentile(ordered: List[float], q: float) -> float:
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+async def run_scenario(
+    client: httpx.AsyncClient, scenario: Scenario, requests: int, concurrency: int
+) -> dict:
+    """Runs ``requests`` operations, ``concurrency`` of them at a time."""
+    latencies: List[float] = []
+    statuses: Counter[str] = Counter()
+    indexes = iter(range(requests))
+
+    async def worker() -> None:
+        for i in indexes:
+            start = time.perf_counter()
+            try:
+                status = str(await scenario(client, i))
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            latencies.append(time.perf_counter() - start)
+            statuses[status] += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "seconds": round(elapsed, 3),
+        "requests_per_second": round(requests / elapsed, 1),
+        "statuses": dict(sorted(statuses.items())),
+        "latency_ms": {
+            "mean": round(statistics.mean(latencies) * 1000, 2),
+            "p50": round(percentile(latencies, 0.5) * 1000, 2),
+            "p90": round(percentile(latencies, 0.9) * 1000, 2),
+            "p95": round(percentile(latencies, 0.95) * 1000, 2),
+            "p99": round(percentile(latencies, 0.99) * 1000, 2),
+            "max": round(latencies[-1] * 1000, 2),
+        },
+    }
+
+
+@contextmanager
+def serve(server_app) -> Iterator[str]:
+    """Serves the app with uvicorn on a local port from a background thread."""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.bind(("127.0.0.1", 0))
+    server = uvicorn.Server(uvicorn.Config(server_app, log_level="warning"))
+    thread = threading.Thread(
+        target=server.run, kwargs={"sockets": [sock]}, daemon=True
+    )
+    thread.start()
+    while not server.started:
+        if not thread.is_alive():
+            raise RuntimeError("uvicorn failed to start")
+        time.sleep(0.01)
+    try:
+        yield f"http://127.0.0.1:{sock.getsockname()[1]}"
+    finally:
+        server.should_exit = True
+        thread.join()
+        sock.close()
+
+
+@contextmanager
+def stand_ins(gemini: FakeGemini, repositories: int) -> Iterator[str]:
+    """Points the app at local GitHub and Gemini stand-ins; yields a site URL."""
+    site = FakeSite({"/": SITE_PAGE, "/static/app.js": SITE_BUNDLE})
+    github = FakeGitHub({"acme": make_organization("acme", repositories)}, limit=10**9)
+    original = (
+        settings.GITHUB_API_URL,
+        settings.GITHUB_TOKEN,
+        settings.GEMINI_API_KEY,
+        settings.RATE_LIMIT_ENABLED,
+        llm.get_model,
+    )
+    with site, github:
+        settings.GITHUB_API_URL = github.url
+        settings.GITHUB_TOKEN = "load-test"
+        settings.GEMINI_API_KEY = "load-test"
+        # Every simulated user shares one account and address
+        settings.RATE_LIMIT_ENABLED = False
+        llm.get_model = lambda: gemini
+        get_github_client.cache_clear()
+        try:
+            yield f"{site.url}/"
+        finally:
+            (
+                settings.GITHUB_API_URL,
+                settings.GITHUB_TOKEN,
+                settings.GEMINI_API_KEY,
+                settings.RATE_LIMIT_ENABLED,
+                llm.get_model,
+            ) = original
+            get_github_client.cache_clear()
+
+
+async def create_users(maker: async_sessionmaker) -> None:
+    hashed = PasswordHelper().hash(PASSWORD)
+    async with maker() as session:
+        session.add_all(
+            User(email=f"user{i}@example.com", hashed_password=hashed, is_active=True)
+            for i in range(USERS)
+        )
+        await session.commit()
+
+
+async def run_transport(
+    client: httpx.AsyncClient,
+    selected: Dict[str, Scenario],
+    requests: int,
+    concurrency: int,
+    gemini: FakeGemini,
+) -> dict:
+    results = {}
+    for name, scenario in selected.items():
+        generations = gemini.generations
+        results[name] = await run_scenario(client, scenario, requests, concurrency)
+        results[name]["gemini_generations"] = gemini.generations - generations
+    return results
+
+
+async def run(
+    names: List[str],
+    transports: List[str],
+    requests: int,
+    concurrency: int,
+    gemini_latency: float,
+    batch_size: int,
+    repositories: int,
+    database_url: Optional[str],
+) -> dict:
+    gemini = FakeGemini(latency=gemini_latency, jitter=gemini_latency / 4)
+    report: dict = {
+        "config": {
+            "requests": requests,
+            "concurrency": concurrency,
+            "gemini_latency_seconds": gemini_latency,
+            "batch_size": batch_size,
+            "repositories": repositories,
+        }
+    }
+    with tempfile.TemporaryDirectory() as directory:
+        # Without pooling, so the uvicorn thread's event loop opens its own
+        # connections
+        engine = create_async_engine(
+            database_url or f"sqlite+aiosqlite:///{directory}/loadtest.db",
+            poolclass=NullPool,
+        )
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.drop_all)
+            await conn.run_sync(Base.metadata.create_all)
+        maker = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+        async def override_get_async_session() -> AsyncGenerator[AsyncSession, None]:
+            async with maker() as session:
+                yield session
+
+        app.dependency_overrides[get_async_session] = override_get_async_session
+        report["config"]["dialect"] = engine.dialect.name
+        try:
+            await create_users(maker)
+            with stand_ins(gemini, repositories) as site_url:
+                selected = {
+                    name: scenario
+                    for name, scenario in scenarios(site_url, batch_size).items()
+                    if name in names
+                }
+                limits = httpx.Limits(max_connections=concurrency)
+                if "asgi" in transports:
+                    async with httpx.AsyncClient(
+                        transport=httpx.ASGITransport(app=app),
+                        base_url="http://loadtest",
+                        timeout=None,
+                    ) as client:
+                        report["asgi"] = await run_transport(
+                            client, selected, requests, concurrency, gemini
+                        )
+                if "socket" in transports:
+                    with serve(app) as url:
+                        async with httpx.AsyncClient(
+                            base_url=url, limits=limits, timeout=None
+                        ) as client:
+                            report["socket"] = await run_transport(
+                                client, selected, requests, concurrency, gemini
+                            )
+        finally:
+            app.dependency_overrides.clear()
+            async with engine.begin() as conn:
+                await conn.run_sync(Base.metadata.drop_all)
+            await engine.dispose()
+    return report
+
+
+if __name__ == "__main__":
+    names = ["auth", "scans", "analysis", "batch"]
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scenarios", nargs="+", choices=names, default=names)
+    parser.add_argument(
+        "--transports",
+        nargs="+",
+        choices=["asgi", "socket"],
+        default=["asgi", "socket"],
+    )
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--gemini-latency", type=float, default=0.2)
+    parser.add_argument("--batch-size", type=int, default=10)
+    parser.add_argument("--repositories", type=int, default=50)
+    parser.add_argument("--database-url", default=None)
+    args = parser.parse_args()
+    print(
+        json.dumps(
+            asyncio.run(
+                run(
+                    args.scenarios,
+                    args.transports,
+                    args.requests,
+                    args.concurrency,
+                    args.gemini_latency,
+                    args.batch_size,
+                    args.repositories,
+                    args.database_url,
+                )
+            ),
+            indent=2,
+        )
+    )
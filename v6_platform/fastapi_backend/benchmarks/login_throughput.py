@@ -0,0 +1,130 @@
+"""
+Runs a burst of concurrent logins against the app in-process while probing a
+cheap endpoint, once with password hashing on the event loop (the old
+behaviour) and once on the hashing pool. Reports login throughput and how
+long the probe requests took meanwhile.
+
+    python -m benchmarks.login_throughput --logins 200 --concurrency 50
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import tempfile
+import time
+from typing import AsyncGenerator, List
+
+from fastapi_users.password import PasswordHelper
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app import users
+from app.database import get_async_session
+from app.hashing import PasswordHasher
+from app.main import app
+from app.models import Base, User
+
+PASSWORD = "Benchmark#Password1"
+
+PROBE_INTERVAL = 0.01
+
+
+async def create_users(maker: async_sessionmaker, count: int) -> List[str]:
+    hashed = PasswordHelper().hash(PASSWORD)
+    emails = [f"user{i}@example.com" for i in range(count)]
+    async with maker() as session:
+        session.add_all(
+            User(email=email, hashed_password=hashed, is_active=True)
+            for email in emails
+        )
+        await session.commit()
+    return emails
+
+
+async def probe(client: AsyncClient, stop: asyncio.Event, latencies: List[float]):
+    """
+    Requests a cheap endpoint every 10ms. Latency is counted from when the
+    request was due, so time spent waiting for a blocked event loop shows up.
+    """
+    while not stop.is_set():
+        due = time.perf_counter() + PROBE_INTERVAL
+        await asyncio.sleep(PROBE_INTERVAL)
+        await client.get("/api/analyze/queue")
+        latencies.append(time.perf_counter() - due)
+
+
+async def storm(emails: List[str], logins: int, concurrency: int, workers: int):
+    users.password_hasher = PasswordHasher(workers)
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    stop = asyncio.Event()
+
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://benchmark"
+    ) as client:
+
+        async def login(i: int) -> int:
+            async with semaphore:
+                response = await client.post(
+                    "/auth/jwt/login",
+                    data={"username": emails[i % len(emails)], "password": PASSWORD},
+                )
+                return response.status_code
+
+        prober = asyncio.create_task(probe(client, stop, latencies))
+        start = time.perf_counter()
+        statuses = await asyncio.gather(*(login(i) for i in range(logins)))
+        elapsed = time.perf_counter() - start
+        stop.set()
+        await prober
+
+    latencies.sort()
+    return {
+        "hash_workers": workers,
+        "seconds": round(elapsed, 3),
+        "logins_per_second": round(logins / elapsed, 1),
+        "failed_logins": sum(1 for status in statuses if status != 200),
+        "probe_requests": len(latencies),
+        "probe_p50_ms": round(statistics.median(latencies) * 1000, 2),
+        "probe_p95_ms": round(latencies[int(len(latencies) * 0.95)] * 1000, 2),
+        "probe_max_ms": round(latencies[-1] * 1000, 2),
+    }
+
+
+async def run(logins: int, concurrency: int, workers: int) -> dict:
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_async_engine(f"sqlite+aiosqlite:///{directory}/bench.db")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        maker = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+        async def override_get_async_session() -> AsyncGenerator[AsyncSession, None]:
+            async with maker() as session:
+                yield session
+
+        app.dependency_overrides[get_async_session] = override_get_async_session
+        original = users.password_hasher
+        try:
+            emails = await create_users(maker, min(logins, 50))
+            return {
+                "inline": await storm(emails, logins, concurrency, 0),
+                "pool": await storm(emails, logins, concurrency, workers),
+            }
+        finally:
+            users.password_hasher = original
+            app.dependency_overrides.clear()
+            await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+    print(
+        json.dumps(
+            asyncio.run(run(args.logins, args.concurrency, args.workers)), indent=2
+        )
+    )
@@ -0,0 +1,104 @@
+"""
+Serves a ScanResult of 10k and 100k assets in-process through FastAPI, once
+with the stock JSONResponse and once with ORJSONResponse, and reports the time
+per response. Also reports the body size and compression time with gzip and,
+if the brotli package is installed, brotli at the app's settings.
+
+    python -m benchmarks.serialization --sizes 10000 100000 --repeat 3
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from typing import List
+
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse, ORJSONResponse
+from httpx import ASGITransport, AsyncClient
+
+from app import compression
+from app.compression import CompressionMiddleware
+from app.config import settings
+from app.schemas import Asset, ScanResult
+
+
+def make_scan_result(count: int) -> ScanResult:
+    assets = [
+        Asset(
+            id=f"asset-{i}",
+            name=f"Zombie repository {i}",
+            type="github_zombie" if i % 2 else "chrome_ghost",
+            url=f"https://github.com/example/project-{i}",
+            description=f"Repository project-{i} has had no commits for {i % 900} days.",
+            detected_at="2026-10-19T12:00:00Z",
+        )
+        for i in range(count)
+    ]
+    return ScanResult(assets=assets, total_found=count)
+
+
+def make_app(response_class, result: ScanResult) -> FastAPI:
+    app = FastAPI(default_response_class=response_class)
+
+    @app.get("/scan", response_model=ScanResult)
+    async def scan():
+        return result
+
+    return app
+
+
+async def time_responses(app: FastAPI, repeat: int) -> dict:
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://benchmark"
+    ) as client:
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            response = await client.get("/scan")
+            timings.append(time.perf_counter() - start)
+    return {
+        "best_ms": round(min(timings) * 1000, 1),
+        "bytes": len(response.content),
+    }
+
+
+def time_compression(body: bytes, encoding: str) -> dict:
+    middleware = CompressionMiddleware(
+        None,
+        gzip_level=settings.COMPRESSION_GZIP_LEVEL,
+        brotli_quality=settings.COMPRESSION_BROTLI_QUALITY,
+    )
+    start = time.perf_counter()
+    compressed = middleware.compress(body, encoding)
+    return {
+        "ms": round((time.perf_counter() - start) * 1000, 1),
+        "bytes": len(compressed),
+    }
+
+
+async def run(sizes: List[int], repeat: int) -> dict:
+    report = {}
+    for size in sizes:
+        result = make_scan_result(size)
+        stock = await time_responses(make_app(JSONResponse, result), repeat)
+        fast = await time_responses(make_app(ORJSONResponse, result), repeat)
+        body = result.model_dump_json().encode()
+        encodings = ["gzip"] + (["br"] if compression.brotli is not None else [])
+        report[size] = {
+            "json_response": stock,
+            "orjson_response": fast,
+            "speedup": round(stock["best_ms"] / fast["best_ms"], 2),
+            "compression": {
+                encoding: time_compression(body, encoding) for encoding in encodings
+            },
+        }
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args.sizes, args.repeat)), indent=2))
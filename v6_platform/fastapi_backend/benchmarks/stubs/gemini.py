@@ -0,0 +1,64 @@
+"""
+Local stand-in for the Gemini model used by ``app.llm``: answers after a
+configurable latency with valuations in the JSON shape the prompts ask for,
+as a whole or streamed in chunks, and counts the generations it served.
+"""
+
+import asyncio
+import json
+import random
+import re
+from types import SimpleNamespace
+from typing import Any, AsyncIterator
+
+ANSWER = {
+    "valuation": "$5,000 - $8,000",
+    "reasoning": "Maintained code with a small but active user base.",
+    "details": "Load-test valuation.",
+}
+
+BATCH_ASSET_PATTERN = re.compile(r"^\s*Asset (\d+):", re.MULTILINE)
+
+
+class FakeGemini:
+    """
+    Drop-in for ``genai.GenerativeModel``. Each generation takes ``latency``
+    seconds, give or take up to ``jitter`` seconds.
+
+    Usage::
+
+        mocker.patch("app.llm.get_model", return_value=FakeGemini(latency=0.2))
+    """
+
+    def __init__(self, latency: float = 0.2, jitter: float = 0.0, chunks: int = 8):
+        self.latency = latency
+        self.jitter = jitter
+        self.chunks = chunks
+        self.generations = 0
+
+    def answer(self, prompt: str) -> str:
+        assets = BATCH_ASSET_PATTERN.findall(prompt)
+        if assets:
+            return json.dumps([{"asset": int(n), **ANSWER} for n in assets])
+        return json.dumps(ANSWER)
+
+    async def _wait(self) -> None:
+        await asyncio.sleep(
+            max(0.0, self.latency + random.uniform(-self.jitter, self.jitter))
+        )
+
+    async def generate_content_async(
+        self, prompt: str, stream: bool = False, **kwargs: Any
+    ) -> Any:
+        self.generations += 1
+        text = self.answer(prompt)
+        if not stream:
+            await self._wait()
+            return SimpleNamespace(text=text)
+        return self._stream(text)
+
+    async def _stream(self, text: str) -> AsyncIterator[Any]:
+        size = max(1, -(-len(text) // self.chunks))
+        for start in range(0, len(text), size):
+            await asyncio.sleep(self.latency / self.chunks)
+            yield SimpleNamespace(text=text[start : start + size])
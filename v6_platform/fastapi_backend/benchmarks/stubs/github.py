@@ -0,0 +1,251 @@
+"""
+Local stand-in for the slice of the GitHub REST and GraphQL APIs used by
+``app.scanners.github``.
+
+It keeps GitHub's accounting rules that matter for scanning: REST answers
+carry an ETag, ``304 Not Modified`` answers are not charged to the rate
+limit, and GraphQL queries are charged per requested node.
+"""
+
+import datetime
+import hashlib
+import json
+import math
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+from urllib.parse import parse_qs, urlparse
+
+# Nodes requested per repository by the scanner query: the repository, its
+# branches (first: 50) and its forks (first: 20).
+NODES_PER_REPOSITORY = 71
+
+
+def make_repository(
+    owner: str,
+    name: str,
+    pushed_at: datetime.datetime,
+    *,
+    is_fork: bool = False,
+    is_archived: bool = False,
+    parent_pushed_at: datetime.datetime | None = None,
+    branches: dict[str, datetime.datetime] | None = None,
+    forks: dict[str, datetime.datetime] | None = None,
+    package_json: dict[str, Any] | None = None,
+    requirements: str | None = None,
+) -> dict[str, Any]:
+    """Builds a repository in the shape returned by the scanner's GraphQL fragment."""
+    branches = branches or {"main": pushed_at}
+    return {
+        "name": name,
+        "nameWithOwner": f"{owner}/{name}",
+        "url": f"https://github.com/{owner}/{name}",
+        "isFork": is_fork,
+        "isArchived": is_archived,
+        "pushedAt": pushed_at.isoformat(),
+        "defaultBranchRef": {"name": "main"},
+        "parent": {
+            "nameWithOwner": f"upstream/{name}",
+            "pushedAt": (parent_pushed_at or pushed_at).isoformat(),
+        }
+        if is_fork
+        else None,
+        "refs": {
+            "nodes": [
+                {"name": branch, "target": {"committedDate": date.isoformat()}}
+                for branch, date in branches.items()
+            ]
+        },
+        "forks": {
+            "nodes": [
+                {
+                    "nameWithOwner": fork,
+                    "url": f"https://github.com/{fork}",
+                    "pushedAt": date.isoformat(),
+                }
+                for fork, date in (forks or {}).items()
+            ]
+        },
+        "packageJson": {"text": json.dumps(package_json)} if package_json else None,
+        "requirementsTxt": {"text": requirements} if requirements else None,
+    }
+
+
+def make_organization(owner: str, count: int) -> list[dict[str, Any]]:
+    """A synthetic organization where roughly one repository in five is a zombie."""
+    now = datetime.datetime.now(datetime.timezone.utc)
+    old = now - datetime.timedelta(days=800)
+    repositories = []
+    for i in range(count):
+        kind = i % 5
+        repositories.append(
+            make_repository(
+                owner,
+                f"repo-{i}",
+                old if kind == 1 else now,
+                is_fork=kind == 1,
+                is_archived=kind == 2,
+                branches={"main": now, "legacy": old} if kind == 3 else None,
+                package_json={"dependencies": {"request": "^2.88.0"}}
+                if kind == 4
+                else None,
+            )
+        )
+    return repositories
+
+
+def rest_repository(repository: dict[str, Any]) -> dict[str, Any]:
+    """The REST representation of a repository built by ``make_repository``."""
+    parent = repository["parent"]
+    return {
+        "name": repository["name"],
+        "full_name": repository["nameWithOwner"],
+        "html_url": repository["url"],
+        "fork": repository["isFork"],
+        "archived": repository["isArchived"],
+        "pushed_at": repository["pushedAt"],
+        "default_branch": repository["defaultBranchRef"]["name"],
+        **(
+            {
+                "parent": {
+                    "full_name": parent["nameWithOwner"],
+                    "pushed_at": parent["pushedAt"],
+                }
+            }
+            if parent
+            else {}
+        ),
+    }
+
+
+class FakeGitHub:
+    """
+    Serves ``GET /users/{owner}/repos``, ``GET /repos/{owner}/{name}`` and
+    ``POST /graphql`` on a local port. Like GitHub, it answers GraphQL
+    queries without a token with a 401.
+
+    Usage::
+
+        with FakeGitHub({"acme": make_organization("acme", 300)}) as github:
+            client = GitHubClient(api_url=github.url, token="test-token")
+    """
+
+    def __init__(
+        self, repositories: dict[str, list[dict[str, Any]]], limit: int = 5000
+    ):
+        self.repositories = repositories
+        self.remaining = {"core": limit, "graphql": limit}
+        self.rest_calls = 0
+        self.graphql_calls = 0
+        self.not_modified = 0
+        self._lock = threading.Lock()
+        self._server: ThreadingHTTPServer | None = None
+        self.url = ""
+
+    def __enter__(self) -> "FakeGitHub":
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args: Any) -> None:
+                pass
+
+            def do_GET(self) -> None:
+                fake._handle_rest(self)
+
+            def do_POST(self) -> None:
+                fake._handle_graphql(self)
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self._server.server_address[1]}"
+        threading.Thread(
+            target=self._server.serve_forever, args=(0.05,), daemon=True
+        ).start()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        assert self._server is not None
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _send(
+        self,
+        handler: BaseHTTPRequestHandler,
+        status: int,
+        resource: str,
+        body: bytes = b"",
+        headers: dict[str, str] | None = None,
+    ) -> None:
+        handler.send_response(status)
+        handler.send_header("X-RateLimit-Resource", resource)
+        handler.send_header("X-RateLimit-Remaining", str(self.remaining[resource]))
+        for name, value in (headers or {}).items():
+            handler.send_header(name, value)
+        handler.send_header("Content-Type", "application/json")
+        handler.send_header("Content-Length", str(len(body)))
+        handler.end_headers()
+        handler.wfile.write(body)
+
+    def _handle_rest(self, handler: BaseHTTPRequestHandler) -> None:
+        parsed = urlparse(handler.path)
+        listing = re.fullmatch(r"/users/([^/]+)/repos", parsed.path)
+        single = re.fullmatch(r"/repos/([^/]+)/([^/]+)", parsed.path)
+        answer: Any = None
+        if listing:
+            query = parse_qs(parsed.query)
+            per_page = int(query.get("per_page", ["30"])[0])
+            page = int(query.get("page", ["1"])[0])
+            repositories = self.repositories.get(listing.group(1), [])
+            answer = [
+                rest_repository(repository)
+                for repository in repositories[(page - 1) * per_page : page * per_page]
+            ]
+        elif single:
+            answer = next(
+                (
+                    rest_repository(repository)
+                    for repository in self.repositories.get(single.group(1), [])
+                    if repository["name"] == single.group(2)
+                ),
+                None,
+            )
+        if answer is None:
+            self._send(handler, 404, "core", b'{"message": "Not Found"}')
+            return
+        body = json.dumps(answer).encode()
+        etag = f'"{hashlib.sha1(body).hexdigest()}"'
+
+        with self._lock:
+            self.rest_calls += 1
+            if handler.headers.get("If-None-Match") == etag:
+                self.not_modified += 1
+                self._send(handler, 304, "core", headers={"ETag": etag})
+                return
+            self.remaining["core"] -= 1
+        self._send(handler, 200, "core", body, {"ETag": etag})
+
+    def _handle_graphql(self, handler: BaseHTTPRequestHandler) -> None:
+        length = int(handler.headers.get("Content-Length", "0"))
+        variables = json.loads(handler.rfile.read(length))["variables"]
+        if "Authorization" not in handler.headers:
+            message = b'{"message": "This endpoint requires you to be authenticated."}'
+            self._send(handler, 401, "graphql", message)
+            return
+        by_name = {
+            repository["name"]: repository
+            for repository in self.repositories.get(variables["owner"], [])
+        }
+        aliases = sorted(
+            (key for key in variables if re.fullmatch(r"n\d+", key)),
+            key=lambda key: int(key[1:]),
+        )
+        cost = max(1, math.ceil(len(aliases) * NODES_PER_REPOSITORY / 100))
+
+        with self._lock:
+            self.graphql_calls += 1
+            self.remaining["graphql"] -= cost
+            remaining = self.remaining["graphql"]
+        data: dict[str, Any] = {"rateLimit": {"cost": cost, "remaining": remaining}}
+        for key in aliases:
+            data[f"r{key[1:]}"] = by_name.get(variables[key])
+        self._send(handler, 200, "graphql", json.dumps({"data": data}).encode())
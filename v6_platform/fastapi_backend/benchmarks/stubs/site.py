@@ -0,0 +1,75 @@
+"""
+Local stand-in for a target website: serves fixed pages and JavaScript bundles
+and counts how often each path is requested.
+"""
+
+import threading
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+
+
+class FakeSite:
+    """
+    Serves ``routes`` (path -> body) on a local port. Bodies may be ``str`` or
+    ``bytes``; paths ending in ``.js`` are served as JavaScript, others as HTML.
+
+    Usage::
+
+        with FakeSite({"/": "<script src='/app.js'></script>", "/app.js": "..."}) as site:
+            requests.get(site.url)
+    """
+
+    def __init__(self, routes: dict[str, str | bytes]):
+        self.routes = routes
+        self.hits: Counter[str] = Counter()
+        self._lock = threading.Lock()
+        self._server: ThreadingHTTPServer | None = None
+        self.url = ""
+
+    def __enter__(self) -> "FakeSite":
+        site = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args: Any) -> None:
+                pass
+
+            def do_GET(self) -> None:
+                site._handle(self)
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self._server.server_address[1]}"
+        threading.Thread(
+            target=self._server.serve_forever, args=(0.05,), daemon=True
+        ).start()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        assert self._server is not None
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _handle(self, handler: BaseHTTPRequestHandler) -> None:
+        path = handler.path.split("?", 1)[0]
+        with self._lock:
+            self.hits[path] += 1
+        body = self.routes.get(path)
+        if body is None:
+            handler.send_response(404)
+            handler.send_header("Content-Length", "0")
+            handler.end_headers()
+            return
+        if isinstance(body, str):
+            body = body.encode()
+        content_type = (
+            "application/javascript"
+            if path.endswith(".js")
+            else "text/html; charset=utf-8"
+        )
+        handler.send_response(200)
+        handler.send_header("Content-Type", content_type)
+        handler.send_header("Content-Length", str(len(body)))
+        handler.end_headers()
+        handler.wfile.write(body)
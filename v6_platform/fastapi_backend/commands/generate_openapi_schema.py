@@ -1,6 +1,8 @@
+import argparse
 import json
 from pathlib import Path
 from app.main import app
+from app import openapi_schema
 import os
 
 from dotenv import load_dotenv
@@ -10,14 +12,36 @@ load_dotenv()
 OUTPUT_FILE = os.getenv("OPENAPI_OUTPUT_FILE")
 
 
-def generate_openapi_schema(output_file):
+def generate_openapi_schema(output_file, force=False):
+    """
+    Writes the schema the app serves and, when ``output_file`` is set, the
+    frontend's copy of it. Nothing is generated or written when the app's
+    fingerprint matches the last run, unless ``force`` is set.
+    """
+    fingerprint = openapi_schema.fingerprint()
+    output_path = Path(output_file) if output_file else None
+    if (
+        not force
+        and openapi_schema.is_current(fingerprint)
+        and (output_path is None or output_path.is_file())
+    ):
+        print("OpenAPI schema is up to date")
+        return
+
     schema = app.openapi()
-    output_path = Path(output_file)
+    if openapi_schema.write_artifact(schema, fingerprint):
+        print(f"Prebuilt OpenAPI schema saved to {openapi_schema.ARTIFACT_PATH}")
+    if output_path is None:
+        return
 
     updated_schema = remove_operation_id_tag(schema)
 
-    output_path.write_text(json.dumps(updated_schema, indent=2))
-    print(f"OpenAPI schema saved to {output_file}")
+    if openapi_schema.write_if_changed(
+        output_path, json.dumps(updated_schema, indent=2).encode()
+    ):
+        print(f"OpenAPI schema saved to {output_file}")
+    else:
+        print(f"OpenAPI schema in {output_file} is unchanged")
 
 
 def remove_operation_id_tag(schema):
@@ -39,4 +63,9 @@ def remove_operation_id_tag(schema):
 
 
 if __name__ == "__main__":
-    generate_openapi_schema(OUTPUT_FILE)
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--force", action="store_true", help="regenerate even if nothing changed"
+    )
+    args = parser.parse_args()
+    generate_openapi_schema(OUTPUT_FILE, force=args.force)
@@ -2,10 +2,12 @@
 
 if [ -f /.dockerenv ]; then
     echo "Running in Docker"
+    python -m commands.generate_openapi_schema
     fastapi dev app/main.py --host 0.0.0.0 --port 8000 --reload &
     python watcher.py
 else
     echo "Running locally with uv"
+    uv run python -m commands.generate_openapi_schema
     uv run fastapi dev app/main.py --host 0.0.0.0 --port 8000 --reload &
     uv run python watcher.py
 fi
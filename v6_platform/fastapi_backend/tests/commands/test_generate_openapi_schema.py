@@ -3,6 +3,7 @@ import os
 import pytest
 from pathlib import Path
 
+from app import openapi_schema
 from commands.generate_openapi_schema import (
     generate_openapi_schema,
     remove_operation_id_tag,
@@ -31,6 +32,13 @@ def test_remove_operation_id_tag(sample_openapi_schema, expected_output_schema):
     assert cleaned_schema == expected_output_schema
 
 
+@pytest.fixture(autouse=True)
+def artifact(mocker, tmp_path):
+    mocker.patch.object(openapi_schema, "ARTIFACT_PATH", tmp_path / "schema.json")
+    mocker.patch.object(openapi_schema, "FINGERPRINT_PATH", tmp_path / "fingerprint")
+    return openapi_schema.ARTIFACT_PATH
+
+
 @pytest.fixture
 def mock_app(mocker):
     app = mocker.patch("commands.generate_openapi_schema.app")
@@ -63,3 +71,45 @@ def test_generate_openapi_schema(mocker, mock_app):
         assert content == expected_output
 
     output_path.unlink()
+
+
+def test_generate_openapi_schema_writes_the_prebuilt_schema(mock_app, artifact):
+    generate_openapi_schema(None)
+
+    assert json.loads(artifact.read_bytes()) == mock_app.openapi.return_value
+    assert openapi_schema.is_current(openapi_schema.fingerprint())
+
+
+def test_generate_openapi_schema_skips_when_unchanged(mock_app, artifact, tmp_path):
+    output_path = tmp_path / "openapi.json"
+    generate_openapi_schema(output_path)
+    written = output_path.stat().st_mtime_ns, artifact.stat().st_mtime_ns
+
+    generate_openapi_schema(output_path)
+
+    mock_app.openapi.assert_called_once()
+    assert (output_path.stat().st_mtime_ns, artifact.stat().st_mtime_ns) == written
+
+
+def test_generate_openapi_schema_regenerates_when_the_app_changes(
+    mocker, mock_app, artifact, tmp_path
+):
+    output_path = tmp_path / "openapi.json"
+    generate_openapi_schema(output_path)
+    written = output_path.stat().st_mtime_ns
+
+    mocker.patch.object(openapi_schema, "fingerprint", return_value="changed")
+    generate_openapi_schema(output_path)
+
+    # Regenerated, but the identical output is not rewritten
+    assert mock_app.openapi.call_count == 2
+    assert openapi_schema.is_current("changed")
+    assert output_path.stat().st_mtime_ns == written
+
+
+def test_generate_openapi_schema_force(mock_app, tmp_path):
+    output_path = tmp_path / "openapi.json"
+    generate_openapi_schema(output_path)
+    generate_openapi_schema(output_path, force=True)
+
+    assert mock_app.openapi.call_count == 2
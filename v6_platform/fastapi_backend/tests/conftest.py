@@ -1,4 +1,5 @@
 from httpx import AsyncClient, ASGITransport
+import pytest
 import pytest_asyncio
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from fastapi_users.db import SQLAlchemyUserDatabase
@@ -10,9 +11,16 @@ from app.models import User, Base
 
 from app.database import get_user_db, get_async_session
 from app.main import app
+from app.rate_limit import MemoryBackend, rate_limiter
 from app.users import get_jwt_strategy
 
 
+@pytest.fixture(autouse=True)
+def rate_limit_buckets(mocker):
+    """Give every test full rate limit buckets."""
+    mocker.patch.object(rate_limiter, "backend", MemoryBackend())
+
+
 @pytest_asyncio.fixture(scope="function")
 async def engine():
     """Create a fresh test database engine for each test function."""
@@ -1,7 +1,10 @@
+import asyncio
+
 import pytest
 from fastapi import status
 from fastapi_users.router import ErrorCode
 from sqlalchemy import select
+from app.email import MailQueue
 from app.models import User
 
 
@@ -100,3 +103,36 @@ class TestPasswordValidation:
         assert response.status_code == status.HTTP_201_CREATED
         assert user is not None
         assert user.email == "user@1.com"
+
+
+class TestForgotPassword:
+    @pytest.mark.asyncio(loop_scope="function")
+    async def test_forgot_password_does_not_wait_for_smtp(
+        self, test_client, authenticated_user, mocker
+    ):
+        """The reset email is queued; the response does not wait on the server."""
+        queue = MailQueue(
+            maxsize=10,
+            session_messages=10,
+            max_retries=0,
+            retry_base_delay=0,
+            idle_timeout=1,
+        )
+        mocker.patch("app.email.mail_queue", queue)
+        stalled = mocker.patch("app.email.aiosmtplib.SMTP")
+        stalled.return_value.connect = mocker.AsyncMock(
+            side_effect=asyncio.Event().wait
+        )
+
+        response = await asyncio.wait_for(
+            test_client.post(
+                "/auth/forgot-password",
+                json={"email": authenticated_user["user"].email},
+            ),
+            timeout=5,
+        )
+
+        assert response.status_code == status.HTTP_202_ACCEPTED
+        assert queue.stats()["queued"] == 1
+        assert queue.stats()["sent"] == 0
+        await queue.close(timeout=0)
@@ -0,0 +1,461 @@
+import datetime
+import json
+
+import pytest
+from fastapi import status
+from sqlalchemy import update
+
+from app.config import settings
+from app.llm import GeminiGate
+from app.models import Valuation
+from app.rate_limit import Limit, rate_limiter
+from app.resilience import CircuitOpenError
+from app.valuation_cache import CacheStats
+
+ASSET = {
+    "id": "asset-1",
+    "name": "acme/old (stale fork)",
+    "type": "github_zombie",
+    "url": "https://github.com/acme/old",
+    "description": "Stale fork.",
+    "detected_at": "2025-01-01T00:00:00",
+    "status": "investigate",
+}
+
+
+@pytest.fixture
+def gemini(mocker):
+    mocker.patch("app.llm.is_configured", return_value=True)
+    mocker.patch("app.llm.gate", GeminiGate(limit=4))
+    mocker.patch("app.valuation_cache.stats", CacheStats())
+    return mocker.patch("app.llm.generate_text", return_value="A valuation")
+
+
+@pytest.mark.asyncio(loop_scope="function")
+async def test_analyze_asset_without_key_returns_simulation(test_client, mocker):
+    mocker.patch("app.llm.is_configured", return_value=False)
+
+    response = await test_client.post(
+        "/api/analyze/", json={"asset_id": "asset-1", "asset_data": ASSET}
+    )
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["details"] == "Simulated analysis."
+
+
+@pytest.mark.asyncio(loop_scope="function")
+async def test_analyze_asset_awaits_gemini(test_client, gemini):
+    response = await test_client.post(
+        "/api/analyze/", json={"asset_id": "asset-1", "asset_data": ASSET}
+    )
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["details"] == "A valuation"
+    assert "acme/old (stale fork)" in gemini.call_args[0][0]
+
+
+@pytest.mark.asyncio(loop_scope="function")
+async def test_analyze_asset_is_served_from_cache(test_client, gemini):
+    request = {"asset_id": "asset-1", "asset_data": ASSET}
+
+    first = await test_client.post("/api/analyze/", json=request)
+    # The id and status are not part of the prompt, so they share the entry
+    second = await test_client.post(
+        "/api/analyze/",
+        json={"asset_id": "other", "asset_data": dict(ASSET, id="other", status="x")},
+    )
+
+    assert first.json() == second.json()
+    assert gemini.call_count == 1
+
+    response = await test_client.get("/api/analyze/cache")
+    assert response.json() == {
+        "hits": 1,
+        "misses": 1,
+        "refreshes": 0,
+        "write_errors": 0,
+        "hit_ratio": 0.5,
+    }
+
+
+@pytest.mark.asyncio(loop_scope="function")
+async def test_analyze_asset_refresh_bypasses_cache(test_client, gemini):
+    request = {"asset_id": "asset-1", "asset_data": ASSET}
+    await test_client.post("/api/analyze/", json=request)
+    gemini.return_value = "A newer valuation"
+
+    refreshed = await test_client.post("/api/analyze/?refresh=true", json=request)
+    cached = await test_client.post("/api/analyze/", json=request)
+
+    assert refreshed.json()["details"] == "A newer valuation"
+    assert cached.json()["details"] == "A newer valuation"
+    assert gemini.call_count == 2
+
+
+@pytest.mark.asyncio(loop_scope="function")
+async def test_analyze_asset_recomputes_expired_entries(
+    test_client, gemini, db_session
+):
+    request = {"asset_id": "asset-1", "asset_data": ASSET}
+    await test_client.post("/api/analyze/", json=request)
+    await db_session.execute(
+        update(Valuation).values(
+            created_at=datetime.datetime.now(datetime.timezone.utc)
+            - datetime.timedelta(days=30)
+        )
+    )
+    await db_session.commit()
+
+    await test_client.post("/api/analyze/", json=request)
+
+    assert gemini.call_count == 2
+
+
+@pytest.mark.asyncio(loop_scope="function")
+async def test_analyze_asset_changed_fields_miss_the_cache(test_client, gemini):
+    await test_client.post(
+        "/api/analyze/", json={"asset_id": "asset-1", "asset_data": ASSET}
+    )
+    await test_client.post(
+        "/api/analyze/",
+        json={
+            "asset_id": "asset-1",
+            "asset_data": dict(ASSET, description="Archived fork."),
+        },
+    )
+
+    assert gemini.call_count == 2
+
+
+@pytest.mark.asyncio(loop_scope="function")
+async def test_open_circuit_serves_the_mock_valuation(test_client, gemini):
+    gemini.side_effect = CircuitOpenError("down")
+    request = {"asset_id": "asset-1", "asset_data": ASSET}
+
+    single = await test_client.post("/api/analyze/", json=request)
+    batch = await test_client.post(
+        "/api/analyze/batch", json=[make_request(0), make_request(1)]
+    )
+
+    assert single.status_code == status.HTTP_200_OK
+    assert single.json()["valuation"] == "$12,000 - $15,000"
+    assert "temporarily unavailable" in single.json()["reasoning"]
+    assert [item["result"] for item in batch.json()["results"]] == [
+        single.json(),
+        single.json(),
+    ]
+    # Fallbacks are not cached
+    assert (await test_client.get("/api/analyze/cache")).json()["hits"] == 0
+
+
+@pytest.mark.asyncio(loop_scope="function")
+async def test_open_circuit_without_fallback_fails_fast(test_client, gemini, mocker):
+    mocker.patch("app.routes.analyze.settings.GEMINI_FALLBACK_TO_MOCK", False)
+    gemini.side_effect = CircuitOpenError("down")
+
+    response = await test_client.post(
+        "/api/analyze/", json={"asset_id": "asset-1", "asset_data": ASSET}
+    )
+
+    assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+    assert "Retry-After" in response.headers
+
+
+@pytest.mark.asyncio(loop_scope="function")
+async def test_upstream_stats(test_client):
+    response = await test_client.get("/api/analyze/upstream")
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["state"] == "closed"
+
+
+def parse_events(body):
+    events = []
+    for block in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+@pytest.fixture
+def gemini_stream(gemini, mocker):
+    pieces = ['{"valuation": "$5', 'k", "reasoning": "Stale', '", "details": "d"}']
+
+    async def stream_text(prompt, **kwargs):
+        for piece in pieces:
+            yield piece
+
+    return mocker.patch("app.llm.stream_text", side_effect=stream_text)
+
+
+@pytest.mark.asyncio(loop_scope="function")
+async def test_analyze_stream_sends_tokens_then_result(test_client, gemini_stream):
+    request = {"asset_id": "asset-1", "asset_data": ASSET}
+
+    response = await test_client.post("/api/analyze/stream", json=request)
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = parse_events(response.text)
+    assert events == [
+        ("token", {"text": '{"valuation": "$5'}),
+        ("token", {"text": 'k", "reasoning": "Stale'}),
+        ("field", {"name": "valuation", "value": "$5k"}),
+        ("token", {"text": '", "details": "d"}'}),
+        ("field", {"name": "reasoning", "value": "Stale"}),
+        ("field", {"name": "details", "value": "d"}),
+        ("result", {"valuation": "$5k", "reasoning": "Stale", "details": "d"}),
+    ]
+
+    # The streamed valuation was cached for the non-streaming endpoint too
+    cached = await test_client.post("/api/analyze/", json=request)
+    assert cached.json() == events[-1][1]
+    assert gemini_stream.call_count == 1
+
+
+@pytest.mark.asyncio(loop_scope="function")
+async def test_analyze_stream_reports_failures_as_error_event(
+    test_client, gemini_stream
+):
+    async def stream_text(prompt, **kwargs):
+        yield "partial "
+        raise RuntimeError("quota exceeded")
+
+    gemini_stream.side_effect = stream_text
+
+    response = await test_client.post(
+        "/api/analyze/stream", json={"asset_id": "asset-1", "asset_data": ASSET}
+    )
+
+    assert parse_events(response.text) == [
+        ("token", {"text": "partial "}),
+        ("error", {"detail": "Analysis failed: quota exceeded"}),
+    ]
+
+
+@pytest.mark.asyncio(loop_scope="function")
+async def test_analyze_stream_without_key_sends_simulation(test_client, mocker):
+    mocker.patch("app.llm.is_configured", return_value=False)
+
+    response = await test_client.post(
+        "/api/analyze/stream", json={"asset_id": "asset-1", "asset_data": ASSET}
+    )
+
+    [(event, data)] = parse_events(response.text)
+    assert event == "result"
+    assert data["details"] == "Simulated analysis."
+
+
+def make_request(index):
+    asset = dict(ASSET, id=f"asset-{index}", name=f"asset {index}")
+    return {"asset_id": asset["id"], "asset_data": asset}
+
+
+@pytest.mark.asyncio(loop_scope="function")
+async def test_analyze_batch_packs_assets_into_one_prompt(test_client, gemini):
+    gemini.return_value = json.dumps(
+        [
+            {"asset": i, "valuation": f"${i}k", "reasoning": "r", "details": "d"}
+            for i in (3, 1, 2)
+        ]
+    )
+
+    response = await test_client.post(
+        "/api/analyze/batch", json=[make_request(i) for i in range(3)]
+    )
+
+    assert response.status_code == status.HTTP_200_OK
+    assert gemini.call_count == 1
+    results = response.json()["results"]
+    assert [item["asset_id"] for item in results] == ["asset-0", "asset-1", "asset-2"]
+    assert [item["result"]["valuation"] for item in results] == ["$1k", "$2k", "$3k"]
+
+
+@pytest.mark.asyncio(loop_scope="function")
+async def test_analyze_batch_retries_unparsed_assets_one_by_one(test_client, gemini):
+    async def generate_text(prompt, **kwargs):
+        if "Analyze each of these" in prompt:
+            return '[{"asset": 1, "valuation": "$1k", "reasoning": "r"}]'
+        if "asset 2" in prompt:
+            raise RuntimeError("quota exceeded")
+        return "free-form answer"
+
+    gemini.side_effect = generate_text
+
+    response = await test_client.post(
+        "/api/analyze/batch", json=[make_request(i) for i in range(3)]
+    )
+
+    results = response.json()["results"]
+    assert gemini.call_count == 3
+    assert results[0]["result"]["valuation"] == "$1k"
+    assert results[1]["result"]["details"] == "free-form answer"
+    assert results[2] == {
+        "asset_id": "asset-2",
+        "result": None,
+        "error": "Analysis failed: quota exceeded",
+    }
+
+
+@pytest.mark.asyncio(loop_scope="function")
+@pytest.mark.parametrize(
+    "failure", [RuntimeError("quota exceeded"), "Here are your valuations!"]
+)
+async def test_analyze_batch_fails_the_pack_when_the_packed_prompt_fails(
+    test_client, gemini, failure
+):
+    if isinstance(failure, Exception):
+        gemini.side_effect = failure
+    else:
+        gemini.return_value = failure
+
+    response = await test_client.post(
+        "/api/analyze/batch", json=[make_request(i) for i in range(3)]
+    )
+
+    assert response.status_code == status.HTTP_200_OK
+    # No single-asset retries
+    assert gemini.call_count == 1
+    results = response.json()["results"]
+    assert [item["result"] for item in results] == [None] * 3
+    assert all(item["error"].startswith("Analysis failed: ") for item in results)
+
+
+@pytest.mark.asyncio(loop_scope="function")
+async def test_analyze_batch_splits_into_concurrent_prompts(
+    test_client, gemini, mocker
+):
+    mocker.patch("app.valuation.settings.ANALYZE_BATCH_PACK_SIZE", 2)
+    gemini.return_value = "[]"
+
+    response = await test_client.post(
+        "/api/analyze/batch", json=[make_request(i) for i in range(5)]
+    )
+
+    assert response.status_code == status.HTTP_200_OK
+    # Two packed prompts of two assets plus a single-asset prompt, then one
+    # retry per asset the packed prompts failed to value
+    assert gemini.call_count == 2 + 1 + 4
+
+
+@pytest.mark.asyncio(loop_scope="function")
+async def test_analyze_batch_only_values_uncached_assets(test_client, gemini):
+    await test_client.post("/api/analyze/", json=make_request(1))
+    gemini.return_value = json.dumps(
+        [
+            {"asset": i, "valuation": f"${i}k", "reasoning": "r", "details": "d"}
+            for i in (1, 2)
+        ]
+    )
+
+    response = await test_client.post(
+        "/api/analyze/batch",
+        json=[make_request(0), make_request(1), make_request(2), make_request(0)],
+    )
+
+    assert gemini.call_count == 2
+    assert "asset 1" not in gemini.call_args[0][0]
+    results = response.json()["results"]
+    assert [item["result"]["details"] for item in results] == [
+        "d",
+        "A valuation",
+        "d",
+        "d",
+    ]
+
+    await test_client.post("/api/analyze/batch", json=[make_request(2)])
+    assert gemini.call_count == 2
+
+
+@pytest.mark.asyncio(loop_scope="function")
+async def test_obvious_assets_are_valued_without_gemini(test_client, gemini):
+    broken = dict(ASSET, id="broken", name="Inaccessible: x", status="error")
+
+    single = await test_client.post(
+        "/api/analyze/", json={"asset_id": "broken", "asset_data": broken}
+    )
+    batch = await test_client.post(
+        "/api/analyze/batch",
+        json=[{"asset_id": "broken", "asset_data": broken}, make_request(1)],
+    )
+
+    assert single.json()["valuation"] == "$0"
+    results = batch.json()["results"]
+    assert results[0]["result"] == single.json()
+    assert results[1]["result"]["details"] == "A valuation"
+    assert gemini.call_count == 1
+    assert "Inaccessible" not in gemini.call_args[0][0]
+
+
+@pytest.mark.asyncio(loop_scope="function")
+async def test_analyze_batch_rejects_oversized_batches(test_client, gemini, mocker):
+    mocker.patch("app.routes.analyze.settings.ANALYZE_BATCH_MAX_ITEMS", 2)
+
+    response = await test_client.post(
+        "/api/analyze/batch", json=[make_request(i) for i in range(3)]
+    )
+
+    assert response.status_code == status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+
+
+@pytest.mark.asyncio(loop_scope="function")
+async def test_analyze_batch_takes_a_token_per_asset(test_client, gemini, mocker):
+    mocker.patch("app.llm.is_configured", return_value=False)
+    mocker.patch.object(rate_limiter, "limits", {"analyze": Limit(rate=0.5, burst=3)})
+
+    first = await test_client.post(
+        "/api/analyze/batch", json=[make_request(i) for i in range(2)]
+    )
+    second = await test_client.post(
+        "/api/analyze/batch", json=[make_request(i) for i in range(2)]
+    )
+    single = await test_client.post("/api/analyze/", json=make_request(0))
+
+    assert first.status_code == status.HTTP_200_OK
+    assert second.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+    assert second.headers["Retry-After"] == "2"
+    assert single.status_code == status.HTTP_200_OK
+
+
+@pytest.mark.asyncio(loop_scope="function")
+async def test_analyze_batch_refuses_batches_larger_than_the_burst(
+    test_client, gemini, mocker
+):
+    mocker.patch("app.llm.is_configured", return_value=False)
+    mocker.patch.object(rate_limiter, "limits", {"analyze": Limit(rate=0.5, burst=3)})
+
+    oversized = await test_client.post(
+        "/api/analyze/batch", json=[make_request(i) for i in range(4)]
+    )
+    # The refused batch took nothing from the bucket
+    full = await test_client.post(
+        "/api/analyze/batch", json=[make_request(i) for i in range(3)]
+    )
+
+    assert oversized.status_code == status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    assert oversized.json()["detail"] == "At most 3 assets per batch."
+    assert full.status_code == status.HTTP_200_OK
+
+
+@pytest.mark.asyncio(loop_scope="function")
+async def test_analyze_batch_accepts_the_largest_batch_by_default(
+    test_client, gemini, mocker
+):
+    mocker.patch("app.llm.is_configured", return_value=False)
+    size = settings.ANALYZE_BATCH_MAX_ITEMS
+
+    response = await test_client.post(
+        "/api/analyze/batch", json=[make_request(i) for i in range(size)]
+    )
+
+    assert response.status_code == status.HTTP_200_OK
+    assert len(response.json()["results"]) == size
+
+
+@pytest.mark.asyncio(loop_scope="function")
+async def test_analysis_queue_stats(test_client, gemini):
+    response = await test_client.get("/api/analyze/queue")
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["limit"] == 4
+    assert response.json()["waiting"] == 0
@@ -0,0 +1,37 @@
+import pytest
+from fastapi import status
+
+
+@pytest.mark.asyncio(loop_scope="function")
+async def test_database_pool_stats(test_client):
+    response = await test_client.get("/api/health/db")
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["mode"] == "queue"
+    assert response.json()["size"] == 10
+
+
+@pytest.mark.asyncio(loop_scope="function")
+async def test_mail_queue_stats(test_client):
+    response = await test_client.get("/api/health/mail")
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["dropped"] == 0
+    assert response.json()["connected"] is False
+
+
+@pytest.mark.asyncio(loop_scope="function")
+async def test_metrics(test_client):
+    await test_client.get("/api/health/db")
+
+    response = await test_client.get("/metrics")
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+    assert (
+        'http_request_duration_seconds_count{method="GET",route="/api/health/db"}'
+        in response.text
+    )
+    assert "gemini_queue_limit 16" in response.text
+    assert 'gemini_upstream_state{state="closed"} 1' in response.text
+    assert "db_pool_size 10" in response.text
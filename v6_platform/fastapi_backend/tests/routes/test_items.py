@@ -0,0 +1,252 @@
+import uuid
+
+import pytest
+from fastapi import status
+from fastapi_users.db import SQLAlchemyUserDatabase
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.config import settings
+from app.models import Item, User
+from app.replicas import ReplicaRouter
+from app.routes.items import insert_items
+from app.users import UserManager
+
+
+async def add_items(db_session, user, count):
+    items = [Item(name=f"item {i}", quantity=i, user_id=user.id) for i in range(count)]
+    db_session.add_all(items)
+    await db_session.commit()
+    return items
+
+
+@pytest.mark.asyncio(loop_scope="function")
+async def test_create_and_read_item(test_client, authenticated_user):
+    response = await test_client.post(
+        "/items/",
+        json={"name": "Widget", "description": "A widget", "quantity": 3},
+        headers=authenticated_user["headers"],
+    )
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["name"] == "Widget"
+    assert response.json()["user_id"] == str(authenticated_user["user"].id)
+
+    response = await test_client.get("/items/", headers=authenticated_user["headers"])
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["total"] == 1
+    assert response.json()["items"][0]["name"] == "Widget"
+
+
+@pytest.mark.asyncio(loop_scope="function")
+async def test_items_require_authentication(test_client):
+    response = await test_client.get("/items/")
+
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+@pytest.mark.asyncio(loop_scope="function")
+async def test_bulk_create_items(test_client, authenticated_user, db_session):
+    payload = [{"name": f"item {i}", "quantity": i} for i in range(250)]
+
+    response = await test_client.post(
+        "/items/bulk", json=payload, headers=authenticated_user["headers"]
+    )
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == {"count": 250, "missing": []}
+    count = await db_session.scalar(
+        select(func.count())
+        .select_from(Item)
+        .where(Item.user_id == authenticated_user["user"].id)
+    )
+    assert count == 250
+
+
+@pytest.mark.asyncio(loop_scope="function")
+async def test_bulk_create_rejects_oversized_requests(
+    test_client, authenticated_user, mocker
+):
+    mocker.patch("app.routes.items.settings.ITEMS_BULK_MAX_SIZE", 2)
+
+    response = await test_client.post(
+        "/items/bulk",
+        json=[{"name": "a"}, {"name": "b"}, {"name": "c"}],
+        headers=authenticated_user["headers"],
+    )
+
+    assert response.status_code == status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+
+
+@pytest.mark.asyncio(loop_scope="function")
+async def test_keyset_pagination_visits_every_item_once(
+    test_client, authenticated_user, db_session
+):
+    items = await add_items(db_session, authenticated_user["user"], 25)
+
+    seen = []
+    after = None
+    while True:
+        params = {"limit": 10}
+        if after:
+            params["after"] = after
+        response = await test_client.get(
+            "/items/keyset", params=params, headers=authenticated_user["headers"]
+        )
+        assert response.status_code == status.HTTP_200_OK
+        seen += [item["id"] for item in response.json()["items"]]
+        after = response.json()["next_after"]
+        if after is None:
+            break
+
+    assert seen == sorted(str(item.id) for item in items)
+
+
+@pytest.mark.asyncio(loop_scope="function")
+async def test_bulk_update_items(test_client, authenticated_user, db_session):
+    items = await add_items(db_session, authenticated_user["user"], 3)
+    unknown = uuid.uuid4()
+
+    response = await test_client.patch(
+        "/items/bulk",
+        json=[
+            {"id": str(items[0].id), "name": "renamed"},
+            {"id": str(items[1].id), "quantity": 42, "description": None},
+            {"id": str(unknown), "name": "ghost"},
+        ],
+        headers=authenticated_user["headers"],
+    )
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == {"count": 2, "missing": [str(unknown)]}
+    db_session.expire_all()
+    rows = {
+        item.id: item
+        for item in (await db_session.execute(select(Item))).scalars().all()
+    }
+    assert rows[items[0].id].name == "renamed"
+    assert rows[items[0].id].quantity == 0
+    assert rows[items[1].id].quantity == 42
+    assert rows[items[2].id].name == "item 2"
+
+
+@pytest.mark.asyncio(loop_scope="function")
+async def test_bulk_update_rejects_null_names(
+    test_client, authenticated_user, db_session
+):
+    items = await add_items(db_session, authenticated_user["user"], 1)
+
+    response = await test_client.patch(
+        "/items/bulk",
+        json=[{"id": str(items[0].id), "name": None}],
+        headers=authenticated_user["headers"],
+    )
+
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
+@pytest.mark.asyncio(loop_scope="function")
+async def test_bulk_update_rejects_repeated_ids(
+    test_client, authenticated_user, db_session
+):
+    (item,) = await add_items(db_session, authenticated_user["user"], 1)
+
+    response = await test_client.patch(
+        "/items/bulk",
+        json=[
+            {"id": str(item.id), "name": "first"},
+            {"id": str(item.id), "quantity": 7},
+        ],
+        headers=authenticated_user["headers"],
+    )
+
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+    name = await db_session.scalar(select(Item.name).where(Item.id == item.id))
+    assert name == "item 0"
+
+
+@pytest.mark.asyncio(loop_scope="function")
+async def test_bulk_delete_only_touches_own_items(
+    test_client, authenticated_user, db_session
+):
+    items = await add_items(db_session, authenticated_user["user"], 3)
+    stranger = User(id=uuid.uuid4(), email="stranger@example.com", hashed_password="x")
+    db_session.add(stranger)
+    await db_session.commit()
+    (other,) = await add_items(db_session, stranger, 1)
+
+    response = await test_client.post(
+        "/items/bulk-delete",
+        json={"ids": [str(items[0].id), str(items[1].id), str(other.id)]},
+        headers=authenticated_user["headers"],
+    )
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == {"count": 2, "missing": [str(other.id)]}
+    remaining = (await db_session.execute(select(Item.id))).scalars().all()
+    assert set(remaining) == {items[2].id, other.id}
+
+
+@pytest.mark.asyncio(loop_scope="function")
+async def test_delete_item(test_client, authenticated_user, db_session):
+    items = await add_items(db_session, authenticated_user["user"], 1)
+
+    response = await test_client.delete(
+        f"/items/{items[0].id}", headers=authenticated_user["headers"]
+    )
+    assert response.status_code == status.HTTP_200_OK
+
+    response = await test_client.delete(
+        f"/items/{items[0].id}", headers=authenticated_user["headers"]
+    )
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.asyncio
+async def test_insert_items_uses_copy_on_postgres(mocker):
+    copy = mocker.patch("app.routes.items.copy_items", new=mocker.AsyncMock())
+    mocker.patch("app.routes.items.settings.ITEMS_COPY_THRESHOLD", 2)
+    session = mocker.AsyncMock()
+    connection = session.connection.return_value
+    connection.dialect.name = "postgresql"
+    connection.dialect.driver = "asyncpg"
+
+    await insert_items(session, [{"name": "a"}])
+    await insert_items(session, [{"name": "a"}, {"name": "b"}])
+
+    assert session.execute.await_count == 1
+    copy.assert_awaited_once_with(session, [{"name": "a"}, {"name": "b"}])
+
+
+@pytest.mark.asyncio(loop_scope="function")
+async def test_deleting_a_user_deletes_their_items(authenticated_user, db_session):
+    user = authenticated_user["user"]
+    await add_items(db_session, user, 5)
+
+    await UserManager(SQLAlchemyUserDatabase(db_session, User)).delete(user)
+
+    assert await db_session.scalar(select(func.count()).select_from(Item)) == 0
+
+
+@pytest.mark.asyncio(loop_scope="function")
+async def test_listings_read_from_a_replica(
+    test_client, authenticated_user, db_session, mocker
+):
+    await add_items(db_session, authenticated_user["user"], 3)
+    # The "replica" is the test database itself, through its own engine
+    replica = create_async_engine(settings.TEST_DATABASE_URL)
+    router = ReplicaRouter(
+        [replica], max_lag=5, check_interval=10, check_timeout=1, sticky_seconds=10
+    )
+    mocker.patch("app.database.replica_router", router)
+
+    response = await test_client.get(
+        "/items/keyset", headers=authenticated_user["headers"]
+    )
+
+    assert response.status_code == status.HTTP_200_OK
+    assert len(response.json()["items"]) == 3
+    # The listing; the user is looked up on the primary
+    assert router.stats()["replica_reads"] == 1
+    await replica.dispose()
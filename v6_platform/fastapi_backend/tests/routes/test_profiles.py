@@ -0,0 +1,105 @@
+import pytest
+from fastapi import status
+
+from app.profiling import profile_store
+
+pytest.importorskip("pyinstrument")
+
+ASSET = {
+    "id": "asset-1",
+    "name": "acme/old",
+    "type": "github_zombie",
+    "url": "https://github.com/acme/old",
+    "description": "Stale.",
+    "detected_at": "2025-01-01T00:00:00",
+}
+
+
+@pytest.fixture
+def profiles(tmp_path, mocker):
+    mocker.patch.object(profile_store, "directory", str(tmp_path))
+    mocker.patch("app.llm.is_configured", return_value=False)
+    return tmp_path
+
+
+@pytest.fixture
+async def superuser(authenticated_user, db_session):
+    authenticated_user["user"].is_superuser = True
+    await db_session.commit()
+    return authenticated_user
+
+
+def analyze(test_client, headers=None, **params):
+    return test_client.post(
+        "/api/analyze/",
+        json={"asset_id": ASSET["id"], "asset_data": ASSET},
+        headers=headers,
+        params=params,
+    )
+
+
+@pytest.mark.asyncio(loop_scope="function")
+async def test_superusers_can_profile_and_download(test_client, superuser, profiles):
+    headers = superuser["headers"]
+
+    response = await analyze(test_client, headers=headers, profile="1")
+
+    assert response.status_code == status.HTTP_200_OK
+    profile_id = response.headers["X-Profile-Id"]
+
+    listing = await test_client.get("/api/profiles/", headers=headers)
+    assert listing.status_code == status.HTTP_200_OK
+    assert [(p["id"], p["request"]) for p in listing.json()] == [
+        (profile_id, "POST /api/analyze/")
+    ]
+
+    html = await test_client.get(f"/api/profiles/{profile_id}", headers=headers)
+    assert html.status_code == status.HTTP_200_OK
+    assert html.headers["Content-Type"].startswith("text/html")
+    assert (
+        html.headers["Content-Disposition"]
+        == f'attachment; filename="{profile_id}.html"'
+    )
+
+    speedscope = await test_client.get(
+        f"/api/profiles/{profile_id}",
+        params={"format": "speedscope"},
+        headers=headers,
+    )
+    assert speedscope.json()["$schema"].startswith("https://www.speedscope.app")
+
+
+@pytest.mark.asyncio(loop_scope="function")
+async def test_unflagged_requests_are_not_profiled(test_client, superuser, profiles):
+    response = await analyze(test_client, headers=superuser["headers"])
+
+    assert response.status_code == status.HTTP_200_OK
+    assert "X-Profile-Id" not in response.headers
+    assert list(profiles.iterdir()) == []
+
+
+@pytest.mark.asyncio(loop_scope="function")
+async def test_only_superusers_may_profile(test_client, authenticated_user, profiles):
+    anonymous = await analyze(test_client, profile="1")
+    user = await test_client.post(
+        "/api/scan/",
+        json={"target_url": "https://github.com/acme", "scan_type": "github"},
+        headers={**authenticated_user["headers"], "X-Profile": "1"},
+    )
+    listing = await test_client.get(
+        "/api/profiles/", headers=authenticated_user["headers"]
+    )
+
+    assert anonymous.status_code == status.HTTP_403_FORBIDDEN
+    assert user.status_code == status.HTTP_403_FORBIDDEN
+    assert listing.status_code == status.HTTP_403_FORBIDDEN
+    assert list(profiles.iterdir()) == []
+
+
+@pytest.mark.asyncio(loop_scope="function")
+async def test_unknown_profiles_are_not_found(test_client, superuser, profiles):
+    response = await test_client.get(
+        "/api/profiles/0123456789abcdef0123456789abcdef", headers=superuser["headers"]
+    )
+
+    assert response.status_code == status.HTTP_404_NOT_FOUND
@@ -0,0 +1,218 @@
+import asyncio
+import json
+import time
+
+import pytest
+from fastapi import status
+
+from app.rate_limit import Limit, rate_limiter
+from app.routes.scan import build_asset
+from app.schemas import AnalysisResult
+from app.valuation_cache import CacheStats
+
+
+@pytest.mark.asyncio(loop_scope="function")
+async def test_trigger_scan_returns_stable_ids(test_client, mocker):
+    mocker.patch(
+        "app.routes.scan.scan_github_zombies",
+        side_effect=lambda url: [
+            build_asset(
+                "github_zombie", "acme/old (stale fork)", f"{url}/old", "Stale."
+            ),
+        ],
+    )
+    mocker.patch(
+        "app.routes.scan.scan_chrome_ghosts",
+        side_effect=lambda url: [
+            build_asset("chrome_ghost", "Hidden API: /api", f"{url}/api", "Hidden."),
+            build_asset("chrome_ghost", "Hidden API: /api", f"{url}/api/", "Hidden."),
+        ],
+    )
+    json = {"target_url": "https://github.com/acme", "scan_type": "all"}
+
+    first = await test_client.post("/api/scan/", json=json)
+    second = await test_client.post("/api/scan/", json=json)
+
+    assert first.status_code == status.HTTP_200_OK
+    assert first.json()["total_found"] == 2
+    assert [asset["id"] for asset in first.json()["assets"]] == [
+        asset["id"] for asset in second.json()["assets"]
+    ]
+
+
+@pytest.mark.asyncio(loop_scope="function")
+async def test_trigger_scan_reports_urls_with_bad_ports_as_inaccessible(test_client):
+    response = await test_client.post(
+        "/api/scan/",
+        json={"target_url": "http://example.com:99999/", "scan_type": "chrome"},
+    )
+
+    assert response.status_code == status.HTTP_200_OK
+    (asset,) = response.json()["assets"]
+    assert asset["name"] == "Inaccessible: http://example.com:99999/"
+    assert asset["status"] == "error"
+
+
+def parse_events(body):
+    events = []
+    for block in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+def slow_scanner(asset_type, names, delay):
+    def scan(url):
+        for name in names:
+            time.sleep(delay)
+            yield build_asset(asset_type, name, f"{url}/{name}", "Stale.")
+
+    return scan
+
+
+@pytest.fixture
+def slow_gemini(mocker):
+    mocker.patch("app.llm.is_configured", return_value=True)
+    mocker.patch("app.valuation_cache.stats", CacheStats())
+
+    async def analyze(asset):
+        await asyncio.sleep(0.05)
+        return AnalysisResult(valuation="$1k", reasoning="r", details=asset.name)
+
+    return mocker.patch("app.valuation.analyze", side_effect=analyze)
+
+
+@pytest.mark.asyncio(loop_scope="function")
+async def test_pipeline_values_assets_while_scanning(test_client, slow_gemini, mocker):
+    mocker.patch(
+        "app.routes.scan.iter_github_zombies",
+        slow_scanner("github_zombie", ["a", "b", "c", "a"], 0.05),
+    )
+    mocker.patch(
+        "app.routes.scan.iter_chrome_ghosts",
+        slow_scanner("chrome_ghost", ["x"], 0.01),
+    )
+
+    response = await test_client.post(
+        "/api/scan/pipeline",
+        json={"target_url": "https://github.com/acme", "scan_type": "all"},
+    )
+
+    assert response.status_code == status.HTTP_200_OK
+    events = parse_events(response.text)
+    kinds = [kind for kind, _ in events]
+    assert kinds.count("asset") == 4
+    assert kinds.count("valuation") == 4
+    assert events[-1] == ("done", {"total_found": 4})
+    # Valuation started before the scan finished
+    assert kinds.index("valuation") < max(
+        index for index, kind in enumerate(kinds) if kind == "asset"
+    )
+    assets = {data["id"]: data["name"] for kind, data in events if kind == "asset"}
+    valued = {
+        data["asset_id"]: data["result"]["details"]
+        for kind, data in events
+        if kind == "valuation"
+    }
+    assert valued == assets
+
+
+@pytest.mark.asyncio(loop_scope="function")
+async def test_pipeline_reports_failed_valuations_and_scans(
+    test_client, slow_gemini, mocker
+):
+    def broken_scan(url):
+        raise RuntimeError("boom")
+        yield
+
+    slow_gemini.side_effect = RuntimeError("quota exceeded")
+    mocker.patch(
+        "app.routes.scan.iter_github_zombies",
+        slow_scanner("github_zombie", ["a"], 0),
+    )
+    mocker.patch("app.routes.scan.iter_chrome_ghosts", broken_scan)
+
+    response = await test_client.post(
+        "/api/scan/pipeline",
+        json={"target_url": "https://github.com/acme", "scan_type": "all"},
+    )
+
+    events = dict(parse_events(response.text))
+    assert events["valuation"]["error"] == "Analysis failed: quota exceeded"
+    assert events["error"] == {"detail": "Scan failed: boom"}
+    assert events["done"] == {"total_found": 1}
+
+
+@pytest.mark.asyncio(loop_scope="function")
+async def test_scans_are_rate_limited_per_caller(
+    test_client, authenticated_user, mocker
+):
+    mocker.patch("app.routes.scan.scan_github_zombies", return_value=[])
+    mocker.patch.object(rate_limiter, "limits", {"scan": Limit(rate=1 / 60, burst=1)})
+    json = {"target_url": "https://github.com/acme", "scan_type": "github"}
+
+    first = await test_client.post("/api/scan/", json=json)
+    second = await test_client.post("/api/scan/", json=json)
+    # Signed-in users have a bucket of their own
+    signed_in = await test_client.post(
+        "/api/scan/", json=json, headers=authenticated_user["headers"]
+    )
+
+    assert first.status_code == status.HTTP_200_OK
+    assert second.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+    assert second.headers["Retry-After"] == "60"
+    assert signed_in.status_code == status.HTTP_200_OK
+
+
+@pytest.mark.asyncio(loop_scope="function")
+async def test_pipeline_stops_valuing_once_the_analyze_bucket_is_empty(
+    test_client, slow_gemini, mocker
+):
+    mocker.patch(
+        "app.routes.scan.iter_github_zombies",
+        slow_scanner("github_zombie", ["a", "b", "c"], 0),
+    )
+    mocker.patch.object(
+        rate_limiter,
+        "limits",
+        {"scan": Limit(rate=1, burst=1), "analyze": Limit(rate=1 / 60, burst=2)},
+    )
+
+    response = await test_client.post(
+        "/api/scan/pipeline",
+        json={"target_url": "https://github.com/acme", "scan_type": "github"},
+    )
+
+    valuations = [
+        data for kind, data in parse_events(response.text) if kind == "valuation"
+    ]
+    assert slow_gemini.call_count == 2
+    assert [item.get("error") for item in valuations].count(
+        "Rate limit exceeded; retry in 60 seconds."
+    ) == 1
+
+
+@pytest.mark.asyncio(loop_scope="function")
+async def test_trigger_scan_keeps_the_event_loop_responsive(test_client, mocker):
+    def slow_scan(url):
+        time.sleep(0.2)
+        return []
+
+    mocker.patch("app.routes.scan.scan_github_zombies", side_effect=slow_scan)
+    ticks = 0
+
+    async def tick():
+        nonlocal ticks
+        while True:
+            await asyncio.sleep(0.01)
+            ticks += 1
+
+    ticker = asyncio.create_task(tick())
+    response = await test_client.post(
+        "/api/scan/",
+        json={"target_url": "https://github.com/acme", "scan_type": "github"},
+    )
+    ticker.cancel()
+
+    assert response.status_code == status.HTTP_200_OK
+    assert ticks >= 5
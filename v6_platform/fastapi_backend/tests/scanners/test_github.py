@@ -0,0 +1,163 @@
+import datetime
+
+import pytest
+
+from app.routes.scan import scan_github_zombies
+from app.scanners.github import (
+    GitHubClient,
+    GitHubRateLimitError,
+    MetadataCache,
+    iter_zombies,
+    parse_github_target,
+)
+from benchmarks.stubs.github import FakeGitHub, make_organization, make_repository
+
+NOW = datetime.datetime.now(datetime.timezone.utc)
+OLD = NOW - datetime.timedelta(days=800)
+TOKEN = "test-token"
+
+
+@pytest.fixture
+def organization():
+    return [
+        make_repository("acme", "fresh", NOW),
+        make_repository("acme", "old-fork", OLD, is_fork=True),
+        make_repository("acme", "behind-fork", OLD, is_fork=True),
+        make_repository("acme", "museum", OLD, is_archived=True),
+        make_repository("acme", "branches", NOW, branches={"main": NOW, "v1": OLD}),
+        make_repository(
+            "acme",
+            "deps",
+            NOW,
+            package_json={"dependencies": {"request": "^2.88.0", "react": "^18"}},
+            requirements="fastapi==0.115.0\nPyCrypto>=2.6  # legacy\n",
+            forks={"someone/deps": OLD},
+        ),
+    ]
+
+
+@pytest.mark.parametrize(
+    "url, expected",
+    [
+        ("https://github.com/acme", ("acme", None)),
+        ("https://github.com/orgs/acme", ("acme", None)),
+        ("https://github.com/acme/widget.git", ("acme", "widget")),
+        ("github.com/acme/widget/tree/main", ("acme", "widget")),
+        ("https://example.com/acme", None),
+        ("https://github.com/", None),
+    ],
+)
+def test_parse_github_target(url, expected):
+    assert parse_github_target(url) == expected
+
+
+def test_iter_zombies_detects_organization_zombies(organization):
+    with FakeGitHub({"acme": organization}) as github:
+        client = GitHubClient(api_url=github.url, token=TOKEN, cache=MetadataCache())
+        names = {
+            finding.name for finding in iter_zombies("https://github.com/acme", client)
+        }
+
+    assert names == {
+        "acme/old-fork (stale fork)",
+        "acme/behind-fork (stale fork)",
+        "acme/museum (archived)",
+        "acme/branches@v1",
+        "someone/deps (stale fork)",
+        "request in acme/deps",
+        "pycrypto in acme/deps",
+    }
+
+
+def test_iter_zombies_single_repository(organization):
+    with FakeGitHub({"acme": organization}) as github:
+        client = GitHubClient(api_url=github.url, token=TOKEN, cache=MetadataCache())
+        findings = list(iter_zombies("https://github.com/acme/branches", client))
+
+        assert github.rest_calls == 0
+        assert github.graphql_calls == 1
+    assert [finding.url for finding in findings] == [
+        "https://github.com/acme/branches/tree/v1"
+    ]
+
+
+def test_iter_zombies_without_token_uses_rest(mocker, organization):
+    mocker.patch("app.scanners.github.settings.GITHUB_TOKEN", None)
+    with FakeGitHub({"acme": organization}) as github:
+        client = GitHubClient(api_url=github.url, cache=MetadataCache())
+        names = {
+            finding.name for finding in iter_zombies("https://github.com/acme", client)
+        }
+
+        assert github.graphql_calls == 0
+        assert github.rest_calls == 1 + len(organization)
+    assert names == {
+        "acme/old-fork (stale fork)",
+        "acme/behind-fork (stale fork)",
+        "acme/museum (archived)",
+    }
+
+
+def test_iter_zombies_ignores_other_hosts():
+    assert list(iter_zombies("https://example.com")) == []
+
+
+def test_repositories_are_batched_per_graphql_query():
+    with FakeGitHub({"acme": make_organization("acme", 260)}) as github:
+        client = GitHubClient(
+            api_url=github.url, token=TOKEN, cache=MetadataCache(), batch_size=50
+        )
+        list(iter_zombies("https://github.com/acme", client))
+
+        assert github.rest_calls == 3
+        assert github.graphql_calls == 6
+
+
+def test_rescan_uses_conditional_requests(tmp_path):
+    with FakeGitHub({"acme": make_organization("acme", 150)}) as github:
+        client = GitHubClient(
+            api_url=github.url, token=TOKEN, cache=MetadataCache(str(tmp_path))
+        )
+        first = list(iter_zombies("https://github.com/acme", client))
+        core_after_first_scan = github.remaining["core"]
+
+        # A fresh client sharing the on-disk cache still gets 304s
+        client = GitHubClient(
+            api_url=github.url, token=TOKEN, cache=MetadataCache(str(tmp_path))
+        )
+        second = list(iter_zombies("https://github.com/acme", client))
+
+        assert second == first
+        assert github.not_modified == 2
+        assert client.not_modified == 2
+        assert github.remaining["core"] == core_after_first_scan
+
+
+def test_rate_limit_reserve_is_respected():
+    with FakeGitHub({"acme": make_organization("acme", 100)}, limit=10) as github:
+        client = GitHubClient(
+            api_url=github.url,
+            token=TOKEN,
+            cache=MetadataCache(),
+            batch_size=10,
+            rate_limit_reserve=5,
+        )
+        with pytest.raises(GitHubRateLimitError):
+            list(iter_zombies("https://github.com/acme", client))
+
+
+def test_scan_github_zombies_keeps_partial_results(mocker, organization):
+    with FakeGitHub({"acme": organization}) as github:
+        client = GitHubClient(
+            api_url=github.url,
+            token=TOKEN,
+            cache=MetadataCache(),
+            batch_size=2,
+            rate_limit_reserve=4997,
+        )
+        mocker.patch("app.scanners.github.get_github_client", return_value=client)
+        assets = scan_github_zombies("https://github.com/acme")
+
+    assert [asset.status for asset in assets][-1] == "error"
+    assert any(asset.name == "acme/old-fork (stale fork)" for asset in assets)
+    assert all(asset.type == "github_zombie" for asset in assets)
@@ -0,0 +1,136 @@
+import gzip
+
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse, PlainTextResponse, StreamingResponse
+from httpx import ASGITransport, AsyncClient
+
+from app import compression
+from app.compression import CompressionMiddleware, accepted_encodings, choose_encoding
+
+BIG = "x" * 5000
+
+
+@pytest.fixture
+def client():
+    app = FastAPI(default_response_class=ORJSONResponse)
+    app.add_middleware(CompressionMiddleware, minimum_size=1000)
+
+    @app.get("/big")
+    async def big():
+        return {"data": BIG}
+
+    @app.get("/small")
+    async def small():
+        return {"data": "x"}
+
+    @app.get("/stream")
+    async def stream():
+        async def events():
+            yield "event: token\ndata: " + BIG + "\n\n"
+            yield "event: result\ndata: {}\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    @app.get("/encoded")
+    async def encoded():
+        return PlainTextResponse(BIG, headers={"Content-Encoding": "identity"})
+
+    return AsyncClient(transport=ASGITransport(app=app), base_url="http://test")
+
+
+def test_accepted_encodings():
+    assert accepted_encodings("gzip, br;q=0.5, identity;q=0") == {
+        "gzip": 1.0,
+        "br": 0.5,
+        "identity": 0.0,
+    }
+    assert accepted_encodings("") == {}
+
+
+def test_choose_encoding(mocker):
+    mocker.patch.object(compression, "brotli", object())
+    assert choose_encoding("gzip, deflate, br") == "br"
+    assert choose_encoding("gzip, br;q=0") == "gzip"
+    assert choose_encoding("*") == "br"
+    assert choose_encoding("deflate") is None
+    assert choose_encoding("") is None
+
+    mocker.patch.object(compression, "brotli", None)
+    assert choose_encoding("br, gzip") == "gzip"
+    assert choose_encoding("br") is None
+
+
+@pytest.mark.asyncio
+async def test_large_responses_are_gzipped(client):
+    response = await client.get("/big", headers={"Accept-Encoding": "gzip"})
+
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert response.headers["Vary"] == "Accept-Encoding"
+    assert int(response.headers["Content-Length"]) < len(BIG)
+    assert response.json() == {"data": BIG}
+
+
+@pytest.mark.asyncio
+async def test_large_responses_are_compressed_off_the_loop(client, mocker):
+    mocker.patch.object(compression, "THREAD_THRESHOLD", 1000)
+    to_thread = mocker.patch(
+        "app.compression.asyncio.to_thread",
+        side_effect=lambda function, *args: function(*args),
+    )
+
+    response = await client.get("/big", headers={"Accept-Encoding": "gzip"})
+
+    assert response.json() == {"data": BIG}
+    to_thread.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_brotli(client):
+    pytest.importorskip("brotli")
+
+    response = await client.get("/big", headers={"Accept-Encoding": "br"})
+
+    assert response.headers["Content-Encoding"] == "br"
+    assert response.json() == {"data": BIG}
+
+
+@pytest.mark.asyncio
+async def test_small_responses_are_not_compressed(client):
+    response = await client.get("/small", headers={"Accept-Encoding": "gzip"})
+
+    assert "Content-Encoding" not in response.headers
+    assert response.json() == {"data": "x"}
+
+
+@pytest.mark.asyncio
+async def test_streams_are_not_compressed(client):
+    async with client.stream(
+        "GET", "/stream", headers={"Accept-Encoding": "gzip"}
+    ) as response:
+        raw = b"".join([chunk async for chunk in response.aiter_raw()])
+
+    assert "Content-Encoding" not in response.headers
+    assert raw.startswith(b"event: token")
+
+
+@pytest.mark.asyncio
+async def test_encoded_responses_are_left_alone(client):
+    response = await client.get("/encoded", headers={"Accept-Encoding": "gzip"})
+
+    assert response.headers["Content-Encoding"] == "identity"
+    assert response.text == BIG
+
+
+@pytest.mark.asyncio
+async def test_without_accept_encoding_nothing_is_compressed(client):
+    response = await client.get("/big", headers={"Accept-Encoding": "identity"})
+
+    assert "Content-Encoding" not in response.headers
+    assert response.json() == {"data": BIG}
+
+
+def test_gzip_level_is_applied():
+    middleware = CompressionMiddleware(None, gzip_level=1)
+
+    assert gzip.decompress(middleware.compress(BIG.encode(), "gzip")) == BIG.encode()
@@ -1,10 +1,15 @@
 import pytest
-from sqlalchemy.ext.asyncio import AsyncSession, AsyncEngine
+from fastapi import Request
+from sqlalchemy import NullPool, text
+from sqlalchemy.ext.asyncio import AsyncSession, AsyncEngine, create_async_engine
 from fastapi_users.db import SQLAlchemyUserDatabase
 
 from app.database import (
+    InstrumentedQueuePool,
+    PoolStats,
     async_session_maker,
     create_db_and_tables,
+    engine_options,
     get_async_session,
     get_user_db,
 )
@@ -62,7 +67,7 @@ async def test_create_db_and_tables(mock_engine, mocker):
 @pytest.mark.asyncio
 async def test_get_async_session(mock_session):
     # Test the session generator
-    session_generator = get_async_session()
+    session_generator = get_async_session(Request({"type": "http", "headers": []}))
     session = await session_generator.__anext__()
 
     # Verify we got the mock session
@@ -106,3 +111,47 @@ async def test_session_maker_configuration():
     # Create a test session
     async with async_session_maker() as session:
         assert isinstance(session, AsyncSession)
+
+
+def test_engine_options_per_pool_mode(mocker):
+    mock_settings = mocker.patch("app.database.settings")
+    mock_settings.DB_POOL_SIZE = 3
+    mock_settings.DB_MAX_OVERFLOW = 2
+
+    mock_settings.DB_POOL_MODE = "null"
+    assert engine_options() == {"poolclass": NullPool}
+
+    mock_settings.DB_POOL_MODE = "queue"
+    options = engine_options()
+    assert options["poolclass"] is InstrumentedQueuePool
+    assert (options["pool_size"], options["max_overflow"]) == (3, 2)
+    assert "connect_args" not in options
+
+    mock_settings.DB_POOL_MODE = "pgbouncer"
+    connect_args = engine_options()["connect_args"]
+    assert connect_args["statement_cache_size"] == 0
+    assert connect_args["prepared_statement_cache_size"] == 0
+    assert connect_args["prepared_statement_name_func"]() != (
+        connect_args["prepared_statement_name_func"]()
+    )
+
+
+@pytest.mark.asyncio
+async def test_instrumented_pool_reuses_and_times_connections(mocker, tmp_path):
+    stats = PoolStats()
+    mocker.patch("app.database.pool_stats", stats)
+    engine = create_async_engine(
+        f"sqlite+aiosqlite:///{tmp_path}/pool.db",
+        poolclass=InstrumentedQueuePool,
+        pool_size=2,
+        max_overflow=0,
+    )
+
+    for _ in range(5):
+        async with engine.connect() as conn:
+            await conn.execute(text("select 1"))
+    await engine.dispose()
+
+    assert stats.checkouts == 5
+    assert stats.connects == 1
+    assert stats.checkout_seconds_max > 0
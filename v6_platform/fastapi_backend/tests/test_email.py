@@ -1,7 +1,16 @@
-import pytest
+import asyncio
 from pathlib import Path
-from fastapi_mail import ConnectionConfig, MessageSchema
-from app.email import get_email_config, send_reset_password_email
+
+import aiosmtplib
+import pytest
+from fastapi_mail import ConnectionConfig, MessageSchema, MessageType
+
+from app.email import (
+    MailQueue,
+    get_email_config,
+    is_permanent,
+    send_reset_password_email,
+)
 from app.models import User
 
 
@@ -31,6 +40,71 @@ def mock_user():
     )
 
 
+TEMPLATE = "password_reset.html"
+
+
+def make_config(port=1025):
+    return ConnectionConfig(
+        MAIL_USERNAME="",
+        MAIL_PASSWORD="",
+        MAIL_FROM="sender@example.com",
+        MAIL_PORT=port,
+        MAIL_SERVER="127.0.0.1",
+        MAIL_FROM_NAME="Sender",
+        MAIL_STARTTLS=False,
+        MAIL_SSL_TLS=False,
+        USE_CREDENTIALS=False,
+        TEMPLATE_FOLDER=Path(__file__).parent.parent / "app" / "email_templates",
+    )
+
+
+def make_queue(port=1025, **kwargs):
+    options = dict(
+        maxsize=100,
+        session_messages=100,
+        max_retries=2,
+        retry_base_delay=0,
+        idle_timeout=5,
+    )
+    options.update(kwargs)
+    return MailQueue(config_factory=lambda: make_config(port), **options)
+
+
+def make_message(recipient="user@example.com"):
+    return MessageSchema(
+        subject="Hello",
+        recipients=[recipient],
+        template_body={"username": recipient, "link": "http://link"},
+        subtype=MessageType.html,
+    )
+
+
+@pytest.fixture
+def smtp(mocker):
+    """Replaces aiosmtplib.SMTP; ``smtp.instances`` holds every session opened."""
+    instances = []
+
+    def make_session(**kwargs):
+        session = mocker.MagicMock()
+        session.is_connected = False
+
+        async def connect():
+            session.is_connected = True
+
+        async def quit():
+            session.is_connected = False
+
+        session.connect = mocker.AsyncMock(side_effect=connect)
+        session.quit = mocker.AsyncMock(side_effect=quit)
+        session.send_message = mocker.AsyncMock()
+        instances.append(session)
+        return session
+
+    mock = mocker.patch("app.email.aiosmtplib.SMTP", side_effect=make_session)
+    mock.instances = instances
+    return mock
+
+
 def test_get_email_config(mock_settings):
     config = get_email_config()
 
@@ -50,10 +124,7 @@ def test_get_email_config(mock_settings):
 
 @pytest.mark.asyncio
 async def test_send_reset_password_email(mock_settings, mock_user, mocker):
-    # Mock FastMail
-    mock_fastmail = mocker.patch("app.email.FastMail")
-    mock_fastmail_instance = mock_fastmail.return_value
-    mock_fastmail_instance.send_message = mocker.AsyncMock()
+    send = mocker.patch("app.email.mail_queue.send", new=mocker.AsyncMock())
 
     # Test data
     test_token = "test-token-123"
@@ -61,16 +132,9 @@ async def test_send_reset_password_email(mock_settings, mock_user, mocker):
     # Call the function
     await send_reset_password_email(mock_user, test_token)
 
-    # Verify FastMail was instantiated with correct config
-    mock_fastmail.assert_called_once()
-    config_arg = mock_fastmail.call_args[0][0]
-    assert isinstance(config_arg, ConnectionConfig)
-
-    # Verify send_message was called
-    mock_fastmail_instance.send_message.assert_called_once()
-
-    # Verify the message schema
-    message_arg = mock_fastmail_instance.send_message.call_args[0][0]
+    # Verify the message was queued rather than sent inline
+    send.assert_called_once()
+    message_arg, template_name = send.call_args[0]
     assert isinstance(message_arg, MessageSchema)
     assert message_arg.subject == "Password recovery"
     assert message_arg.recipients == [mock_user.email]
@@ -85,5 +149,185 @@ async def test_send_reset_password_email(mock_settings, mock_user, mocker):
     }
 
     # Verify template name
-    template_name = mock_fastmail_instance.send_message.call_args[1]["template_name"]
     assert template_name == "password_reset.html"
+
+
+def test_build_message_renders_template():
+    queue = make_queue()
+
+    message = queue.build_message(make_message(), TEMPLATE)
+
+    assert message["To"] == "user@example.com"
+    assert message["From"] == "Sender <sender@example.com>"
+    assert message["Subject"] == "Hello"
+    assert message["Message-ID"]
+    assert message.get_content_type() == "text/html"
+    assert "http://link" in message.get_content()
+
+
+@pytest.mark.asyncio
+async def test_queue_reuses_one_session(smtp):
+    queue = make_queue()
+
+    for i in range(5):
+        await queue.send(make_message(f"user{i}@example.com"), TEMPLATE)
+    await queue.flush()
+
+    assert len(smtp.instances) == 1
+    assert smtp.instances[0].send_message.call_count == 5
+    assert queue.stats()["sent"] == 5
+    assert queue.stats()["sessions"] == 1
+    assert queue.stats()["connected"]
+    await queue.close()
+    smtp.instances[0].quit.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_queue_reconnects_after_session_messages(smtp):
+    queue = make_queue(session_messages=2)
+
+    for i in range(5):
+        await queue.send(make_message(f"user{i}@example.com"), TEMPLATE)
+    await queue.flush()
+    await queue.close()
+
+    assert [s.send_message.call_count for s in smtp.instances] == [2, 2, 1]
+    assert queue.stats()["sessions"] == 3
+
+
+@pytest.mark.asyncio
+async def test_queue_closes_idle_session(smtp):
+    queue = make_queue(idle_timeout=0.01)
+
+    await queue.send(make_message(), TEMPLATE)
+    await queue.flush()
+    await asyncio.sleep(0.05)
+
+    smtp.instances[0].quit.assert_called_once()
+    assert not queue.stats()["connected"]
+    await queue.close()
+
+
+@pytest.mark.asyncio
+async def test_queue_retries_transient_failures(smtp, mocker):
+    sleep = mocker.patch("app.email.asyncio.sleep", new=mocker.AsyncMock())
+    queue = make_queue(retry_base_delay=1.0)
+    failures = [aiosmtplib.SMTPServerDisconnected("gone"), OSError("refused")]
+
+    async def flaky_connect():
+        if failures:
+            raise failures.pop(0)
+
+    smtp.side_effect = None
+    session = smtp.return_value
+    session.is_connected = True
+    session.connect = mocker.AsyncMock(side_effect=flaky_connect)
+    session.quit = mocker.AsyncMock()
+    session.send_message = mocker.AsyncMock()
+
+    await queue.send(make_message(), TEMPLATE)
+    await queue.flush()
+    await queue.close()
+
+    assert queue.stats()["sent"] == 1
+    assert queue.stats()["retried"] == 2
+    assert sleep.await_count == 2
+    # Full jitter: the nth delay is at most base * 2 ** (n - 1)
+    assert sleep.await_args_list[0].args[0] <= 1.0
+    assert sleep.await_args_list[1].args[0] <= 2.0
+
+
+@pytest.mark.asyncio
+async def test_queue_gives_up_after_max_retries(smtp, mocker):
+    mocker.patch("app.email.asyncio.sleep", new=mocker.AsyncMock())
+    smtp.side_effect = None
+    smtp.return_value.connect = mocker.AsyncMock(side_effect=OSError("refused"))
+    queue = make_queue(max_retries=2)
+
+    await queue.send(make_message(), TEMPLATE)
+    await queue.send(make_message("other@example.com"), TEMPLATE)
+    await queue.flush()
+    await queue.close()
+
+    assert smtp.return_value.connect.await_count == 6
+    assert queue.stats()["failed"] == 2
+    assert queue.stats()["sent"] == 0
+
+
+@pytest.mark.asyncio
+async def test_queue_does_not_retry_rejected_mail(smtp):
+    queue = make_queue()
+    await queue.send(make_message(), TEMPLATE)
+    await queue.flush()
+    session = smtp.instances[0]
+    session.send_message.side_effect = aiosmtplib.SMTPRecipientsRefused([])
+
+    await queue.send(make_message("bounce@example.com"), TEMPLATE)
+    await queue.flush()
+    await queue.close()
+
+    assert session.send_message.call_count == 2
+    assert queue.stats()["failed"] == 1
+    assert queue.stats()["retried"] == 0
+    assert queue.stats()["sessions"] == 1
+
+
+@pytest.mark.asyncio
+async def test_queue_drops_messages_when_full(smtp, mocker):
+    queue = make_queue(maxsize=1)
+    blocked = asyncio.Event()
+    smtp.side_effect = None
+    smtp.return_value.connect = mocker.AsyncMock(side_effect=blocked.wait)
+
+    await queue.send(make_message(), TEMPLATE)
+    await asyncio.sleep(0)
+    for _ in range(2):
+        await queue.send(make_message(), TEMPLATE)
+
+    # One message is being delivered, one waits and one did not fit
+    assert queue.stats()["pending"] == 1
+    assert queue.stats()["dropped"] == 1
+    await queue.close(timeout=0)
+
+
+def test_is_permanent():
+    assert is_permanent(aiosmtplib.SMTPRecipientsRefused([]))
+    assert is_permanent(aiosmtplib.SMTPResponseException(550, "no such user"))
+    assert not is_permanent(aiosmtplib.SMTPResponseException(421, "try later"))
+    assert not is_permanent(aiosmtplib.SMTPServerDisconnected("gone"))
+    assert not is_permanent(OSError("refused"))
+
+
+@pytest.mark.asyncio
+async def test_queue_delivers_to_smtp_server(unused_tcp_port):
+    aiosmtpd_controller = pytest.importorskip("aiosmtpd.controller")
+    aiosmtpd_handlers = pytest.importorskip("aiosmtpd.handlers")
+    handler = aiosmtpd_handlers.Sink()
+    received = []
+
+    async def handle_DATA(server, session, envelope):
+        received.append((session.peer, envelope.rcpt_tos))
+        return "250 OK"
+
+    handler.handle_DATA = handle_DATA
+    controller = aiosmtpd_controller.Controller(
+        handler, hostname="127.0.0.1", port=unused_tcp_port
+    )
+    controller.start()
+    try:
+        queue = make_queue(port=unused_tcp_port)
+        for i in range(3):
+            await queue.send(make_message(f"user{i}@example.com"), TEMPLATE)
+        await queue.flush()
+        await queue.close()
+    finally:
+        controller.stop()
+
+    assert [rcpt for _, rcpt in received] == [
+        ["user0@example.com"],
+        ["user1@example.com"],
+        ["user2@example.com"],
+    ]
+    # All three went over a single connection
+    assert len({peer for peer, _ in received}) == 1
+    assert queue.stats()["sessions"] == 1
@@ -0,0 +1,105 @@
+import asyncio
+import hashlib
+import inspect
+import threading
+import time
+
+import pytest
+from fastapi import status
+from fastapi_users import BaseUserManager
+
+from app.hashing import PasswordHasher
+
+
+class SlowHelper:
+    def __init__(self):
+        self.threads = set()
+
+    def hash(self, password):
+        self.threads.add(threading.current_thread().name)
+        time.sleep(0.02)
+        return f"hashed:{password}"
+
+    def verify_and_update(self, plain_password, hashed_password):
+        return hashed_password == f"hashed:{plain_password}", None
+
+
+@pytest.mark.asyncio
+async def test_hashing_runs_off_the_event_loop_with_a_cap():
+    helper = SlowHelper()
+    hasher = PasswordHasher(workers=2, helper=helper)
+    ticks = 0
+
+    async def ticker():
+        nonlocal ticks
+        while True:
+            ticks += 1
+            await asyncio.sleep(0.005)
+
+    task = asyncio.create_task(ticker())
+    hashes = await asyncio.gather(*(hasher.hash(f"p{i}") for i in range(8)))
+    task.cancel()
+
+    assert hashes[3] == "hashed:p3"
+    assert await hasher.verify_and_update("p3", hashes[3]) == (True, None)
+    assert all(name.startswith("password-hash") for name in helper.threads)
+    assert len(helper.threads) == 2
+    # 8 hashes of 20ms on 2 threads take ~80ms, and the loop kept ticking
+    assert ticks >= 5
+    stats = hasher.stats()
+    assert stats["completed"] == 9
+    # At most the two running hashes had left the queue
+    assert 6 <= stats["max_waiting"] <= 8
+    assert stats["max_queue_seconds"] > 0.04
+    assert (stats["waiting"], stats["in_flight"]) == (0, 0)
+
+
+@pytest.mark.asyncio
+async def test_zero_workers_hash_inline():
+    helper = SlowHelper()
+    hasher = PasswordHasher(workers=0, helper=helper)
+
+    assert await hasher.hash("p") == "hashed:p"
+    assert helper.threads == {threading.current_thread().name}
+
+
+@pytest.mark.asyncio(loop_scope="function")
+async def test_login_verifies_on_the_hashing_pool(
+    test_client, authenticated_user, mocker
+):
+    hasher = PasswordHasher(workers=2)
+    mocker.patch("app.users.password_hasher", hasher)
+    credentials = authenticated_user["user_data"]
+
+    response = await test_client.post(
+        "/auth/jwt/login",
+        data={"username": credentials["email"], "password": credentials["password"]},
+    )
+    wrong = await test_client.post(
+        "/auth/jwt/login",
+        data={"username": credentials["email"], "password": "Wrong#Password1"},
+    )
+
+    assert response.status_code == status.HTTP_200_OK
+    assert wrong.status_code == status.HTTP_400_BAD_REQUEST
+    assert hasher.stats()["completed"] == 2
+
+
+# Source fingerprints of the BaseUserManager methods app/users.py copies
+COPIED_METHODS = {
+    "create": "9ea6945bce6ccd45",
+    "authenticate": "d00126280591fe2f",
+    "forgot_password": "5045b21bcee75c1d",
+    "reset_password": "c67e1e47b1766ebd",
+    "_update": "57adcb863cb7f96a",
+}
+
+
+@pytest.mark.parametrize("name", COPIED_METHODS)
+def test_copied_user_manager_methods_match_upstream(name):
+    source = inspect.getsource(getattr(BaseUserManager, name))
+
+    assert hashlib.sha256(source.encode()).hexdigest()[:16] == COPIED_METHODS[name], (
+        f"fastapi-users changed BaseUserManager.{name}: carry the change over "
+        "to UserManager in app/users.py, then update its fingerprint here"
+    )
@@ -0,0 +1,70 @@
+import logging
+
+import pytest
+
+from app import heuristics
+from app.schemas import Asset
+
+
+def make_asset(**fields):
+    return Asset(
+        **{
+            "id": "asset-1",
+            "name": "acme/old (stale fork)",
+            "type": "github_zombie",
+            "url": "https://github.com/acme/old",
+            "description": "Stale fork of acme/new, last pushed 2019-01-01.",
+            "detected_at": "2025-01-01T00:00:00",
+            "status": "investigate",
+            **fields,
+        }
+    )
+
+
+@pytest.mark.parametrize(
+    "fields, rule",
+    [
+        ({"status": "error", "name": "Inaccessible: https://x.io"}, "unreachable"),
+        ({"name": "GitHub scan incomplete: https://github.com/acme"}, "unreachable"),
+        ({"url": "http://localhost:3000/api"}, "placeholder"),
+        ({"url": "https://shop.example.com/"}, "placeholder"),
+        ({"name": "unknown-dependency-v1"}, "placeholder"),
+        ({"name": "Exposed key: AIza...stuv"}, "exposed_key"),
+        ({"type": "chrome_ghost", "name": "Verified Site: Acme"}, "target_site"),
+        (
+            {"description": "Abandoned branch, last commit 2020-01-01."},
+            "abandoned_branch",
+        ),
+        (
+            {"description": "Deprecated dependency still in use: request."},
+            "deprecated_dependency",
+        ),
+        ({}, None),
+    ],
+)
+def test_evaluate_matches_rules(fields, rule):
+    verdict = heuristics.evaluate(make_asset(**fields))
+
+    assert (verdict.rule if verdict else None) == rule
+
+
+def test_answer_respects_confidence_threshold(mocker):
+    branch = make_asset(description="Abandoned branch, last commit 2020-01-01.")
+
+    assert heuristics.answer(branch) is None
+
+    mocker.patch("app.heuristics.settings.HEURISTIC_CONFIDENCE_THRESHOLD", 0.7)
+    assert heuristics.answer(branch).valuation == "$0 - $1k"
+
+
+def test_answer_logs_decisions(caplog, mocker):
+    mocker.patch("app.heuristics.stats", heuristics.HeuristicStats())
+    caplog.set_level(logging.INFO, logger="app.heuristics")
+
+    result = heuristics.answer(make_asset(status="error"))
+    heuristics.answer(make_asset())
+
+    assert result.valuation == "$0"
+    assert "rule=unreachable confidence=0.99" in caplog.records[0].getMessage()
+    assert "Deferring asset-1 to the LLM" in caplog.records[1].getMessage()
+    assert (heuristics.stats.answered, heuristics.stats.deferred) == (1, 1)
@@ -0,0 +1,48 @@
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+
+# Generous enough for a slow CI runner; a heavy SDK creeping back into the
+# startup path costs well over a second on top of the ~1.5s it takes now
+BUDGET_SECONDS = float(os.environ.get("IMPORT_TIME_BUDGET_SECONDS", "3.0"))
+
+# Loaded by the routes on first use only
+DEFERRED_MODULES = ["google.generativeai", "google.api_core", "requests", "bs4"]
+
+IMPORT_APP = """
+import json, sys, time
+start = time.perf_counter()
+import api.index
+elapsed = time.perf_counter() - start
+print(json.dumps({"seconds": elapsed, "modules": sorted(sys.modules)}))
+"""
+
+
+def import_app() -> dict:
+    # A fresh interpreter, as on a serverless cold start
+    result = subprocess.run(
+        [sys.executable, "-c", IMPORT_APP],
+        cwd=BACKEND_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(result.stdout.splitlines()[-1])
+
+
+def test_app_import_defers_heavy_dependencies():
+    report = import_app()
+
+    loaded = [name for name in DEFERRED_MODULES if name in report["modules"]]
+    assert loaded == []
+
+
+def test_app_import_is_within_budget():
+    # Best of two, so a one-off hiccup on a busy machine does not fail the run
+    seconds = min(import_app()["seconds"] for _ in range(2))
+
+    assert seconds < BUDGET_SECONDS
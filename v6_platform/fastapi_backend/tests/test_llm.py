@@ -0,0 +1,125 @@
+import asyncio
+
+import pytest
+from google.api_core import exceptions as google_exceptions
+
+from app import llm
+from app.llm import GeminiGate
+from app.resilience import CircuitBreaker, ResilientCaller
+
+
+@pytest.fixture
+def slow_model(mocker):
+    model = mocker.Mock()
+
+    async def generate_content_async(prompt, **kwargs):
+        await asyncio.sleep(0.05)
+        return mocker.Mock(text=f"answer to {prompt}")
+
+    model.generate_content_async = generate_content_async
+    mocker.patch("app.llm.get_model", return_value=model)
+    return model
+
+
+@pytest.mark.asyncio
+async def test_gate_limits_concurrency():
+    gate = GeminiGate(limit=2)
+    peak = 0
+
+    async def call():
+        nonlocal peak
+        async with gate.slot():
+            peak = max(peak, gate.in_flight)
+            await asyncio.sleep(0.01)
+
+    await asyncio.gather(*(call() for _ in range(10)))
+
+    stats = gate.stats()
+    assert peak == 2
+    assert stats["completed"] == 10
+    assert stats["max_waiting"] == 8
+    assert stats["waiting"] == 0
+    assert stats["in_flight"] == 0
+
+
+@pytest.mark.asyncio
+async def test_generate_text_does_not_block_event_loop(slow_model, mocker):
+    mocker.patch("app.llm.gate", GeminiGate(limit=20))
+    ticks = 0
+
+    async def ticker():
+        nonlocal ticks
+        while True:
+            ticks += 1
+            await asyncio.sleep(0.005)
+
+    task = asyncio.create_task(ticker())
+    answers = await asyncio.gather(*(llm.generate_text(f"q{i}") for i in range(20)))
+    task.cancel()
+
+    assert answers[3] == "answer to q3"
+    # 20 calls of 50ms ran concurrently and the loop kept ticking meanwhile
+    assert ticks >= 5
+
+
+@pytest.mark.asyncio
+async def test_stream_text_yields_chunks_inside_a_gate_slot(mocker):
+    gate = GeminiGate(limit=1)
+    mocker.patch("app.llm.gate", gate)
+    seen_in_flight = []
+
+    class Chunk:
+        def __init__(self, text):
+            self._text = text
+
+        @property
+        def text(self):
+            if self._text is None:
+                raise ValueError("no text parts")
+            return self._text
+
+    async def chunks():
+        for text in ("Hello", None, " world"):
+            seen_in_flight.append(gate.in_flight)
+            yield Chunk(text)
+
+    async def generate_content_async(prompt, **kwargs):
+        assert kwargs["stream"] is True
+        return chunks()
+
+    model = mocker.Mock()
+    model.generate_content_async = generate_content_async
+    mocker.patch("app.llm.get_model", return_value=model)
+
+    pieces = [piece async for piece in llm.stream_text("q")]
+
+    assert pieces == ["Hello", " world"]
+    assert seen_in_flight == [1, 1, 1]
+    assert gate.stats()["in_flight"] == 0
+
+
+@pytest.mark.asyncio
+async def test_generate_text_retries_transient_gemini_errors(mocker):
+    mocker.patch("app.llm.gate", GeminiGate(limit=2))
+    mocker.patch(
+        "app.llm.upstream",
+        ResilientCaller(
+            deadline=1.0,
+            retries=2,
+            base_delay=0.001,
+            breaker=CircuitBreaker(failure_threshold=5, reset_timeout=10),
+            is_transient=llm.is_transient,
+        ),
+    )
+    model = mocker.Mock()
+    model.generate_content_async = mocker.AsyncMock(
+        side_effect=[
+            google_exceptions.ServiceUnavailable("overloaded"),
+            mocker.Mock(text="answer"),
+        ]
+    )
+    mocker.patch("app.llm.get_model", return_value=model)
+
+    assert await llm.generate_text("q") == "answer"
+    assert model.generate_content_async.call_count == 2
+    assert llm.upstream.retried == 1
@@ -0,0 +1,150 @@
+import pytest
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+
+from app import metrics
+from app.metrics import (
+    Counter,
+    Histogram,
+    Metric,
+    MetricsMiddleware,
+    Registry,
+    observe_upstream,
+    render_stats,
+)
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram("latency_seconds", "Latency.", ["route"], buckets=[0.1, 1])
+    histogram.observe(0.05, "/a")
+    histogram.observe(0.5, "/a")
+    histogram.observe(5, "/a")
+
+    assert histogram.render() == [
+        "# HELP latency_seconds Latency.",
+        "# TYPE latency_seconds histogram",
+        'latency_seconds_bucket{route="/a",le="0.1"} 1',
+        'latency_seconds_bucket{route="/a",le="1.0"} 2',
+        'latency_seconds_bucket{route="/a",le="+Inf"} 3',
+        'latency_seconds_sum{route="/a"} 5.55',
+        'latency_seconds_count{route="/a"} 3',
+    ]
+
+
+def test_label_values_are_escaped():
+    counter = Counter("errors_total", "Errors.", ["message"])
+    counter.inc('a "quoted"\\path\n')
+
+    assert counter.samples() == [r'errors_total{message="a \"quoted\"\\path\n"} 1']
+
+
+def test_metrics_must_implement_samples():
+    class Incomplete(Metric):
+        pass
+
+    with pytest.raises(TypeError):
+        Incomplete("incomplete", "Incomplete.")
+
+
+def test_render_stats():
+    lines = render_stats(
+        "db",
+        {
+            "reads": 3,
+            "healthy": True,
+            "state": "open",
+            "lag_seconds": None,
+            "replicas": [{"url": "replica-1", "lag_seconds": 0.5, "healthy": False}],
+        },
+    )
+
+    assert lines == [
+        "# TYPE db_reads gauge",
+        "db_reads 3",
+        "# TYPE db_healthy gauge",
+        "db_healthy 1",
+        "# TYPE db_state gauge",
+        'db_state{state="open"} 1',
+        "# TYPE db_replicas_lag_seconds gauge",
+        'db_replicas_lag_seconds{url="replica-1"} 0.5',
+        "# TYPE db_replicas_healthy gauge",
+        'db_replicas_healthy{url="replica-1"} 0',
+    ]
+
+
+def test_registry_renders_metrics_and_stats():
+    registry = Registry()
+    registry.register(Counter("scans_total", "Scans.")).inc()
+    registry.register_stats("queue", lambda: {"waiting": 2})
+
+    assert registry.render().splitlines()[2:] == [
+        "scans_total 1",
+        "# TYPE queue_waiting gauge",
+        "queue_waiting 2",
+    ]
+
+
+def test_observe_upstream(mocker):
+    mocker.patch.object(metrics, "upstream_duration", Histogram("d", "D.", ["u", "o"]))
+    mocker.patch.object(metrics, "upstream_errors", Counter("e", "E.", ["u", "o", "x"]))
+
+    with observe_upstream("github", "rest"):
+        pass
+    with pytest.raises(TimeoutError):
+        with observe_upstream("github", "rest"):
+            raise TimeoutError
+
+    assert metrics.upstream_duration.values[("github", "rest")][0][-1] == 0
+    assert sum(metrics.upstream_duration.values[("github", "rest")][0]) == 2
+    assert metrics.upstream_errors.values == {("github", "rest", "TimeoutError"): 1}
+    assert metrics.upstream_in_flight.values[("github",)] == 0
+
+
+@pytest.fixture
+def client(mocker):
+    for name in ["http_requests", "http_request_duration", "http_exceptions"]:
+        metric = getattr(metrics, name)
+        mocker.patch.object(metric, "values", {})
+
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware)
+
+    @app.get("/items/{item_id}")
+    async def read_item(item_id: int):
+        return {"id": item_id}
+
+    @app.get("/broken")
+    async def broken():
+        raise RuntimeError("broken")
+
+    return AsyncClient(
+        transport=ASGITransport(app=app, raise_app_exceptions=False),
+        base_url="http://test",
+    )
+
+
+@pytest.mark.asyncio
+async def test_requests_are_recorded_by_route_template(client):
+    await client.get("/items/1")
+    await client.get("/items/2")
+    await client.get("/items/not-a-number")
+    await client.get("/nowhere")
+
+    assert metrics.http_requests.values == {
+        ("GET", "/items/{item_id}", "200"): 2,
+        ("GET", "/items/{item_id}", "422"): 1,
+        ("GET", "unmatched", "404"): 1,
+    }
+    assert (
+        sum(metrics.http_request_duration.values[("GET", "/items/{item_id}")][0]) == 3
+    )
+    assert metrics.http_requests_in_flight.values[("GET",)] == 0
+
+
+@pytest.mark.asyncio
+async def test_unhandled_exceptions_are_counted(client):
+    response = await client.get("/broken")
+
+    assert response.status_code == 500
+    assert metrics.http_exceptions.values == {("GET", "/broken", "RuntimeError"): 1}
+    assert metrics.http_requests.values == {("GET", "/broken", "500"): 1}
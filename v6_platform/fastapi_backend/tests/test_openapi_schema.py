@@ -0,0 +1,87 @@
+import pytest
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+
+from app import openapi_schema
+from app.openapi_schema import etag_matches, serve_prebuilt_openapi
+
+
+@pytest.fixture
+def artifact(mocker, tmp_path):
+    mocker.patch.object(openapi_schema, "ARTIFACT_PATH", tmp_path / "schema.json")
+    mocker.patch.object(openapi_schema, "FINGERPRINT_PATH", tmp_path / "fingerprint")
+    return openapi_schema.ARTIFACT_PATH
+
+
+@pytest.fixture
+def app():
+    app = FastAPI()
+
+    @app.get("/things")
+    async def things():
+        return []
+
+    serve_prebuilt_openapi(app)
+    return app
+
+
+@pytest.fixture
+def client(app):
+    return AsyncClient(transport=ASGITransport(app=app), base_url="http://test")
+
+
+def test_etag_matches():
+    assert etag_matches('"abc"', '"abc"')
+    assert etag_matches('"xyz", W/"abc"', '"abc"')
+    assert etag_matches("*", '"abc"')
+    assert not etag_matches('"xyz"', '"abc"')
+    assert not etag_matches("", '"abc"')
+
+
+@pytest.mark.asyncio
+async def test_prebuilt_schema_is_served(app, client, artifact, mocker):
+    openapi_schema.write_artifact({"prebuilt": True}, openapi_schema.fingerprint())
+    generate = mocker.patch.object(app, "openapi")
+
+    response = await client.get("/openapi.json")
+
+    assert response.status_code == 200
+    assert response.content == artifact.read_bytes()
+    assert response.json() == {"prebuilt": True}
+    assert response.headers["ETag"]
+    generate.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_stale_schema_is_generated_at_runtime(app, client, artifact):
+    openapi_schema.write_artifact({"prebuilt": True}, "an older build")
+
+    response = await client.get("/openapi.json")
+
+    assert "/things" in response.json()["paths"]
+
+
+@pytest.mark.asyncio
+async def test_missing_schema_is_generated_at_runtime(client, artifact):
+    response = await client.get("/openapi.json")
+
+    assert "/things" in response.json()["paths"]
+
+
+@pytest.mark.asyncio
+async def test_unchanged_schema_is_not_modified(client, artifact):
+    etag = (await client.get("/openapi.json")).headers["ETag"]
+
+    response = await client.get("/openapi.json", headers={"If-None-Match": etag})
+
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["ETag"] == etag
+
+
+@pytest.mark.asyncio
+async def test_docs_still_point_at_the_schema(client, artifact):
+    response = await client.get("/docs")
+
+    assert response.status_code == 200
+    assert "/openapi.json" in response.text
@@ -0,0 +1,98 @@
+import asyncio
+import time
+
+import pytest
+from fastapi import Depends, FastAPI, Request
+from httpx import ASGITransport, AsyncClient
+
+from app.profiling import (
+    Capture,
+    ProfileStore,
+    ProfilingMiddleware,
+    profiling_requested,
+)
+
+pyinstrument = pytest.importorskip("pyinstrument")
+
+
+def scope(path="/api/analyze/", headers=(), query=b""):
+    return {"path": path, "headers": list(headers), "query_string": query}
+
+
+@pytest.mark.parametrize(
+    "request_scope, requested",
+    [
+        (scope(), False),
+        (scope(headers=[(b"x-profile", b"1")]), True),
+        (scope(headers=[(b"x-profile", b"0")]), False),
+        (scope(query=b"refresh=true&profile=true"), True),
+        (scope(query=b"profile=10"), False),
+    ],
+)
+def test_profiling_requested(request_scope, requested):
+    assert profiling_requested(request_scope) is requested
+
+
+def busy():
+    deadline = time.perf_counter() + 0.01
+    while time.perf_counter() < deadline:
+        pass
+
+
+def profile_session(label: str):
+    profiler = pyinstrument.Profiler(interval=0.001)
+    profiler.start()
+    busy()
+    session = profiler.stop()
+    session.target_description = label
+    return session
+
+
+def test_store_keeps_the_newest_profiles(tmp_path):
+    store = ProfileStore(str(tmp_path), max_profiles=2)
+    ids = [f"{i:032x}" for i in range(3)]
+    for profile_id in ids:
+        store.save(profile_id, profile_session(f"POST /api/scan/ #{profile_id}"))
+
+    summaries = store.summaries()
+
+    assert [summary["id"] for summary in summaries] == ids[:0:-1]
+    assert summaries[0]["request"] == f"POST /api/scan/ #{ids[2]}"
+    assert store.load(ids[0]) is None
+    assert "busy" in store.render(ids[2], "text")
+    # Ids never reach the filesystem unchecked
+    assert store.render("../profiles", "html") is None
+
+
+@pytest.fixture
+def profiled_app(tmp_path):
+    app = FastAPI()
+    app.add_middleware(ProfilingMiddleware, store=ProfileStore(str(tmp_path), 10))
+
+    async def authorize(request: Request):
+        capture: Capture = getattr(request.state, "profile", None)
+        if capture is not None:
+            capture.authorized = True
+
+    @app.post("/api/analyze/", dependencies=[Depends(authorize)])
+    async def analyze():
+        await asyncio.sleep(0.01)
+        return {}
+
+    @app.post("/api/other/", dependencies=[Depends(authorize)])
+    async def other():
+        return {}
+
+    return AsyncClient(transport=ASGITransport(app=app), base_url="http://test")
+
+
+@pytest.mark.asyncio
+async def test_middleware_profiles_flagged_requests_only(profiled_app, tmp_path):
+    plain = await profiled_app.post("/api/analyze/")
+    flagged = await profiled_app.post("/api/analyze/", headers={"X-Profile": "1"})
+    elsewhere = await profiled_app.post("/api/other/", params={"profile": "1"})
+
+    assert "X-Profile-Id" not in plain.headers
+    assert "X-Profile-Id" not in elsewhere.headers
+    profile_id = flagged.headers["X-Profile-Id"]
+    assert [path.name for path in tmp_path.iterdir()] == [f"{profile_id}.pyisession"]
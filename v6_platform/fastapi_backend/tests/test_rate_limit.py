@@ -0,0 +1,143 @@
+import asyncio
+
+import pytest
+
+from app.rate_limit import (
+    Backend,
+    DatabaseBackend,
+    Limit,
+    MemoryBackend,
+    RateLimiter,
+)
+
+# One token a second, up to three
+LIMIT = Limit(rate=1.0, burst=3)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.mark.asyncio
+async def test_memory_bucket_allows_bursts_then_refills(clock):
+    backend = MemoryBackend(clock=clock)
+
+    assert [await backend.take("a", LIMIT, 1) for _ in range(4)] == [0, 0, 0, 1.0]
+    clock.now += 0.5
+    assert await backend.take("a", LIMIT, 1) == 0.5
+    clock.now += 0.5
+    assert await backend.take("a", LIMIT, 1) == 0
+    # Other callers have their own buckets
+    assert await backend.take("b", LIMIT, 3) == 0
+
+
+@pytest.mark.asyncio
+async def test_memory_buckets_refill_no_further_than_the_burst(clock):
+    backend = MemoryBackend(clock=clock)
+    await backend.take("a", LIMIT, 3)
+    clock.now += 60
+
+    assert await backend.take("a", LIMIT, 3) == 0
+    assert await backend.take("a", LIMIT, 1) == 1.0
+
+
+@pytest.mark.asyncio
+async def test_memory_backend_forgets_full_buckets(clock):
+    backend = MemoryBackend(max_keys=2, clock=clock)
+    await backend.take("a", LIMIT, 1)
+    await backend.take("b", LIMIT, 3)
+    clock.now += 1
+    await backend.take("c", LIMIT, 1)
+
+    # a has refilled; b still misses two tokens
+    assert backend.stats() == {"buckets": 2}
+    assert await backend.take("b", LIMIT, 3) == 2.0
+
+
+@pytest.mark.asyncio
+async def test_database_bucket_allows_bursts_then_refills(engine, clock):
+    backend = DatabaseBackend(engine, max_idle=3, clock=clock)
+
+    assert [await backend.take("a", LIMIT, 1) for _ in range(4)] == [0, 0, 0, 1.0]
+    clock.now += 0.5
+    assert await backend.take("a", LIMIT, 1) == 0.5
+    clock.now += 60
+    assert await backend.take("a", LIMIT, 3) == 0
+    assert await backend.take("b", LIMIT, 3) == 0
+
+
+@pytest.mark.asyncio
+async def test_database_backend_deletes_idle_buckets(engine, clock):
+    backend = DatabaseBackend(engine, max_idle=3, cleanup_every=3, clock=clock)
+    await backend.take("a", LIMIT, 1)
+    clock.now += 10
+    await backend.take("b", LIMIT, 1)
+    await backend.take("b", LIMIT, 1)
+
+    async with engine.connect() as connection:
+        keys = (
+            await connection.exec_driver_sql("SELECT key FROM rate_limit_buckets")
+        ).scalars()
+        assert list(keys) == ["b"]
+
+
+@pytest.mark.asyncio
+async def test_limiter_never_admits_costs_above_the_burst(clock):
+    limiter = RateLimiter(MemoryBackend(clock=clock), {"analyze": LIMIT})
+
+    assert limiter.max_cost("analyze") == 3
+    assert await limiter.take("analyze", "user:1", cost=50) == 47.0
+    assert await limiter.take("analyze", "user:1", cost=3) == 0
+    assert limiter.stats() == {
+        "backend": "memory",
+        "allowed": 1,
+        "limited": 1,
+        "backend_errors": 0,
+        "buckets": 1,
+    }
+
+
+class BrokenBackend(Backend):
+    async def take(self, key, limit, cost):
+        raise ConnectionError("database is down")
+
+
+class StalledBackend(Backend):
+    async def take(self, key, limit, cost):
+        await asyncio.sleep(10)
+        return 1.0
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("backend", [BrokenBackend(), StalledBackend()])
+async def test_limiter_lets_requests_through_when_the_backend_fails(backend):
+    limiter = RateLimiter(backend, {"scan": LIMIT}, timeout=0.01)
+
+    assert await limiter.take("scan", "ip:127.0.0.1") == 0
+    assert limiter.backend_errors == 1
+
+
+@pytest.mark.asyncio
+async def test_limiter_can_be_disabled(mocker):
+    mocker.patch("app.rate_limit.settings.RATE_LIMIT_ENABLED", False)
+    limiter = RateLimiter(BrokenBackend(), {"scan": LIMIT})
+
+    assert await limiter.take("scan", "ip:127.0.0.1") == 0
+    assert limiter.backend_errors == 0
+
+
+def test_backends_must_implement_take():
+    class Incomplete(Backend):
+        pass
+
+    with pytest.raises(TypeError):
+        Incomplete()
@@ -0,0 +1,113 @@
+import pytest
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.replicas import ReplicaRouter
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+async def replica_engines(tmp_path):
+    engines = [
+        create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/replica{i}.db")
+        for i in range(2)
+    ]
+    yield engines
+    for engine in engines:
+        await engine.dispose()
+
+
+def make_router(engines, clock, **kwargs):
+    options = dict(
+        max_lag=5.0, check_interval=10.0, check_timeout=1.0, sticky_seconds=3.0
+    )
+    options.update(kwargs)
+    return ReplicaRouter(engines, clock=clock, **options)
+
+
+@pytest.mark.asyncio
+async def test_without_replicas_reads_go_to_primary(clock):
+    router = make_router([], clock)
+
+    assert await router.choose("token") is None
+    assert router.stats()["primary_reads"] == 1
+    assert router.stats()["fallbacks"] == 0
+
+
+@pytest.mark.asyncio
+async def test_reads_round_robin_over_healthy_replicas(replica_engines, clock):
+    router = make_router(replica_engines, clock)
+
+    chosen = [await router.choose() for _ in range(4)]
+
+    assert chosen == replica_engines * 2
+    assert router.stats()["replica_reads"] == 4
+    assert [r["reads"] for r in router.stats()["replicas"]] == [2, 2]
+    assert all(r["healthy"] for r in router.stats()["replicas"])
+    # Connection details are not exposed
+    assert "replica0.db" not in str(router.stats())
+
+
+@pytest.mark.asyncio
+async def test_unreachable_replica_is_skipped(replica_engines, clock, tmp_path):
+    broken = create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/missing/db.sqlite")
+    router = make_router([broken, replica_engines[0]], clock)
+
+    chosen = [await router.choose() for _ in range(3)]
+
+    assert chosen == [replica_engines[0]] * 3
+    assert router.stats()["replicas"][0]["healthy"] is False
+    await broken.dispose()
+
+
+@pytest.mark.asyncio
+async def test_lagging_replicas_fall_back_to_primary(replica_engines, clock, mocker):
+    router = make_router(replica_engines, clock)
+    mocker.patch.object(router, "measure_lag", mocker.AsyncMock(return_value=30.0))
+
+    assert await router.choose() is None
+    assert router.stats()["fallbacks"] == 1
+    assert router.stats()["replicas"][0]["lag_seconds"] == 30.0
+
+
+@pytest.mark.asyncio
+async def test_reads_after_a_write_stick_to_primary(replica_engines, clock):
+    router = make_router(replica_engines[:1], clock)
+
+    router.record_write("writer")
+
+    assert await router.choose("writer") is None
+    assert await router.choose("someone else") is replica_engines[0]
+    clock.now += 3.0
+    assert await router.choose("writer") is replica_engines[0]
+    assert router.stats()["sticky_reads"] == 1
+
+
+@pytest.mark.asyncio
+async def test_replicas_are_rechecked_in_the_background(replica_engines, clock, mocker):
+    router = make_router(replica_engines[:1], clock)
+    lag = mocker.AsyncMock(return_value=0.0)
+    mocker.patch.object(router, "measure_lag", lag)
+
+    await router.choose()
+    await router.choose()
+    assert lag.await_count == 1
+
+    # A stale check is refreshed without holding up the read
+    lag.return_value = 60.0
+    clock.now += 10.0
+    assert await router.choose() is replica_engines[0]
+    await router._check
+    assert await router.choose() is None
+    assert lag.await_count == 2
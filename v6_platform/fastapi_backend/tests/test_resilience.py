@@ -0,0 +1,179 @@
+import asyncio
+
+import pytest
+
+from app.resilience import (
+    CircuitBreaker,
+    CircuitOpenError,
+    LatencyTracker,
+    ResilientCaller,
+)
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class Flaky(Exception):
+    pass
+
+
+def make_caller(**kwargs):
+    options = {
+        "deadline": 1.0,
+        "retries": 2,
+        "base_delay": 0.001,
+        "breaker": CircuitBreaker(failure_threshold=3, reset_timeout=10),
+        "hedge_quantile": None,
+        "is_transient": lambda error: isinstance(error, (Flaky, TimeoutError)),
+    }
+    options.update(kwargs)
+    return ResilientCaller(**options)
+
+
+def test_latency_tracker_quantile_needs_enough_samples():
+    tracker = LatencyTracker(window=100, min_samples=10)
+    for i in range(9):
+        tracker.record(i)
+    assert tracker.quantile(0.95) is None
+
+    for i in range(9, 100):
+        tracker.record(i)
+    assert tracker.quantile(0.95) == 95
+
+
+def test_breaker_opens_then_lets_one_probe_through():
+    clock = Clock()
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10, clock=clock)
+
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert not breaker.allow()
+
+    clock.now = 10
+    assert breaker.state == "half_open"
+    assert breaker.allow()
+    assert not breaker.allow()
+
+    breaker.record_failure()
+    assert breaker.state == "open"
+
+    clock.now = 20
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed"
+    assert breaker.consecutive_failures == 0
+
+
+@pytest.mark.asyncio
+async def test_call_retries_transient_failures():
+    caller = make_caller()
+    attempts = []
+
+    async def call():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise Flaky()
+        return "ok"
+
+    assert await caller.call(call) == "ok"
+    assert len(attempts) == 3
+    assert caller.retried == 2
+    assert caller.breaker.consecutive_failures == 0
+
+
+@pytest.mark.asyncio
+async def test_call_does_not_retry_other_errors():
+    caller = make_caller()
+    attempts = []
+
+    async def call():
+        attempts.append(1)
+        raise ValueError("bad request")
+
+    with pytest.raises(ValueError):
+        await caller.call(call)
+    assert len(attempts) == 1
+    assert caller.breaker.consecutive_failures == 0
+
+
+@pytest.mark.asyncio
+async def test_call_gives_up_at_the_deadline():
+    caller = make_caller(deadline=0.05, retries=10)
+
+    async def call():
+        await asyncio.sleep(1)
+
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    with pytest.raises(TimeoutError):
+        await caller.call(call)
+    assert loop.time() - started < 0.5
+    assert caller.timeouts == 1
+
+
+@pytest.mark.asyncio
+async def test_open_breaker_fails_fast():
+    caller = make_caller(retries=0)
+    calls = []
+
+    async def call():
+        calls.append(1)
+        raise Flaky()
+
+    for _ in range(3):
+        with pytest.raises(Flaky):
+            await caller.call(call)
+    with pytest.raises(CircuitOpenError):
+        await caller.call(call)
+
+    assert len(calls) == 3
+    assert caller.rejected == 1
+    assert caller.stats()["state"] == "open"
+
+
+@pytest.mark.asyncio
+async def test_slow_call_is_hedged_and_the_faster_copy_wins():
+    latencies = LatencyTracker(min_samples=1)
+    latencies.record(0.01)
+    caller = make_caller(hedge_quantile=0.95, latencies=latencies)
+    started = []
+    cancelled = []
+
+    async def call():
+        started.append(1)
+        try:
+            # The first attempt hangs, the hedge is fast
+            await asyncio.sleep(10 if len(started) == 1 else 0.01)
+        except asyncio.CancelledError:
+            cancelled.append(1)
+            raise
+        return len(started)
+
+    assert await caller.call(call) == 2
+    await asyncio.sleep(0)
+    assert caller.hedged == 1
+    assert caller.hedge_wins == 1
+    assert cancelled == [1]
+
+
+@pytest.mark.asyncio
+async def test_no_hedge_when_hedging_is_not_allowed():
+    latencies = LatencyTracker(min_samples=1)
+    latencies.record(0.001)
+    caller = make_caller(
+        hedge_quantile=0.95, latencies=latencies, can_hedge=lambda: False
+    )
+
+    async def call():
+        await asyncio.sleep(0.02)
+        return "ok"
+
+    assert await caller.call(call) == "ok"
+    assert caller.hedged == 0
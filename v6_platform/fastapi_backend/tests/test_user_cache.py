@@ -0,0 +1,154 @@
+import uuid
+
+import pytest
+from fastapi import status
+from fastapi_users.db import SQLAlchemyUserDatabase
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.models import Base, User
+from app.replicas import ReplicaRouter
+from app.schemas import UserUpdate
+from app.user_cache import UserCache
+from app.users import UserManager
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_user(**fields):
+    return User(
+        **{
+            "id": uuid.uuid4(),
+            "email": "test@example.com",
+            "hashed_password": "hash",
+            "is_active": True,
+            "is_superuser": False,
+            "is_verified": True,
+            **fields,
+        }
+    )
+
+
+def test_cache_returns_fresh_detached_copies():
+    cache = UserCache(maxsize=10, ttl=30)
+    user = make_user()
+    cache.put(user.id, "token", user)
+
+    first = cache.get(user.id, "token")
+    second = cache.get(user.id, "token")
+
+    assert first is not second
+    assert first.email == "test@example.com"
+    assert cache.get(user.id, "other-token") is None
+    assert (cache.hits, cache.misses) == (2, 1)
+
+
+def test_cache_expires_and_evicts():
+    clock = Clock()
+    cache = UserCache(maxsize=2, ttl=30, clock=clock)
+    users = [make_user() for _ in range(3)]
+    for user in users[:2]:
+        cache.put(user.id, "token", user)
+    cache.get(users[0].id, "token")
+    cache.put(users[2].id, "token", users[2])
+
+    # The least recently used entry made room
+    assert cache.get(users[1].id, "token") is None
+    assert cache.get(users[0].id, "token") is not None
+
+    clock.now = 30
+    assert cache.get(users[0].id, "token") is None
+    assert len(cache) == 1
+
+
+def test_invalidate_drops_every_token_of_a_user():
+    cache = UserCache(maxsize=10, ttl=30)
+    user, other = make_user(), make_user()
+    cache.put(user.id, "a", user)
+    cache.put(user.id, "b", user)
+    cache.put(other.id, "a", other)
+
+    cache.invalidate(user.id)
+
+    assert cache.get(user.id, "a") is None
+    assert cache.get(user.id, "b") is None
+    assert cache.get(other.id, "a") is not None
+
+
+@pytest.fixture
+def fresh_cache(mocker):
+    cache = UserCache(maxsize=10, ttl=30)
+    mocker.patch("app.users.user_cache", cache)
+    return cache
+
+
+@pytest.mark.asyncio(loop_scope="function")
+async def test_authenticated_requests_skip_the_user_lookup(
+    test_client, authenticated_user, fresh_cache, mocker
+):
+    lookup = mocker.spy(SQLAlchemyUserDatabase, "get")
+    headers = authenticated_user["headers"]
+
+    for _ in range(3):
+        response = await test_client.get("/users/me", headers=headers)
+        assert response.status_code == status.HTTP_200_OK
+
+    assert lookup.call_count == 1
+    assert fresh_cache.hits == 2
+
+
+@pytest.mark.asyncio(loop_scope="function")
+async def test_user_updates_invalidate_the_cache(
+    test_client, authenticated_user, db_session, fresh_cache
+):
+    headers = authenticated_user["headers"]
+    await test_client.get("/users/me", headers=headers)
+
+    response = await test_client.patch(
+        "/users/me", headers=headers, json={"email": "new@example.com"}
+    )
+    assert response.status_code == status.HTTP_200_OK
+    me = await test_client.get("/users/me", headers=headers)
+    assert me.json()["email"] == "new@example.com"
+
+    # Deactivation takes effect on the next request
+    manager = UserManager(SQLAlchemyUserDatabase(db_session, User))
+    user = await manager.get(authenticated_user["user"].id)
+    await manager.update(UserUpdate(is_active=False), user, safe=False)
+
+    response = await test_client.get("/users/me", headers=headers)
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+@pytest.mark.asyncio(loop_scope="function")
+async def test_deactivation_is_not_undone_by_a_lagging_replica(
+    test_client, authenticated_user, db_session, fresh_cache, mocker, tmp_path
+):
+    # A replica still holding the user as it was before the deactivation
+    replica = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'replica.db'}")
+    async with replica.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+    async with db_session.bind.connect() as primary:
+        row = (await primary.execute(User.__table__.select())).mappings().one()
+    async with replica.begin() as connection:
+        await connection.execute(User.__table__.insert(), [dict(row)])
+    router = ReplicaRouter(
+        [replica], max_lag=5, check_interval=10, check_timeout=1, sticky_seconds=10
+    )
+    mocker.patch("app.database.replica_router", router)
+    headers = authenticated_user["headers"]
+    me = await test_client.get("/users/me", headers=headers)
+    assert me.status_code == status.HTTP_200_OK
+
+    manager = UserManager(SQLAlchemyUserDatabase(db_session, User))
+    user = await manager.get(authenticated_user["user"].id)
+    await manager.update(UserUpdate(is_active=False), user, safe=False)
+
+    response = await test_client.get("/users/me", headers=headers)
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+    await replica.dispose()
@@ -0,0 +1,119 @@
+import json
+
+import pytest
+
+from app.schemas import Asset
+from app.valuation import (
+    GENERATION_CONFIG,
+    FieldStreamParser,
+    analyze,
+    build_batch_prompt,
+    pack_batches,
+    parse_batch_response,
+    parse_result,
+)
+
+ANSWER = {
+    "valuation": "$5k - $10k",
+    "reasoning": 'Still pulled by "legacy" installs,\nweekly.',
+    "details": "Maintainer left {in 2019}.",
+}
+
+
+def make_asset(index, description="Stale fork."):
+    return Asset(
+        id=f"asset-{index}",
+        name=f"asset {index}",
+        type="github_zombie",
+        url=f"https://github.com/acme/{index}",
+        description=description,
+        detected_at="2025-01-01T00:00:00",
+    )
+
+
+def test_pack_batches_respects_size_and_prompt_budget(mocker):
+    mocker.patch("app.valuation.settings.ANALYZE_BATCH_PACK_SIZE", 3)
+    mocker.patch("app.valuation.settings.ANALYZE_BATCH_PROMPT_CHARS", 1000)
+    assets = [make_asset(i) for i in range(5)]
+    assets.insert(2, make_asset(99, description="x" * 2000))
+
+    assert pack_batches(assets) == [[0, 1], [2], [3, 4, 5]]
+
+
+def test_build_batch_prompt_numbers_assets():
+    prompt = build_batch_prompt([make_asset(1), make_asset(2)])
+
+    assert "Asset 1:" in prompt
+    assert "Asset 2:" in prompt
+    assert "Name: asset 2" in prompt
+
+
+def test_parse_batch_response_handles_fences_and_gaps():
+    text = """```json
+    [{"asset": 2, "valuation": "$2k", "reasoning": "r2", "details": "d2"},
+     {"asset": 7, "valuation": "$7k", "reasoning": "r7"},
+     {"asset": 1, "reasoning": "missing valuation"}]
+    ```"""
+
+    results = parse_batch_response(text, 3)
+
+    assert results[0] is None
+    assert results[1].valuation == "$2k"
+    assert results[2] is None
+
+
+@pytest.mark.parametrize("text", ["Here are your valuations!", '{"asset": 1}'])
+def test_parse_batch_response_rejects_answers_that_are_not_lists(text):
+    with pytest.raises(ValueError):
+        parse_batch_response(text, 2)
+
+
+def test_parse_result_maps_json_onto_analysis_result():
+    result = parse_result("```json\n" + json.dumps(ANSWER) + "\n```")
+
+    assert result.model_dump() == ANSWER
+
+
+@pytest.mark.parametrize(
+    "text", ["Worth about $5k.", '{"valuation": "$5k"}', '["$5k"]', '{"valuation":']
+)
+def test_parse_result_falls_back_to_free_text(text):
+    result = parse_result(text)
+
+    assert result.valuation == "AI Generated Estimate"
+    assert result.details == text
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 17, 10_000])
+def test_field_stream_parser_emits_fields_as_they_complete(chunk_size):
+    text = json.dumps(
+        {"valuation": ANSWER["valuation"], "meta": {"valuation": "nested"}, "n": 3}
+        | {"reasoning": ANSWER["reasoning"], "details": ANSWER["details"]},
+        indent=2,
+    )
+    parser = FieldStreamParser()
+    emitted = []
+    for start in range(0, len(text), chunk_size):
+        chunk = text[start : start + chunk_size]
+        for name, value in parser.feed(chunk).items():
+            emitted.append((name, value, start + len(chunk)))
+
+    assert [name for name, _, _ in emitted] == ["valuation", "reasoning", "details"]
+    assert parser.fields == ANSWER
+    # The valuation is out long before the rest of the object has arrived
+    name, value, seen = emitted[0]
+    assert value == ANSWER["valuation"]
+    assert seen < text.index('"reasoning"') + chunk_size
+
+
+@pytest.mark.asyncio
+async def test_analyze_requests_schema_constrained_output(mocker):
+    generate_text = mocker.patch(
+        "app.valuation.llm.generate_text", return_value=json.dumps(ANSWER)
+    )
+
+    result = await analyze(make_asset(1))
+
+    assert result.model_dump() == ANSWER
+    assert generate_text.call_args.kwargs["generation_config"] == GENERATION_CONFIG
+    assert generate_text.call_count == 1
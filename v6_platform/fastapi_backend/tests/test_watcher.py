@@ -0,0 +1,71 @@
+import threading
+
+import pytest
+
+pytest.importorskip("watchdog")
+
+from watchdog.events import (  # noqa: E402
+    DirModifiedEvent,
+    FileModifiedEvent,
+    FileMovedEvent,
+)
+
+import watcher  # noqa: E402
+
+
+@pytest.fixture
+def handler(mocker):
+    handler = watcher.MyHandler(debounce=0.05)
+    handler.runs = []
+    handler.ran = threading.Event()
+
+    def execute_command(paths):
+        handler.runs.append(paths)
+        handler.ran.set()
+
+    mocker.patch.object(handler, "execute_command", side_effect=execute_command)
+    return handler
+
+
+def test_saves_within_the_debounce_window_are_coalesced(handler):
+    handler.dispatch(FileModifiedEvent("app/routes/items.py"))
+    handler.dispatch(FileModifiedEvent("app/schemas.py"))
+    handler.dispatch(FileModifiedEvent("app/schemas.py"))
+
+    assert handler.ran.wait(2)
+    assert handler.runs == [["app/routes/items.py", "app/schemas.py"]]
+
+
+def test_saves_by_rename_are_picked_up(handler):
+    handler.dispatch(FileMovedEvent("app/.models.py.swp", "app/models.py"))
+
+    assert handler.ran.wait(2)
+    assert handler.runs == [["app/models.py"]]
+
+
+def test_saves_during_a_run_trigger_another_run(handler):
+    with handler.run_lock:
+        handler.dispatch(FileModifiedEvent("app/main.py"))
+        # Handled only once the run in progress finishes
+        assert not handler.ran.wait(0.2)
+
+    assert handler.ran.wait(2)
+    assert handler.runs == [["app/main.py"]]
+
+
+def test_other_changes_are_ignored(handler):
+    handler.dispatch(DirModifiedEvent("app/routes"))
+    handler.dispatch(FileModifiedEvent("app/openapi_schema.json"))
+
+    assert not handler.ran.wait(0.2)
+
+
+def test_schema_is_generated_in_a_subprocess(mocker):
+    run = mocker.patch("watcher.subprocess.run")
+
+    watcher.MyHandler().run_openapi_schema_generation()
+
+    run.assert_called_once_with(
+        [watcher.sys.executable, "-m", "commands.generate_openapi_schema"],
+        check=True,
+    )
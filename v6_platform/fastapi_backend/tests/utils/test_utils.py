@@ -1,5 +1,12 @@
+import uuid
+
+import pytest
 from fastapi.routing import APIRoute
-from app.utils import simple_generate_unique_route_id
+from app.utils import (
+    generate_asset_id,
+    normalize_url,
+    simple_generate_unique_route_id,
+)
 
 
 def test_simple_generate_unique_route_id(mocker):
@@ -11,3 +18,37 @@ def test_simple_generate_unique_route_id(mocker):
     unique_id = simple_generate_unique_route_id(mock_route)
 
     assert unique_id == "auth-authenticate_user"
+
+
+@pytest.mark.parametrize(
+    "url, expected",
+    [
+        ("HTTPS://Example.COM:443/api/", "https://example.com/api"),
+        ("http://example.com:8080/a?b=2&a=1#frag", "http://example.com:8080/a?a=1&b=2"),
+        ("https://example.com/", "https://example.com"),
+        ("http://[::1]:8080/status/", "http://[::1]:8080/status"),
+        ("HTTPS://[2001:DB8::1]:443/", "https://[2001:db8::1]"),
+        ("http://Example.com:99999/a/", "http://example.com:99999/a"),
+        ("http://example.com:port", "http://example.com:port"),
+    ],
+)
+def test_normalize_url(url, expected):
+    assert normalize_url(url) == expected
+
+
+def test_generate_asset_id_is_stable_for_equivalent_urls():
+    first = generate_asset_id("chrome_ghost", "https://example.com/api/", "Hidden API")
+    second = generate_asset_id("chrome_ghost", "HTTPS://example.com/api", "Hidden API")
+
+    assert first == second
+    assert uuid.UUID(first).version == 5
+
+
+def test_generate_asset_id_depends_on_type_and_name():
+    ids = {
+        generate_asset_id("chrome_ghost", "https://example.com", "Site"),
+        generate_asset_id("github_zombie", "https://example.com", "Site"),
+        generate_asset_id("chrome_ghost", "https://example.com", "Other"),
+    }
+
+    assert len(ids) == 3